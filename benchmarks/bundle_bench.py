@@ -0,0 +1,76 @@
+"""
+Benchmark: IGS notification bundle construction (microseconds per bundle).
+
+Measures ``igs_notification.build_notification_bundle`` on the sample metadata
+row. With ``--baseline <git revision>`` the builder of that revision is loaded
+from git and measured as well, e.g. the dict+prune version before the
+precompiled builder:
+
+    PYTHONPATH=src python benchmarks/bundle_bench.py --bundles 20000 --baseline 1ef2513
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import igsupload.config as config
+from igsupload import igs_notification
+from igsupload.extract_csv import read_csv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_CSV = os.path.join(ROOT, "data", "metadata", "IGS_metadata_v7.csv")
+
+
+def load_revision(revision):
+    source = subprocess.run(
+        ["git", "show", f"{revision}:src/igsupload/igs_notification.py"],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location(f"igs_notification_{revision}", f.name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    os.remove(f.name)
+    return module
+
+
+def measure(name, build, row, bundles):
+    doc_ids = ["doc-1", "doc-2"]
+    for _ in range(min(bundles, 200)):
+        build(row, doc_ids)
+    start = time.perf_counter()
+    for _ in range(bundles):
+        build(row, doc_ids)
+    seconds = time.perf_counter() - start
+    return {
+        "name": name,
+        "bundles": bundles,
+        "seconds": round(seconds, 3),
+        "us_per_bundle": round(seconds / bundles * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bundles", type=int, default=20_000)
+    parser.add_argument("--baseline", help="git revision to compare against")
+    args = parser.parse_args()
+
+    config.BASE_URL = "https://bench.example/surveillance/notification-sequence"
+    row = read_csv(SAMPLE_CSV)[0]
+
+    results = [measure("build_notification_bundle", igs_notification.build_notification_bundle, row, args.bundles)]
+    if args.baseline:
+        baseline = load_revision(args.baseline)
+        results.append(measure(f"baseline@{args.baseline}", baseline.build_notification_bundle, row, args.bundles))
+
+    print(json.dumps({"python": sys.version.split()[0], "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Benchmark: end-to-end upload of synthetic FASTQ datasets against the local DEMIS stand-in.
+
+Generates paired FASTQ (or FASTQ.GZ) files plus an IGS_metadata_v7 style CSV,
+runs ``workflow.start`` against ``igsupload.demis_stub`` (in a subprocess, so
+the client's peak RSS is measured alone) and reports throughput for hashing,
+uploading and bundle building, p50/p95 latency per stage, peak RSS and wall time.
+
+    PYTHONPATH=src python benchmarks/e2e_bench.py --samples 4 --size 64MB --gzip > after.json
+    PYTHONPATH=src python benchmarks/e2e_bench.py --samples 4 --size 64MB --gzip --baseline before.json
+
+With ``--baseline`` the run is compared with an earlier result and the script
+exits with status 1 if a throughput drops by more than ``--max-regression``.
+"""
+import argparse
+import contextlib
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import igsupload.config as config
+import igsupload.igsupload_logger as igsupload_logger
+from igsupload import timing, workflow
+from igsupload.bandwidth import parse_rate
+from igsupload.extract_csv import header
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_CSV = os.path.join(ROOT, "data", "metadata", "IGS_metadata_v7.csv")
+
+# workflow.start waits for the first token before uploading
+STARTUP_SLEEP = 2.0
+
+# --- Synthetic data ---
+def _read_pool(rng, count=4096, length=150):
+    bases, quals = "ACGT", "FFFF:,F"
+    pool = []
+    for _ in range(count):
+        seq = "".join(rng.choice(bases) for _ in range(length))
+        qual = "".join(rng.choice(quals) for _ in range(length))
+        pool.append((seq, qual))
+    return pool
+
+
+def write_fastq(path, size, pool, rng, compress):
+    opener = (lambda p: gzip.open(p, "wb", compresslevel=1)) if compress else (lambda p: open(p, "wb"))
+    written = 0
+    read_no = 0
+    with opener(path) as f:
+        while written < size:
+            block = []
+            for _ in range(1000):
+                seq, qual = pool[rng.randrange(len(pool))]
+                block.append(f"@SYN:{read_no}\n{seq}\n+\n{qual}\n")
+                read_no += 1
+            data = "".join(block).encode("ascii")
+            f.write(data)
+            written += len(data)
+
+
+def make_dataset(directory, samples, size, compress, seed):
+    """Writes <dir>/reads/*.fastq[.gz] and <dir>/metadata/IGS_metadata_v7.csv (reused if present)."""
+    reads_dir = os.path.join(directory, "reads")
+    csv_dir = os.path.join(directory, "metadata")
+    csv_path = os.path.join(csv_dir, "IGS_metadata_v7.csv")
+    os.makedirs(reads_dir, exist_ok=True)
+    os.makedirs(csv_dir, exist_ok=True)
+
+    with open(SAMPLE_CSV, newline="", encoding="utf-8") as f:
+        template = dict(zip(*csv.reader(f, delimiter=";")))
+
+    rng = random.Random(seed)
+    pool = _read_pool(rng)
+    suffix = ".fastq.gz" if compress else ".fastq"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(header)
+        for i in range(samples):
+            sample = f"BenchSample{i:04d}"
+            row = dict(template)
+            row.update({
+                "LAB_SEQUENCE_ID": sample,
+                "DEMIS_NOTIFICATION_ID": str(uuid.uuid5(uuid.NAMESPACE_URL, f"igsupload-bench/{seed}/{sample}")),
+                "FILE_1_NAME": f"{sample}_R1{suffix}", "FILE_1_SHA256SUM": "",
+                "FILE_2_NAME": f"{sample}_R2{suffix}", "FILE_2_SHA256SUM": "",
+            })
+            writer.writerow([row.get(field, "") for field in header])
+            for mate in ("R1", "R2"):
+                path = os.path.join(reads_dir, f"{sample}_{mate}{suffix}")
+                if not os.path.exists(path):
+                    write_fastq(path, size // 2, pool, rng, compress)
+    return csv_path
+
+
+# --- Measurement ---
+def summarize(summary, wall):
+    """Benchmark result from the stage spans of the run (timing.summarize())."""
+    stages = {
+        stage: {
+            "count": s["count"],
+            "total_s": round(s["total"], 4),
+            "p50_ms": round(s["p50"] * 1000, 3),
+            "p95_ms": round(s["p95"] * 1000, 3),
+            "max_ms": round(s["max"] * 1000, 3),
+        }
+        for stage, s in summary.items()
+    }
+
+    def rate(stage):
+        s = summary.get(stage)
+        return round(s["bytes"] / s["total"] / 1e6, 2) if s and s["total"] else None
+
+    bundles = summary.get("prebuild_notification")
+    return {
+        "throughput": {
+            "hash_mb_per_s": rate("create_hash"),
+            "upload_mb_per_s": rate("put_chunks"),
+            "bundles_per_s": round(bundles["count"] / bundles["total"], 1) if bundles and bundles["total"] else None,
+        },
+        "stages": stages,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "wall_seconds": round(wall, 3),
+        "wall_seconds_excl_startup": round(wall - STARTUP_SLEEP, 3),
+    }
+
+
+def start_stub(args):
+    command = [
+        sys.executable, "-m", "igsupload.demis_stub", "--port", "0",
+        "--latency", str(args.latency), "--part-size", str(args.part_size),
+        "--validation-delay", "0", "--seed", str(args.seed),
+    ]
+    if args.bandwidth:
+        command += ["--bandwidth", args.bandwidth]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline().strip()
+    if not line.startswith("BASE_URL="):
+        process.kill()
+        raise RuntimeError(f"DEMIS stand-in did not start: {line!r}")
+    return process, line.split("=", 1)[1]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline, max_regression):
+    regressions = []
+    for key, value in result["throughput"].items():
+        before = baseline.get("throughput", {}).get(key)
+        if not value or not before:
+            continue
+        change = value / before - 1
+        result.setdefault("comparison", {})[key] = round(change, 3)
+        if change < -max_regression:
+            regressions.append(f"{key}: {before} -> {value} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=2)
+    parser.add_argument("--size", default="32MB", help="uncompressed bytes per sample (both mates together)")
+    parser.add_argument("--gzip", action="store_true", help="generate FASTQ.GZ instead of FASTQ")
+    parser.add_argument("--data-dir", help="keep/reuse the generated dataset here")
+    parser.add_argument("--part-size", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in latency per request (s)")
+    parser.add_argument("--bandwidth", help="stand-in upload cap, e.g. 100MB/s")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="earlier JSON result to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        directory = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory(prefix="igs_bench_"))
+        csv_path = make_dataset(directory, args.samples, int(parse_rate(args.size)), args.gzip, args.seed)
+        log_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="igs_bench_log_"))
+
+        process, base_url = start_stub(args)
+        stack.callback(process.terminate)
+        config.BASE_URL, config.CERT, config.KEY = base_url, None, None
+        igsupload_logger.logging_path = log_dir
+
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            ok = workflow.start(csv_path)
+        wall = time.perf_counter() - start
+        summary = timing.summarize()
+
+    notifications = summary.get("send_notification", {"count": 0, "errors": 0})
+    sent = notifications["count"] - notifications["errors"]
+    result = {
+        "benchmark": "e2e",
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "dataset": {
+            "samples": args.samples, "bytes_per_sample": int(parse_rate(args.size)),
+            "gzip": args.gzip, "part_size": args.part_size, "seed": args.seed,
+        },
+        "stand_in": {"latency": args.latency, "bandwidth": args.bandwidth},
+        "ok": ok is not False and sent == args.samples,
+        **summarize(summary, wall),
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.max_regression)
+        result["regressions"] = regressions
+
+    print(json.dumps(result, indent=2))
+    if not result["ok"]:
+        sys.stderr.write(output.getvalue()[-4000:])
+    sys.exit(1 if regressions or not result["ok"] else 0)
+
+
+if __name__ == "__main__":
+    main()
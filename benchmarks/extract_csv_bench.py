@@ -0,0 +1,100 @@
+"""
+Benchmark: metadata CSV parsing (time and peak memory).
+
+Compares the former DictReader based parser (list of dataclass rows with a
+per-row/per-field ``replace('.', '_')``) against ``extract_csv.read_csv`` and
+the streaming ``extract_csv.iter_csv`` on a synthetic CSV.
+
+    PYTHONPATH=src python benchmarks/extract_csv_bench.py --rows 1000000
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from dataclasses import make_dataclass
+
+from igsupload import extract_csv
+
+LegacyRow = make_dataclass(
+    "LegacyRow", [(field.replace('.', '_'), str) for field in extract_csv.header]
+)
+
+
+def legacy_read_csv(csv_path):
+    with open(csv_path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile, delimiter=';')
+        rows = []
+        for r in reader:
+            cleaned = {}
+            for field in extract_csv.header:
+                val = r.get(field, "")
+                val = "" if val is None else str(val).strip()
+                cleaned[field.replace('.', '_')] = val
+            rows.append(LegacyRow(**cleaned))
+        return rows
+
+
+def write_synthetic_csv(path, rows):
+    with open(path, "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(extract_csv.header)
+        for i in range(rows):
+            record = [f"{field.lower()}_{i}" for field in extract_csv.header]
+            record[extract_csv.header.index("FILE_1_NAME")] = f"Sample{i}_R1.fastq.gz"
+            record[extract_csv.header.index("FILE_2_NAME")] = f"Sample{i}_R2.fastq.gz"
+            writer.writerow(record)
+
+
+def consume(result):
+    count = 0
+    for _ in result:
+        count += 1
+    return count
+
+
+def measure(name, fn, csv_path):
+    start = time.perf_counter()
+    count = consume(fn(csv_path))
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    consume(fn(csv_path))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "rows": count,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(count / seconds) if seconds else None,
+        "peak_memory_mb": round(peak / 1024 / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="only benchmark the new reader")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "IGS_metadata_bench.csv")
+        write_synthetic_csv(csv_path, args.rows)
+        results = {
+            "rows": args.rows,
+            "file_size_mb": round(os.path.getsize(csv_path) / 1024 / 1024, 1),
+            "results": [],
+        }
+        if not args.skip_legacy:
+            results["results"].append(measure("legacy_dictreader", legacy_read_csv, csv_path))
+        results["results"].append(measure("read_csv", extract_csv.read_csv, csv_path))
+        results["results"].append(measure("iter_csv", extract_csv.iter_csv, csv_path))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,9 @@ setup(
             "pytest-cov>=5",
             "pytest-mock>=3.14.1"
         ],
+        "fast": [
+            "orjson>=3.10",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -0,0 +1,265 @@
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from igsupload.igsupload_logger import resolve_path
+
+# --max-bandwidth / --bandwidth-schedule: gemeinsames Limit für alle Part-Uploads
+max_bandwidth: Optional[float] = None
+schedule_path: Optional[str] = None
+schedule: List["ScheduleRule"] = []
+
+REFRESH_INTERVAL = 1.0  # Zeitplan/Datei höchstens so oft neu auswerten
+BURST_SECONDS = 0.25
+BLOCK_SIZE = 64 * 1024  # Granularität, in der ein Part-Body Tokens verbraucht
+
+_SIZE_UNITS = {"": 1, "B": 1, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3,
+               "KIB": 1024, "MIB": 1024 ** 2, "GIB": 1024 ** 3}
+_DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def parse_rate(value) -> Optional[float]:
+    """'200MB/s', '50MiB', '1e6' -> bytes per second (None/0 = unlimited)."""
+    if value in (None, "", 0):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) or None
+    if str(value).strip().lower() in ("unlimited", "none", "off"):
+        return None
+    match = re.fullmatch(r"\s*([\d.]+(?:e\d+)?)\s*([KMG]i?B|B)?\s*(/s)?\s*", str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid rate: {value}")
+    number, unit = float(match.group(1)), (match.group(2) or "").upper()
+    return number * _SIZE_UNITS[unit] or None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket in bytes. consume() reserves the bytes right away
+    (tokens may go negative) and sleeps off the debt, so concurrent uploads
+    share the rate fairly. The rate can be changed while uploads are running.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self._lock = threading.Lock()
+        self.rate = None
+        self.tokens = 0.0
+        self._burst = burst  # None: BURST_SECONDS der Rate (Bytes); 1 für Requests pro Sekunde
+        self._updated = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate: Optional[float]):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.tokens = min(self.tokens, self.burst) if rate else 0.0
+
+    @property
+    def burst(self) -> float:
+        if not self.rate:
+            return 0.0
+        return self._burst if self._burst is not None else max(self.rate * BURST_SECONDS, BLOCK_SIZE)
+
+    def _refill(self, now: float):
+        if self.rate:
+            self.tokens = min(self.tokens + (now - self._updated) * self.rate, self.burst)
+        self._updated = now
+
+    def consume(self, nbytes: int):
+        with self._lock:
+            if not self.rate:
+                return
+            self._refill(time.monotonic())
+            self.tokens -= nbytes
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+@dataclass(frozen=True)
+class ScheduleRule:
+    days: Tuple[int, ...]         # 0 = Montag
+    start: Optional[int]          # Minute des Tages, None = ganzer Tag
+    end: Optional[int]
+    rate: Optional[float]         # None = unbegrenzt
+
+    def matches(self, now: datetime) -> bool:
+        minute = now.hour * 60 + now.minute
+        if self.start is None:
+            return now.weekday() in self.days
+        if self.start <= self.end:
+            return now.weekday() in self.days and self.start <= minute < self.end
+        # über Mitternacht (22:00-06:00): der Morgen gehört zum Vortag
+        if minute >= self.start:
+            return now.weekday() in self.days
+        return minute < self.end and (now.weekday() - 1) % 7 in self.days
+
+
+def _parse_days(text: str) -> Tuple[int, ...]:
+    if text == "*":
+        return tuple(range(7))
+    days = set()
+    for item in text.lower().split(","):
+        first, _, last = item.partition("-")
+        try:
+            start = _DAYS.index(first[:3])
+            end = _DAYS.index(last[:3]) if last else start
+        except ValueError:
+            raise ValueError(f"Invalid weekday: {item}") from None
+        days.update(range(start, end + 1) if start <= end else [*range(start, 7), *range(0, end + 1)])
+    return tuple(sorted(days))
+
+
+def _parse_minutes(text: str) -> int:
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", text)
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise ValueError(f"Invalid time: {text} (expected HH:MM, 00:00-23:59)")
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def parse_schedule(text: str) -> List[ScheduleRule]:
+    """
+    One rule per line: <days> <from-to> <limit>, '#' starts a comment.
+    The first matching rule wins, e.g.
+
+        Mon-Fri  08:00-18:00  50MB/s
+        Mon-Fri  18:00-08:00  unlimited
+        Sat,Sun  *            unlimited
+    """
+    rules = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        try:
+            days, hours, limit = line.split()
+            if hours == "*":
+                start = end = None
+            else:
+                first, sep, last = hours.partition("-")
+                if not sep:
+                    raise ValueError(f"Invalid time range: {hours} (expected HH:MM-HH:MM)")
+                start, end = _parse_minutes(first), _parse_minutes(last)
+                if start == end:
+                    raise ValueError(f"Invalid time range: {hours} (empty window, use * for the whole day)")
+            rules.append(ScheduleRule(_parse_days(days), start, end, parse_rate(limit)))
+        except ValueError as e:
+            message = str(e) if "Invalid" in str(e) else "expected '<days> <from-to> <limit>'"
+            raise ValueError(f"Bandwidth schedule line {line_no}: {message}") from None
+    return rules
+
+
+_bucket = TokenBucket()
+_state_lock = threading.Lock()
+_last_refresh = 0.0
+_schedule_mtime: Optional[float] = None
+_current_rate: Optional[float] = None
+
+
+def set_max_bandwidth(value: Optional[str]):
+    global max_bandwidth
+    max_bandwidth = parse_rate(value)
+    if max_bandwidth:
+        print(f"[INFO] Upload bandwidth limited to {max_bandwidth / 1e6:.1f} MB/s")
+    refresh(force=True)
+
+
+def set_schedule_file(path: Optional[Path]):
+    """Loads the time-of-day schedule (--bandwidth-schedule); the file is re-read when it changes."""
+    global schedule_path, schedule, _schedule_mtime
+    if path is None:
+        schedule_path, schedule, _schedule_mtime = None, [], None
+        refresh(force=True)
+        return
+    resolved = resolve_path(path)
+    if not resolved.is_file():
+        raise FileNotFoundError(f"Bandwidth schedule not found: {resolved}")
+    schedule_path = str(resolved)
+    _schedule_mtime = resolved.stat().st_mtime
+    schedule = parse_schedule(resolved.read_text(encoding="utf-8"))
+    print(f"[INFO] Bandwidth schedule: {schedule_path} ({len(schedule)} rules)")
+    refresh(force=True)
+
+
+def active() -> bool:
+    return bool(max_bandwidth or schedule_path)
+
+
+def rate_at(now: datetime) -> Optional[float]:
+    """Limit in bytes/s at this time: first matching schedule rule, else --max-bandwidth."""
+    for rule in schedule:
+        if rule.matches(now):
+            return rule.rate
+    return max_bandwidth
+
+
+def _reload_schedule():
+    global schedule, _schedule_mtime
+    try:
+        mtime = os.stat(schedule_path).st_mtime
+        if mtime == _schedule_mtime:
+            return
+        _schedule_mtime = mtime
+        schedule = parse_schedule(Path(schedule_path).read_text(encoding="utf-8"))
+        print(f"[INFO] Bandwidth schedule reloaded ({len(schedule)} rules)")
+    except (OSError, ValueError) as e:
+        # bei einer kaputten Änderung mit den bisherigen Regeln weiterlaufen
+        print(f"[WARN] Could not reload bandwidth schedule: {e}")
+
+
+def refresh(force: bool = False):
+    """Re-evaluates the schedule (and reloads a changed file) at most every REFRESH_INTERVAL."""
+    global _last_refresh, _current_rate
+    now = time.monotonic()
+    with _state_lock:
+        if not force and now - _last_refresh < REFRESH_INTERVAL:
+            return
+        _last_refresh = now
+        if schedule_path:
+            _reload_schedule()
+        rate = rate_at(datetime.now())
+        if rate != _current_rate:
+            if not force:
+                limit = f"{rate / 1e6:.1f} MB/s" if rate else "unlimited"
+                print(f"[INFO] Upload bandwidth limit changed to {limit}")
+            _current_rate = rate
+            _bucket.set_rate(rate)
+
+
+def throttle(nbytes: int):
+    """Blocks until nbytes may be sent under the current limit."""
+    refresh()
+    _bucket.consume(nbytes)
+
+
+class ThrottledBody:
+    """
+    Request body for one part: hands out the chunk in BLOCK_SIZE pieces and
+    throttles each piece. __len__ lets requests send a Content-Length instead
+    of chunked encoding (required by presigned S3 PUTs).
+    """
+
+    def __init__(self, data: bytes):
+        self._data = memoryview(data)
+        self._pos = 0
+
+    def __len__(self):
+        return len(self._data) - self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        size = BLOCK_SIZE if size is None or size < 0 else min(size, BLOCK_SIZE)
+        piece = self._data[self._pos:self._pos + size]
+        self._pos += len(piece)
+        if piece:
+            throttle(len(piece))
+        return bytes(piece)
+
+
+def body(chunk: bytes):
+    """The chunk itself without a limit, otherwise a throttled body."""
+    return ThrottledBody(chunk) if active() else chunk
@@ -0,0 +1,140 @@
+import re
+from typing import Dict, List, Tuple
+
+# Lokale Kopie der Strukturregeln der DEMIS-IGS-Profile (Pflichtelemente, Referenzen,
+# Kardinalitäten, Datumsformate). Ersetzt nicht die Serverprüfung, findet aber Fehler im
+# Bundle, bevor Reads hochgeladen werden.
+_DEMIS = "https://demis.rki.de/fhir/StructureDefinition/"
+_IGS = "https://demis.rki.de/fhir/igs/StructureDefinition/"
+
+# Profil -> Elemente mit Kardinalität 1..*
+REQUIRED_ELEMENTS: Dict[str, Tuple[str, ...]] = {
+    _IGS + "NotificationSequence": (
+        "identifier", "status", "type", "category", "subject", "author", "date", "title", "section",
+    ),
+    _DEMIS + "NotifiedPersonNotByName": ("address",),
+    _DEMIS + "NotifierRole": ("organization",),
+    _DEMIS + "NotifierFacility": ("type", "name", "telecom", "address"),
+    _DEMIS + "SubmittingRole": ("organization",),
+    _DEMIS + "SubmittingFacility": ("telecom", "address"),
+    _IGS + "SpecimenSequence": ("status", "type", "subject", "collection", "processing"),
+    _IGS + "SequencingDevice": (),
+    _IGS + "AdapterSubstance": ("code",),
+    _IGS + "PrimerSubstance": ("code",),
+    _IGS + "Sequence": ("coordinateSystem", "specimen", "device", "performer", "repository", "extension"),
+    _IGS + "PathogenDetectionSequence": (
+        "status", "category", "code", "valueCodeableConcept", "subject", "method", "specimen", "device", "derivedFrom",
+    ),
+    _IGS + "LaboratoryReportSequence": ("status", "code", "subject", "issued", "result", "conclusionCode"),
+}
+BUNDLE_PROFILE = _IGS + "NotificationBundleSequence"
+SEQUENCE_DOCUMENT_REFERENCE_URL = _IGS + "SequenceDocumentReference"
+DOCUMENT_REFERENCES_PER_SEQUENCE = 2
+
+_STATUS = {
+    "Composition": {"preliminary", "final", "amended", "entered-in-error"},
+    "Observation": {"registered", "preliminary", "final", "amended", "corrected", "cancelled", "entered-in-error"},
+    "DiagnosticReport": {"registered", "partial", "preliminary", "final", "amended", "corrected", "cancelled"},
+}
+_ID = re.compile(r"[A-Za-z0-9\-.]{1,64}")
+_DATE = re.compile(r"\d{4}(-(0[1-9]|1[0-2])(-(0[1-9]|[12]\d|3[01]))?)?")
+_DATE_TIME = re.compile(
+    r"\d{4}(-(0[1-9]|1[0-2])(-(0[1-9]|[12]\d|3[01])"
+    r"(T([01]\d|2[0-3]):[0-5]\d:([0-5]\d|60)(\.\d+)?(Z|[+-]((0\d|1[0-3]):[0-5]\d|14:00)))?)?)?"
+)
+_INSTANT = re.compile(
+    r"\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])T([01]\d|2[0-3]):[0-5]\d:([0-5]\d|60)(\.\d+)?"
+    r"(Z|[+-]((0\d|1[0-3]):[0-5]\d|14:00))"
+)
+# (Ressourcentyp, Element) -> Format
+_DATE_ELEMENTS = {
+    ("Patient", "birthDate"): _DATE,
+    ("Specimen", "receivedTime"): _DATE_TIME,
+    ("Composition", "date"): _DATE_TIME,
+    ("DiagnosticReport", "issued"): _INSTANT,
+}
+
+
+def _references(value):
+    """All reference strings below value (also in extensions)."""
+    if isinstance(value, dict):
+        reference = value.get("reference")
+        if isinstance(reference, str):
+            yield reference
+        for child in value.values():
+            yield from _references(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from _references(child)
+
+
+def _check_dates(resource_type: str, resource: dict, where: str, issues: List[str]):
+    for (rtype, element), pattern in _DATE_ELEMENTS.items():
+        value = resource.get(element)
+        if rtype == resource_type and value is not None and not pattern.fullmatch(str(value)):
+            issues.append(f"{where}.{element}: invalid date '{value}'")
+    if resource_type == "Specimen":
+        collected = resource.get("collection", {}).get("collectedDateTime")
+        if collected is not None and not _DATE_TIME.fullmatch(collected):
+            issues.append(f"{where}.collection.collectedDateTime: invalid date '{collected}'")
+        for processing in resource.get("processing", []):
+            moment = processing.get("timeDateTime")
+            if moment is not None and not _DATE_TIME.fullmatch(moment):
+                issues.append(f"{where}.processing.timeDateTime: invalid date '{moment}'")
+
+
+def check_bundle(bundle: dict) -> List[str]:
+    """
+    Checks a notification bundle against the structural rules of the IGS profiles.
+    Returns the issues as 'Resource/id.element: message' (empty = passes).
+    """
+    issues = []
+    if BUNDLE_PROFILE not in bundle.get("meta", {}).get("profile", []):
+        issues.append(f"Bundle: profile {BUNDLE_PROFILE} missing")
+    if bundle.get("type") != "document":
+        issues.append(f"Bundle.type: expected 'document', got '{bundle.get('type')}'")
+    if not _INSTANT.fullmatch(str(bundle.get("timestamp", ""))):
+        issues.append(f"Bundle.timestamp: invalid instant '{bundle.get('timestamp')}'")
+    entries = bundle.get("entry") or []
+    if not entries or entries[0].get("resource", {}).get("resourceType") != "Composition":
+        issues.append("Bundle.entry: the first entry must be the Composition")
+
+    local = set()
+    for entry in entries:
+        resource = entry.get("resource", {})
+        if resource.get("id"):
+            local.add(f"{resource.get('resourceType')}/{resource['id']}")
+
+    sequences = 0
+    for index, entry in enumerate(entries):
+        resource = entry.get("resource") or {}
+        resource_type = resource.get("resourceType", "?")
+        resource_id = resource.get("id")
+        where = f"{resource_type}/{resource_id}" if resource_id else f"Bundle.entry[{index}]"
+        if resource_id is not None and not _ID.fullmatch(resource_id):
+            issues.append(f"{where}: invalid id")
+        if resource_id and not entry.get("fullUrl", "").endswith(f"/{resource_type}/{resource_id}"):
+            issues.append(f"{where}: fullUrl does not match the resource")
+        for profile in resource.get("meta", {}).get("profile", []):
+            for element in REQUIRED_ELEMENTS.get(profile, ()):
+                if resource.get(element) in (None, "", [], {}):
+                    issues.append(f"{where}.{element}: required by {profile.rsplit('/', 1)[-1]}")
+        status = resource.get("status")
+        if resource_type in _STATUS and status not in _STATUS[resource_type]:
+            issues.append(f"{where}.status: invalid value '{status}'")
+        _check_dates(resource_type, resource, where, issues)
+        for reference in _references(resource):
+            # absolute URLs (DocumentReferences auf dem Server) werden hier nicht aufgelöst
+            if "://" not in reference and reference not in local:
+                issues.append(f"{where}: reference {reference} not found in the bundle")
+        if resource_type == "MolecularSequence":
+            sequences += 1
+            count = sum(
+                1 for extension in resource.get("extension", [])
+                if extension.get("url") == SEQUENCE_DOCUMENT_REFERENCE_URL
+            )
+            if count != DOCUMENT_REFERENCES_PER_SEQUENCE:
+                issues.append(f"{where}.extension: expected {DOCUMENT_REFERENCES_PER_SEQUENCE} SequenceDocumentReference, got {count}")
+    if sequences != 1:
+        issues.append(f"Bundle.entry: expected one MolecularSequence, got {sequences}")
+    return issues
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import igsupload.metrics as metrics
+import igsupload.progress as progress
+from igsupload.reads_io import open_read
+from igsupload.igsupload_logger import resolve_path
+
+# --compress: unkomprimierte FASTQ/FASTA vor dem Upload parallel gzippen
+enabled = False
+threads = os.cpu_count() or 1
+level = 6
+spool_dir: Optional[str] = None
+
+BLOCK_SIZE = 1024 * 1024
+DICT_SIZE = 32 * 1024  # deflate window
+# gzip header: magic, deflate, no flags, mtime 0, no extra flags, OS unknown
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+def set_compress(enable: bool, thread_count: Optional[int] = None, compress_level: int = 6,
+                 directory: Optional[Path] = None):
+    global enabled, threads, level, spool_dir
+    enabled = bool(enable)
+    threads = max(1, thread_count or os.cpu_count() or 1)
+    if not 1 <= compress_level <= 9:
+        raise ValueError(f"Invalid compression level: {compress_level} (expected 1-9)")
+    level = compress_level
+    if directory is not None:
+        path = resolve_path(directory)
+        if not path.is_dir():
+            raise NotADirectoryError(f"Compression directory not found: {path}")
+        spool_dir = str(path)
+    else:
+        spool_dir = None
+    if enabled:
+        print(f"[INFO] Compressing plain read files before upload ({threads} threads, level {level})")
+
+
+def should_compress(file_name: str) -> bool:
+    return enabled and not file_name.endswith(".gz")
+
+
+@dataclass(frozen=True)
+class CompressedRead:
+    path: str
+    size: int
+    sha256: str
+    source_size: int
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _compress_block(data: bytes, zdict: bytes, last: bool, compress_level: int) -> bytes:
+    # Rohes deflate; jeder Block endet byte-aligned (Z_SYNC_FLUSH), nur der letzte mit Z_FINISH.
+    # Mit den letzten 32 KiB des Vorgängers als Dictionary bleibt die Kompressionsrate wie bei einem Stream.
+    if zdict:
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -zlib.MAX_WBITS, 9)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _blocks(f, block_size: int):
+    """Yields (block, is_last) with one block lookahead."""
+    current = f.read(block_size)
+    while True:
+        following = f.read(block_size)
+        yield current, not following
+        if not following:
+            return
+        current = following
+
+
+def compress_read(file_path: str, block_size: int = BLOCK_SIZE, consumers=()) -> CompressedRead:
+    """
+    pigz-style parallel gzip: blocks are deflated in worker threads (zlib releases
+    the GIL), CRC32/ISIZE are computed in the calling thread, and the output is
+    written in order to a spool file while SHA-256 and size are computed in the
+    same pass. The result is one standard gzip member. consumers get the
+    uncompressed blocks (like create_hash).
+    """
+    fd, spool_path = tempfile.mkstemp(prefix="igsupload_", suffix=".fastq.gz", dir=spool_dir)
+    sha256 = hashlib.sha256()
+    size = 0
+    crc = 0
+    source_size = 0
+
+    def write(data: bytes):
+        nonlocal size
+        out.write(data)
+        sha256.update(data)
+        size += len(data)
+
+    try:
+        with os.fdopen(fd, "wb") as out, open_read(file_path, "hash") as f, \
+                ThreadPoolExecutor(max_workers=threads, thread_name_prefix="igsupload-gzip") as pool:
+            write(GZIP_HEADER)
+            pending = deque()
+            zdict = b""
+            for block, last in _blocks(f, block_size):
+                pending.append(pool.submit(_compress_block, block, zdict, last, level))
+                crc = zlib.crc32(block, crc)
+                for consumer in consumers:
+                    consumer.update(block)
+                source_size += len(block)
+                zdict = block[-DICT_SIZE:]
+                if len(pending) > threads * 2:
+                    write(pending.popleft().result())
+                progress.add_hashed(len(block))
+            while pending:
+                write(pending.popleft().result())
+            write(struct.pack("<II", crc & 0xFFFFFFFF, source_size & 0xFFFFFFFF))
+    except BaseException:
+        os.remove(spool_path)
+        raise
+
+    metrics.compressed_bytes.inc(source_size, direction="in")
+    metrics.compressed_bytes.inc(size, direction="out")
+    return CompressedRead(path=spool_path, size=size, sha256=sha256.hexdigest(), source_size=source_size)
@@ -0,0 +1,145 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+# --parallel: Anzahl gleichzeitiger Part-Uploads; None = adaptiv (AIMD) bis max_parallel
+parallel: Optional[int] = None
+max_parallel = 8
+INITIAL_PARALLEL = 2
+# zuletzt eingeschwungener Wert je Upload-Host, Startwert für den nächsten Lauf
+state_path: Optional[str] = None
+
+INCREASE = 1           # additiv, einmal pro Fenster
+DECREASE_FACTOR = 0.5  # multiplikativ bei Fehlern/429
+MIN_GAIN = 0.05        # Durchsatz muss um 5 % steigen, sonst nicht weiter erhöhen
+LATENCY_FACTOR = 2.0   # Part-Latenz deutlich über dem Bestwert: Warteschlange baut sich auf
+COOLDOWN = 1.0         # gleichzeitig fehlschlagende Parts zählen als ein Ereignis
+
+_state_lock = threading.Lock()
+
+
+def set_parallel(value: str, maximum: int = 8, base_dir: Optional[str] = None):
+    """'auto' (adaptive, up to maximum) or a fixed number of concurrent part uploads."""
+    global parallel, max_parallel, state_path
+    if maximum < 1:
+        raise ValueError(f"Invalid maximum parallel uploads: {maximum}")
+    max_parallel = maximum
+    if str(value).lower() == "auto":
+        parallel = None
+    else:
+        try:
+            parallel = int(value)
+        except ValueError:
+            raise ValueError(f"Invalid --parallel value: {value} (expected 'auto' or a number)") from None
+        if parallel < 1:
+            raise ValueError(f"Invalid --parallel value: {value} (expected 'auto' or a number)")
+    state_path = os.path.join(base_dir, "igsupload_concurrency.json") if base_dir else None
+
+
+class AimdController:
+    """
+    Additive-increase/multiplicative-decrease limit for concurrent part uploads.
+    After every window of `limit` finished parts the window throughput is
+    compared with the previous one: +1 while it still improves, -1 if it did not
+    improve and part latency has grown well beyond the best seen (queueing).
+    Errors and 429s halve the limit, at most once per COOLDOWN.
+    """
+
+    def __init__(self, initial: float, maximum: int, minimum: int = 1, fixed: bool = False,
+                 now: Optional[float] = None):
+        self.minimum, self.maximum, self.fixed = minimum, maximum, fixed
+        self.limit = float(min(max(initial, minimum), maximum))
+        self._lock = threading.Lock()
+        self._previous_rate: Optional[float] = None
+        self._best_latency: Optional[float] = None
+        self._last_cut = float("-inf")
+        self._reset_window(time.monotonic() if now is None else now)
+
+    def _reset_window(self, now: float):
+        self._window_start = now
+        self._window_parts = 0
+        self._window_bytes = 0
+        self._window_latency = 0.0
+
+    @property
+    def slots(self) -> int:
+        return max(int(self.limit), self.minimum)
+
+    def on_success(self, nbytes: int, seconds: float, now: Optional[float] = None):
+        if self.fixed:
+            return
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            latency = seconds / max(nbytes, 1)  # Sekunden pro Byte, unabhängig von der Part-Größe
+            if self._best_latency is None or latency < self._best_latency:
+                self._best_latency = latency
+            self._window_parts += 1
+            self._window_bytes += nbytes
+            self._window_latency += latency
+            if self._window_parts < self.slots:
+                return
+            rate = self._window_bytes / max(now - self._window_start, 1e-6)
+            mean_latency = self._window_latency / self._window_parts
+            if self._previous_rate is None or rate > self._previous_rate * (1 + MIN_GAIN):
+                self.limit = min(self.limit + INCREASE, self.maximum)
+            elif mean_latency > self._best_latency * LATENCY_FACTOR:
+                self.limit = max(self.limit - INCREASE, self.minimum)
+            self._previous_rate = rate
+            self._reset_window(now)
+
+    def on_error(self, now: Optional[float] = None):
+        if self.fixed:
+            return
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            if now - self._last_cut < COOLDOWN:
+                return
+            self._last_cut = now
+            self.limit = max(self.limit * DECREASE_FACTOR, self.minimum)
+            self._previous_rate = None
+            self._reset_window(now)
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def _load_state() -> dict:
+    if not state_path:
+        return {}
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def controller_for(url: str) -> AimdController:
+    """Controller for the upload host of url, starting at the value the last run converged to."""
+    if parallel is not None:
+        return AimdController(parallel, parallel, fixed=True)
+    stored = _load_state().get(host_of(url))
+    initial = stored if isinstance(stored, (int, float)) else INITIAL_PARALLEL
+    return AimdController(initial, max_parallel)
+
+
+def save(url: str, controller: AimdController):
+    """Stores the converged limit for the host (atomically, shared by concurrent runs)."""
+    if not state_path or controller.fixed:
+        return
+    with _state_lock:
+        state = _load_state()
+        state[host_of(url)] = round(controller.limit, 2)
+        directory = os.path.dirname(state_path)
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=".igsupload_concurrency_", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, state_path)
+        except OSError as e:
+            print(f"[WARN] Could not save upload concurrency to {state_path}: {e}")
@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import typer
+
+import igsupload.run_store as run_store
+
+# --dedup: identische Read-Dateien (gleicher SHA-256 und Größe) nur einmal hochladen
+#   off:   jede Datei wird hochgeladen (Standard)
+#   run:   innerhalb eines Laufs die schon validierte DocumentReference wiederverwenden
+#   store: zusätzlich über Läufe hinweg aus dem Run-Store
+MODES = ("off", "run", "store")
+mode = "off"
+# store: nur DocumentReferences, die höchstens so lange (Sekunden) vorher validiert wurden. Annahme: der
+# Server hält eine validierte DocumentReference mindestens so lange gültig und erlaubt, sie in weiteren
+# Meldungen zu referenzieren. Geprüft wird das nicht, der Server lehnt sonst die Meldung ab.
+MAX_AGE = 24 * 3600
+max_age = MAX_AGE
+
+_validated: Dict[Tuple[str, int], str] = {}
+_lock = threading.Lock()
+reused_files = 0
+reused_bytes = 0
+
+
+def set_dedup(value: str, max_age_hours: Optional[float] = None):
+    global mode, max_age
+    if value not in MODES:
+        raise ValueError(f"Invalid dedup mode: {value} (expected one of {', '.join(MODES)})")
+    if value == "store" and not run_store.enabled():
+        raise ValueError("--dedup store needs the run store")
+    if max_age_hours is not None and max_age_hours <= 0:
+        raise ValueError(f"Invalid dedup max age: {max_age_hours} (expected hours > 0)")
+    mode = value
+    max_age = MAX_AGE if max_age_hours is None else max_age_hours * 3600
+
+
+def reset():
+    global reused_files, reused_bytes
+    with _lock:
+        _validated.clear()
+        reused_files = reused_bytes = 0
+
+
+def lookup(sha256: str, size: int) -> Optional[str]:
+    """Validated doc_id for identical content, or None if it has to be uploaded."""
+    global reused_files, reused_bytes
+    if mode == "off":
+        return None
+    with _lock:
+        doc_id = _validated.get((sha256, size))
+    if doc_id is None and mode == "store":
+        doc_id = run_store.find_validated(sha256, size, since=time.time() - max_age)
+    if doc_id is not None:
+        with _lock:
+            reused_files += 1
+            reused_bytes += size
+    return doc_id
+
+
+def remember(sha256: str, size: int, doc_id: str):
+    if mode != "off":
+        with _lock:
+            _validated[(sha256, size)] = doc_id
+
+
+def print_summary():
+    if mode == "off" or not reused_files:
+        return
+    typer.echo(f"Deduplicated: {reused_files} file(s), {reused_bytes / 1e6:.1f} MB not uploaded again")
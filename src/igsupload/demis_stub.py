@@ -0,0 +1,463 @@
+"""
+Local stand-in for the DEMIS IGS API, for offline end-to-end and performance tests.
+
+In-process:
+
+    with DemisStub(latency=0.01, validation_delay=0.5) as stub:
+        config.BASE_URL = stub.base_url
+        ...
+
+As a subprocess:
+
+    python -m igsupload.demis_stub --port 8089 --latency 0.02 --bandwidth 50MB/s
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from igsupload.bandwidth import parse_rate
+
+BASE_PATH = "/surveillance/notification-sequence"
+TOKEN_PATH = "/auth/realms/LAB/protocol/openid-connect/token"
+
+@dataclass
+class _Upload:
+    doc_id: str
+    file_hash: str
+    title: Optional[str] = None
+    file_size: int = 0
+    upload_id: Optional[str] = None
+    part_count: int = 0
+    parts: Dict[int, str] = field(default_factory=dict)
+    finished: bool = False
+    validation_started: Optional[float] = None
+    status: Optional[str] = None
+    message: Optional[str] = None
+
+
+class _Bandwidth:
+    """Shared byte budget for all connections (simulates one uplink)."""
+
+    def __init__(self, rate: Optional[float]):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next_free = time.monotonic()
+
+    def consume(self, nbytes: int):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + nbytes / self.rate
+            wait = self._next_free - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+class DemisStub:
+    """
+    Implements token, DocumentReference, s3-upload-info, presigned part PUTs,
+    $finish-upload, $validate, $validation-status and
+    $process-notification-sequence with configurable latency, bandwidth,
+    error rate and validation delay.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        bandwidth=None,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        validation_delay: float = 0.0,
+        part_size: int = 8 * 1024 * 1024,
+        url_expires: int = 3600,
+        accept_gzip: bool = True,
+        verify_hash: bool = True,
+        notification_failures: int = 0,
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.latency = latency
+        self.bandwidth = _Bandwidth(parse_rate(bandwidth))
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.validation_delay = validation_delay
+        self.part_size = part_size
+        self.url_expires = url_expires
+        self.accept_gzip = accept_gzip
+        self.verify_hash = verify_hash
+        self.notification_failures = notification_failures
+        self.random = random.Random(seed)
+        # Uhr für X-Amz-Date und den Ablauf der URLs (Tests setzen eine eigene ein)
+        self.clock = clock
+
+        self.uploads: Dict[str, _Upload] = {}
+        self.notifications: List[dict] = []
+        self.notification_bodies: List[bytes] = []  # jeder Versuch, auch fehlgeschlagene
+        self.request_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._storage = tempfile.mkdtemp(prefix="demis_stub_")
+
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    # --- Lifecycle ---
+    @property
+    def root_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        return self.root_url + BASE_PATH
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self._storage, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Helpers ---
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def _should_fail(self) -> bool:
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def _part_path(self, doc_id: str, part: int) -> str:
+        return os.path.join(self._storage, f"{doc_id}.{part:06d}")
+
+    def _presigned_urls(self, upload: _Upload, part_numbers) -> List[str]:
+        amz_date = datetime.fromtimestamp(self.clock(), timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        return [
+            f"{self.root_url}/s3/{upload.doc_id}/{upload.upload_id}/{n}"
+            f"?X-Amz-Date={amz_date}&X-Amz-Expires={self.url_expires}"
+            for n in part_numbers
+        ]
+
+    def _url_expired(self, query: dict) -> bool:
+        try:
+            issued = datetime.strptime(query["X-Amz-Date"][0], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            expires = int(query["X-Amz-Expires"][0])
+        except (KeyError, ValueError):
+            return True
+        return self.clock() - issued.timestamp() > expires
+
+    def _finish_validation(self, upload: _Upload):
+        if not self.verify_hash:
+            upload.status, upload.message = "VALID", None
+            return
+        sha256 = hashlib.sha256()
+        size = 0
+        for n in range(1, upload.part_count + 1):
+            path = self._part_path(upload.doc_id, n)
+            if not os.path.exists(path):
+                upload.status, upload.message = "INVALID", f"Part {n} missing"
+                return
+            with open(path, "rb") as f:
+                while chunk := f.read(1024 * 1024):
+                    sha256.update(chunk)
+                    size += len(chunk)
+        if sha256.hexdigest() != upload.file_hash:
+            upload.status, upload.message = "INVALID", "Hash does not match"
+        elif size != upload.file_size:
+            upload.status, upload.message = "INVALID", "Size does not match"
+        else:
+            upload.status, upload.message = "VALID", None
+
+    # --- HTTP ---
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _read_body(self) -> bytes:
+                length = int(self.headers.get("Content-Length") or 0)
+                chunks = []
+                while length > 0:
+                    chunk = self.rfile.read(min(length, 64 * 1024))
+                    if not chunk:
+                        break
+                    stub.bandwidth.consume(len(chunk))
+                    chunks.append(chunk)
+                    length -= len(chunk)
+                return b"".join(chunks)
+
+            def _json_body(self):
+                body = self._read_body()
+                if self.headers.get("Content-Encoding") == "gzip":
+                    if not stub.accept_gzip:
+                        return None, 415
+                    body = gzip.decompress(body)
+                self.raw_body = body
+                try:
+                    return json.loads(body or b"null"), None
+                except ValueError:
+                    return None, 400
+
+            def _send(self, status: int, payload=None, headers=None):
+                body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                if payload is not None:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def _dispatch(self, method: str):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                url = urlsplit(self.path)
+                path, query = url.path, parse_qs(url.query)
+
+                if path == TOKEN_PATH and method == "POST":
+                    return self._token()
+                if path.startswith("/s3/") and method == "PUT":
+                    return self._put_part(path, query)
+                if not path.startswith(BASE_PATH):
+                    return self._send(404, {"error": "not found"})
+                path = path[len(BASE_PATH):]
+
+                if path == "/fhir/DocumentReference" and method == "POST":
+                    return self._document_reference()
+                if path == "/fhir/$process-notification-sequence" and method == "POST":
+                    return self._notification()
+                match = re.fullmatch(r"/S3Controller/upload/([^/]+)/(.+)", path)
+                if match:
+                    doc_id, action = match.groups()
+                    upload = stub.uploads.get(doc_id)
+                    if upload is None:
+                        self._read_body()
+                        return self._send(404, {"error": f"unknown DocumentReference {doc_id}"})
+                    if action == "s3-upload-info" and method == "GET":
+                        return self._upload_info(upload, query)
+                    if action == "$finish-upload" and method == "POST":
+                        return self._finish_upload(upload)
+                    if action == "$validate" and method == "POST":
+                        return self._validate(upload)
+                    if action == "$validation-status" and method == "GET":
+                        return self._validation_status(upload)
+                self._read_body()
+                return self._send(404, {"error": "not found"})
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PUT(self):
+                self._dispatch("PUT")
+
+            # --- Endpoints ---
+            def _token(self):
+                stub._count("token")
+                self._read_body()
+                self._send(200, {
+                    "access_token": uuid.uuid4().hex,
+                    "refresh_token": uuid.uuid4().hex,
+                    "expires_in": 600,
+                })
+
+            def _document_reference(self):
+                stub._count("document_reference")
+                payload, error = self._json_body()
+                if error:
+                    return self._send(error, {"error": "invalid body"})
+                try:
+                    attachment = payload["content"][0]["attachment"]
+                    file_hash = attachment["hash"]
+                except (KeyError, IndexError, TypeError):
+                    return self._send(400, {"error": "attachment hash missing"})
+                doc_id = str(uuid.uuid4())
+                with stub._lock:
+                    stub.uploads[doc_id] = _Upload(doc_id=doc_id, file_hash=file_hash, title=attachment.get("title"))
+                self._send(201, {**payload, "id": doc_id})
+
+            def _upload_info(self, upload: _Upload, query: dict):
+                stub._count("upload_info")
+                try:
+                    file_size = int(query["fileSize"][0])
+                except (KeyError, ValueError):
+                    return self._send(400, {"error": "fileSize missing"})
+                with stub._lock:
+                    if upload.upload_id is None or upload.file_size != file_size:
+                        upload.upload_id = uuid.uuid4().hex
+                        upload.file_size = file_size
+                        upload.part_count = max(1, -(-file_size // stub.part_size))
+                        upload.parts.clear()
+                    urls = stub._presigned_urls(upload, range(1, upload.part_count + 1))
+                self._send(200, {
+                    "uploadId": upload.upload_id,
+                    "presignedUrls": urls,
+                    "partSizeBytes": stub.part_size,
+                })
+
+            def _put_part(self, path: str, query: dict):
+                stub._count("put_part")
+                match = re.fullmatch(r"/s3/([^/]+)/([^/]+)/(\d+)", path)
+                body = self._read_body()
+                if not match:
+                    return self._send(404)
+                doc_id, upload_id, part = match.group(1), match.group(2), int(match.group(3))
+                upload = stub.uploads.get(doc_id)
+                if upload is None or upload.upload_id != upload_id:
+                    return self._send(404)
+                if stub._url_expired(query):
+                    return self._send(403)
+                if stub._should_fail():
+                    return self._send(stub.error_status)
+                etag = hashlib.md5(body).hexdigest()
+                if stub.verify_hash:
+                    with open(stub._part_path(doc_id, part), "wb") as f:
+                        f.write(body)
+                with stub._lock:
+                    upload.parts[part] = etag
+                self._send(200, headers={"ETag": f'"{etag}"'})
+
+            def _finish_upload(self, upload: _Upload):
+                stub._count("finish_upload")
+                payload, error = self._json_body()
+                if error:
+                    return self._send(error, {"error": "invalid body"})
+                if stub._should_fail():
+                    return self._send(stub.error_status, {"error": "simulated error"})
+                chunks = (payload or {}).get("completedChunks") or []
+                if (payload or {}).get("uploadId") != upload.upload_id:
+                    return self._send(400, {"error": "unknown uploadId"})
+                expected = {n: upload.parts.get(n) for n in range(1, upload.part_count + 1)}
+                received = {c.get("partNumber"): c.get("eTag") for c in chunks}
+                if received != expected:
+                    return self._send(400, {"error": "completedChunks do not match uploaded parts"})
+                upload.finished = True
+                self._send(204)
+
+            def _validate(self, upload: _Upload):
+                stub._count("validate")
+                self._read_body()
+                if not upload.finished:
+                    return self._send(409, {"error": "upload not finished"})
+                upload.validation_started = time.monotonic()
+                upload.status, upload.message = "VALIDATING", None
+                self._send(204)
+
+            def _validation_status(self, upload: _Upload):
+                stub._count("validation_status")
+                if upload.validation_started is None:
+                    return self._send(200, {"status": "NOT_STARTED", "done": False, "message": None})
+                if upload.status == "VALIDATING":
+                    if time.monotonic() - upload.validation_started < stub.validation_delay:
+                        return self._send(200, {"status": "VALIDATING", "done": False, "message": None})
+                    stub._finish_validation(upload)
+                self._send(200, {"status": upload.status, "done": True, "message": upload.message})
+
+            def _notification(self):
+                stub._count("notification")
+                bundle, error = self._json_body()
+                if error:
+                    return self._send(error, {"error": "invalid body"})
+                with stub._lock:
+                    stub.notification_bodies.append(self.raw_body)
+                    fail_first = stub.notification_failures > 0
+                    stub.notification_failures -= fail_first
+                if fail_first or stub._should_fail():
+                    return self._send(stub.error_status, {"error": "simulated error"})
+                try:
+                    notification_id = bundle["identifier"]["value"]
+                except (KeyError, TypeError):
+                    return self._send(422, {"error": "bundle identifier missing"})
+                lab_sequence_id = None
+                for entry in bundle.get("entry", []):
+                    resource = entry.get("resource", {})
+                    if resource.get("resourceType") == "MolecularSequence":
+                        lab_sequence_id = (resource.get("identifier") or [{}])[0].get("value")
+                with stub._lock:
+                    stub.notifications.append(bundle)
+
+                def param(name, value):
+                    return {"name": name, "valueIdentifier": {"value": value}}
+
+                self._send(200, {
+                    "resourceType": "Parameters",
+                    "parameter": [
+                        param("submitterGeneratedNotificationID", notification_id),
+                        param("transactionID", f"IGS-{uuid.uuid4()}"),
+                        param("labSequenceID", lab_sequence_id),
+                    ]
+                })
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local DEMIS IGS stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--bandwidth", default=None, help="upload cap for all connections, e.g. 50MB/s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a simulated error")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--validation-delay", type=float, default=0.0, help="seconds until validation is done")
+    parser.add_argument("--part-size", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--url-expires", type=int, default=3600, help="presigned URL lifetime in seconds")
+    parser.add_argument("--no-gzip", action="store_true", help="answer 415 to gzip request bodies")
+    parser.add_argument("--no-verify", action="store_true", help="do not store parts / check the hash")
+    parser.add_argument("--notification-failures", type=int, default=0, help="answer the first N notifications with --error-status")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    stub = DemisStub(
+        host=args.host, port=args.port, latency=args.latency, bandwidth=args.bandwidth,
+        error_rate=args.error_rate, error_status=args.error_status,
+        validation_delay=args.validation_delay, part_size=args.part_size,
+        url_expires=args.url_expires, accept_gzip=not args.no_gzip,
+        verify_hash=not args.no_verify, notification_failures=args.notification_failures, seed=args.seed,
+    )
+    print(f"BASE_URL={stub.base_url}", flush=True)
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+        shutil.rmtree(stub._storage, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
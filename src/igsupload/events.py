@@ -0,0 +1,104 @@
+import atexit
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import igsupload.timing as timing
+from igsupload.igsupload_logger import resolve_path
+
+# --quiet: nur Zusammenfassungen und Fehler auf der Konsole
+quiet = False
+# --event-log: strukturierte Events als JSON lines
+event_log_path: Optional[str] = None
+FLUSH_INTERVAL = 1.0
+
+_file = None
+_last_flush = 0.0
+_lock = threading.Lock()
+_dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str).encode
+
+
+def set_quiet(enabled: bool):
+    global quiet
+    quiet = bool(enabled)
+
+
+def set_event_log(path: Optional[Path]):
+    """
+    Opens the JSON-lines event log (appending, so cron runs can share one file)
+    and subscribes it to the timing spans: every finished stage becomes one event.
+    """
+    global event_log_path, _file
+    close()
+    if path is None:
+        event_log_path = None
+        return
+    resolved = resolve_path(path)
+    if not resolved.parent.is_dir():
+        raise NotADirectoryError(f"Event log directory not found: {resolved.parent}")
+    event_log_path = str(resolved)
+    _file = open(event_log_path, "a", encoding="utf-8", buffering=1024 * 1024)
+    if _on_span not in timing.listeners:
+        timing.listeners.append(_on_span)
+    atexit.register(close)
+
+
+def flush():
+    with _lock:
+        if _file is not None:
+            _file.flush()
+
+
+def close():
+    global _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+            _file = None
+    if _on_span in timing.listeners:
+        timing.listeners.remove(_on_span)
+
+
+def emit(level: str, stage: str, message: Optional[str] = None, **fields):
+    """
+    Writes one event {ts, level, stage, sample, file, doc_id, bytes, duration, ...}.
+    sample/file/doc_id are taken from the current timing context. No-op without --event-log.
+    """
+    if _file is None:
+        return
+    event = {"ts": round(time.time(), 3), "level": level, "stage": stage, **timing.current_context(), **fields}
+    if message is not None:
+        event["message"] = message
+    _write(event)
+
+
+_SPAN_INTERNAL = frozenset(("stage", "seconds", "cpu_seconds", "start"))
+
+
+def _on_span(record: dict):
+    event = {
+        "ts": round(time.time(), 3),
+        "level": "error" if "error" in record else "info",
+        "stage": record["stage"],
+        "duration": round(record["seconds"], 6),
+    }
+    for key, value in record.items():
+        if key not in _SPAN_INTERNAL:
+            event[key] = value
+    _write(event)
+
+
+def _write(event: dict):
+    global _last_flush
+    line = _dumps(event) + "\n"
+    with _lock:
+        if _file is None:
+            return
+        _file.write(line)
+        # Fehler sofort, sonst höchstens einmal pro FLUSH_INTERVAL auf die Platte
+        now = time.monotonic()
+        if event["level"] == "error" or now - _last_flush >= FLUSH_INTERVAL:
+            _file.flush()
+            _last_flush = now
@@ -1,10 +1,11 @@
 import csv
 from dataclasses import dataclass
-from typing import List
+from operator import itemgetter
+from typing import Iterator, List
 
 header = ["MELDETATBESTAND","SPECIES_CODE","SPECIES","LAB_SEQUENCE_ID","DEMIS_NOTIFICATION_ID","STATUS","DATE_OF_SAMPLING","DATE_OF_RECEIVING","DATE_OF_SEQUENCING","SEQUENCING_INSTRUMENT","SEQUENCING_PLATFORM","ADAPTER","PRIMER_SCHEME","SEQUENCING_STRATEGY","ISOLATION_SOURCE_CODE","ISOLATION_SOURCE","HOST_SEX","HOST_BIRTH_MONTH","HOST_BIRTH_YEAR","SEQUENCING_REASON","GEOGRAPHIC_LOCATION","ISOLATE","AUTHOR","NAME_AMP_PROTOCOL","PRIME_DIAGNOSTIC_LAB.DEMIS_LAB_ID","PRIME_DIAGNOSTIC_LAB.NAME","PRIME_DIAGNOSTIC_LAB.ADDRESS","PRIME_DIAGNOSTIC_LAB.POSTAL_CODE","PRIME_DIAGNOSTIC_LAB.CITY","PRIME_DIAGNOSTIC_LAB.FEDERAL_STATE","PRIME_DIAGNOSTIC_LAB.COUNTRY","PRIME_DIAGNOSTIC_LAB.EMAIL","SEQUENCING_LAB.DEMIS_LAB_ID","SEQUENCING_LAB.NAME","SEQUENCING_LAB.ADDRESS","SEQUENCING_LAB.POSTAL_CODE","SEQUENCING_LAB.CITY","SEQUENCING_LAB.FEDERAL_STATE","SEQUENCING_LAB.COUNTRY","SEQUENCING_LAB.EMAIL","REPOSITORY_NAME","REPOSITORY_LINK","REPOSITORY_ID","UPLOAD_DATE","UPLOAD_STATUS","UPLOAD_SUBMITTER","FILE_1_NAME","FILE_1_SHA256SUM","FILE_2_NAME","FILE_2_SHA256SUM"]
 
-@dataclass
+@dataclass(slots=True)
 class CsvRow:
     MELDETATBESTAND: str
     SPECIES_CODE: str
@@ -58,18 +59,48 @@ class CsvRow:
     FILE_2_SHA256SUM: str
 
 
-def read_csv(csv_path: str) -> List[CsvRow]:
+def _compile_columns(file_header: List[str]) -> tuple:
+    """
+    Maps every CsvRow field (in header order) to its column index in the file.
+    Missing columns map to None; for duplicate names the last column wins,
+    like csv.DictReader.
+    """
+    position = {name: index for index, name in enumerate(file_header)}
+    return tuple(position.get(field) for field in header)
+
+
+def iter_csv(csv_path: str) -> Iterator[CsvRow]:
+    """
+    Streams the metadata CSV row by row. The header -> attribute mapping is
+    compiled once, so each record is turned into a CsvRow without building
+    an intermediate dict.
+    """
     with open(csv_path, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=';')
-        rows = []
-        for r in reader:
-            cleaned = {}
-            for field in header:
-                val = r.get(field, "")
-                if val is None:
-                    val = ""
-                else:
-                    val = str(val).strip()
-                cleaned[field.replace('.','_')] = val
-            rows.append(CsvRow(**cleaned))
-        return rows
+        reader = csv.reader(csvfile, delimiter=';')
+        file_header = next(reader, None)
+        if file_header is None:
+            return
+
+        columns = _compile_columns(file_header)
+        if None in columns:
+            getter, min_length = None, 0
+        else:
+            getter, min_length = itemgetter(*columns), max(columns) + 1
+        strip = str.strip
+
+        for record in reader:
+            if not record:
+                continue
+            if getter is not None and len(record) >= min_length:
+                yield CsvRow(*map(strip, getter(record)))
+                continue
+            # Kurze Zeile oder fehlende Spalte -> wie DictReader mit ""
+            length = len(record)
+            yield CsvRow(*[
+                strip(record[index]) if index is not None and index < length else ""
+                for index in columns
+            ])
+
+
+def read_csv(csv_path: str) -> List[CsvRow]:
+    return list(iter_csv(csv_path))
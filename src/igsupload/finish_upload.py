@@ -1,6 +1,8 @@
 import typer
 import requests
 import igsupload.config as config
+from igsupload.serialization import post_json
+import igsupload.events as events
 
 
 def post_upload_body(doc_id, complete_upload_body, token):
@@ -10,16 +12,18 @@ def post_upload_body(doc_id, complete_upload_body, token):
       "Content-Type": "application/json"
     }
 
-    response = requests.post(
+    response = post_json(
         f"{config.BASE_URL}/S3Controller/upload/{doc_id}/$finish-upload",
-        headers=headers,
-        json=complete_upload_body,
+        complete_upload_body,
+        headers,
+        stage="post_upload_body",
         cert=(config.CERT, config.KEY)
     )
 
     if response.status_code == 204:
-      msg = f"Upload was {typer.style('successful', fg=typer.colors.GREEN)}."
-      print(msg)
+      if not events.quiet:
+        msg = f"Upload was {typer.style('successful', fg=typer.colors.GREEN)}."
+        print(msg)
       return
 
     msg = f"{typer.style('Fehler', fg=typer.colors.RED)} beim Upload: {response.status_code}"
@@ -1,6 +1,12 @@
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
 import typer
 import igsupload.config as config
 import requests
+import igsupload.events as events
+import igsupload.metrics as metrics
 
 def get_presigned_url(token, doc_id, file_in_bytes):
   try:
@@ -18,7 +24,8 @@ def get_presigned_url(token, doc_id, file_in_bytes):
     
     if response.status_code == 200:
       result = response.json()
-      print(f"GET request {typer.style('successful', fg=typer.colors.GREEN)}")
+      if not events.quiet:
+        print(f"GET request {typer.style('successful', fg=typer.colors.GREEN)}")
       return result.get("uploadId"), result.get("presignedUrls"), result.get("partSizeBytes")
 
     print(f"{typer.style('Error', fg=typer.colors.RED)} during upload: {response.status_code}")
@@ -45,4 +52,76 @@ def get_presigned_url(token, doc_id, file_in_bytes):
     print(e)
 
 
-  
\ No newline at end of file
+  
+# URLs so rechtzeitig erneuern, dass ein Part-Upload nicht mitten im Transfer abläuft
+# (höchstens REFRESH_MARGIN Sekunden bzw. ein Zehntel der Gültigkeit vor Ablauf)
+REFRESH_MARGIN = 120
+# Uhr für den Ablauf der URLs (Tests setzen eine eigene ein)
+clock = time.time
+
+def url_expiry(url):
+  """Unix time at which a presigned S3 URL expires (X-Amz-Date + X-Amz-Expires), None if unknown."""
+  validity = _validity(url)
+  return validity[0] + validity[1] if validity else None
+
+def _validity(url):
+  query = parse_qs(urlsplit(url).query)
+  try:
+    issued = datetime.strptime(query["X-Amz-Date"][0], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+    return issued.timestamp(), int(query["X-Amz-Expires"][0])
+  except (KeyError, IndexError, ValueError):
+    return None
+
+def _refresh_at(url):
+  validity = _validity(url)
+  if validity is None:
+    return None
+  issued, seconds = validity
+  return issued + seconds - min(REFRESH_MARGIN, seconds / 10)
+
+class PresignedUrls:
+  """
+  Part URLs of one multipart upload with their expiry. get() re-fetches fresh
+  URLs for the remaining parts shortly before they expire, renew() after a 403;
+  the upload id has to stay the same, so the multipart upload is continued.
+  """
+
+  def __init__(self, urls, upload_id=None, refresh=None):
+    self.urls = list(urls or [])
+    self.upload_id = upload_id
+    self._refresh = refresh
+    self._refresh_at = [_refresh_at(url) for url in self.urls]
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    return len(self.urls)
+
+  def __getitem__(self, index):
+    return self.urls[index]
+
+  def get(self, part_number):
+    refresh_at = self._refresh_at[part_number - 1]
+    if refresh_at is not None and clock() >= refresh_at:
+      self.renew(self.urls[part_number - 1])
+    return self.urls[part_number - 1]
+
+  def renew(self, stale_url):
+    """Fetches new URLs unless another part already did since stale_url was handed out; True if fresh URLs exist."""
+    with self._lock:
+      if stale_url not in self.urls:
+        return True
+      if self._refresh is None:
+        return False
+      result = self._refresh()
+      if not result:
+        return False
+      upload_id, urls, _ = result
+      if (self.upload_id and upload_id != self.upload_id) or len(urls or []) != len(self.urls):
+        print(f"{typer.style('Error', fg=typer.colors.RED)} refreshing upload URLs: the server started a new upload")
+        return False
+      self.urls = list(urls)
+      self._refresh_at = [_refresh_at(url) for url in self.urls]
+      metrics.presigned_url_refreshes.inc()
+      if not events.quiet:
+        print(f"Upload URLs {typer.style('refreshed', fg=typer.colors.GREEN)}")
+      return True
@@ -1,6 +1,8 @@
 import typer
 import requests
 import igsupload.config as config
+import igsupload.metrics as metrics
+import igsupload.events as events
 import time
 import threading
 from urllib.parse import urlparse
@@ -38,11 +40,15 @@ def get_token(refresh_token=None):
             cert=(config.CERT, config.KEY)
         )
 
+        grant = data["grant_type"]
         if response.status_code == 200:
+            metrics.token_refreshes.inc(grant=grant, result="ok")
             result = response.json()
-            print(f"Token request was {typer.style('successfull', fg=typer.colors.GREEN)} and the token {typer.style('created', fg=typer.colors.GREEN)}")
+            if not events.quiet:
+                print(f"Token request was {typer.style('successfull', fg=typer.colors.GREEN)} and the token {typer.style('created', fg=typer.colors.GREEN)}")
             return result.get("access_token"), result.get("refresh_token")
 
+        metrics.token_refreshes.inc(grant=grant, result="failed")
         print(f"{typer.style('Error', fg=typer.colors.RED)} during token request: {response.status_code}")
         try:
             error_json = response.json()
@@ -55,11 +61,13 @@ def get_token(refresh_token=None):
 
 
     except requests.exceptions.SSLError as ssl_err:
+        metrics.token_refreshes.inc(grant=data["grant_type"], result="failed")
         msg = f"{typer.style('SSL-Error', fg=typer.colors.RED)} (wrong certificate?):"
         print(msg)
         print(ssl_err)
 
     except requests.exceptions.RequestException as e:
+        metrics.token_refreshes.inc(grant=data["grant_type"], result="failed")
         msg = f"{typer.style('Network-/Connectionerror', fg=typer.colors.RED)}:"
         print(msg)
         print(e)
@@ -70,6 +78,7 @@ def get_token(refresh_token=None):
 def update_token():
     global current_token, refresh_token
     while True:
-        print(f"New Token is {typer.style('created', fg=typer.colors.GREEN)}...")
+        if not events.quiet:
+            print(f"New Token is {typer.style('created', fg=typer.colors.GREEN)}...")
         current_token, refresh_token = get_token(refresh_token)
         time.sleep(580)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import queue
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import typer
+
+# --gzip-check/--no-gzip-check: CRC32/ISIZE jeder .gz-Datei beim Hashen prüfen (Standard: an)
+enabled = True
+
+BATCH_SIZE = 1024 * 1024  # Chunks sammeln, damit die Queue nicht pro 8 KB angefasst wird
+QUEUE_DEPTH = 8
+
+# (file name, result) of the current run, for the summary
+results: List[Tuple[str, "GzipResult"]] = []
+_lock = threading.Lock()
+
+
+def set_gzip_check(enable: bool):
+    global enabled
+    enabled = bool(enable)
+
+
+@dataclass
+class GzipResult:
+    members: int = 0
+    compressed_size: int = 0
+    uncompressed_size: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class GzipVerifier:
+    """
+    Consumer for create_hash(): decompresses the fed bytes in a worker thread
+    (zlib releases the GIL), so the CRC32/ISIZE trailer of every gzip member is
+    verified in the same read pass as the digest. Multi-member files (pigz, cat)
+    are supported. sink optionally gets the decompressed bytes (e.g. reads_check).
+    """
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.result = GzipResult()
+        self._batch: List[bytes] = []
+        self._batch_size = 0
+        self._queue = queue.Queue(maxsize=QUEUE_DEPTH)
+        self._thread = threading.Thread(target=self._run, name="igsupload-gzip-check", daemon=True)
+        self._thread.start()
+
+    def update(self, data: bytes):
+        self._batch.append(bytes(data))
+        self._batch_size += len(data)
+        if self._batch_size >= BATCH_SIZE:
+            self._flush()
+
+    def finish(self) -> GzipResult:
+        if not self._thread.is_alive():
+            return self.result
+        self._flush()
+        self._queue.put(None)
+        self._thread.join()
+        return self.result
+
+    def _flush(self):
+        if self._batch:
+            self._queue.put(b"".join(self._batch))
+            self._batch, self._batch_size = [], 0
+
+    def _run(self):
+        inflate = zlib.decompressobj(wbits=31)
+        in_member = False
+        result = self.result
+        while (data := self._queue.get()) is not None:
+            result.compressed_size += len(data)
+            if result.error:
+                continue  # nur noch leerlaufen lassen
+            try:
+                while data:
+                    if not in_member and not data.startswith(b"\x1f\x8b"[:len(data)]):
+                        # Null-Padding hinter dem letzten Member tolerieren wie gzip selbst
+                        if not result.members:
+                            result.error = "not a gzip file"
+                        elif data.strip(b"\x00"):
+                            result.error = "trailing garbage after gzip data"
+                        break
+                    in_member = True
+                    out = inflate.decompress(data)
+                    result.uncompressed_size += len(out)
+                    if self.sink is not None:
+                        self.sink.update(out)
+                    if not inflate.eof:
+                        break
+                    in_member = False
+                    result.members += 1
+                    data = inflate.unused_data
+                    inflate = zlib.decompressobj(wbits=31)
+            except zlib.error as e:
+                result.error = _describe(e)
+            except Exception as e:
+                # der Producer darf nie an einer vollen Queue hängen bleiben
+                result.error = f"gzip check failed: {e}"
+        if not result.error and (in_member or not result.members):
+            result.error = "truncated gzip stream"
+
+
+def _describe(error: zlib.error) -> str:
+    message = str(error)
+    if "incorrect data check" in message:
+        return "CRC32 mismatch"
+    if "incorrect length check" in message:
+        return "ISIZE mismatch"
+    return f"invalid gzip data: {message}"
+
+
+def reset():
+    with _lock:
+        results.clear()
+
+
+def record(file_name: str, result: GzipResult):
+    with _lock:
+        results.append((file_name, result))
+
+
+def print_summary():
+    if not results:
+        return
+    typer.secho("\nGzip check", bold=True)
+    typer.echo(f"{'file':<40}{'members':>9}{'compressed':>14}{'uncompressed':>14}  result")
+    for file_name, result in results:
+        status = (
+            typer.style("OK", fg=typer.colors.GREEN) if result.ok
+            else typer.style(result.error, fg=typer.colors.RED)
+        )
+        typer.echo(
+            f"{file_name:<40}{result.members:>9}{result.compressed_size:>14,}"
+            f"{result.uncompressed_size:>14,}  {status}"
+        )
@@ -1,15 +1,39 @@
+import hashlib
+import json
+import time
 import uuid
 import re
+import threading
 import requests
 import typer
+from dataclasses import astuple
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from functools import lru_cache
 
 import igsupload.config as config
 import igsupload.get_token as token_module
+import igsupload.metrics as metrics
+import igsupload.run_store as run_store
 from igsupload.extract_csv import CsvRow
+from igsupload.igsupload_logger import extract_param
+from igsupload.serialization import post_json, encode_json
 
 IGS_SPEC_BASE = "https://demis.rki.de/fhir/igs"
 
+# --deterministic-ids: Ressourcen-IDs als UUIDv5 aus DEMIS_NOTIFICATION_ID und Rolle statt uuid4
+deterministic_ids = False
+
+# Wiederholungen nach Netzwerkfehlern/5xx senden exakt dieselben Bytes
+NOTIFICATION_RETRIES = 2
+RETRY_BACKOFF = 1.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def set_deterministic_ids(enabled: bool):
+    global deterministic_ids
+    deterministic_ids = bool(enabled)
+
 
 def _fhir_base() -> str:
     if not config.BASE_URL:
@@ -18,19 +42,26 @@ def _fhir_base() -> str:
 
 
 def _nz(value):
+    if value.__class__ is str:
+        return value.strip() or None
     if value is None:
         return None
     s = str(value).strip()
     return s if s else None
 
 
-def _fmt_date_or_datetime(value: str) -> str | None:
-    v = _nz(value)
-    if not v:
-        return None
-    if re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])(-([0-2]\d|3[01]))?", v):
+_ISO_DATE = re.compile(r"\d{4}-(0[1-9]|1[0-2])(-([0-2]\d|3[01]))?")
+_GERMAN_DATE = re.compile(r"\d{2}\.\d{2}\.\d{4}")
+_BIRTH_YEAR = re.compile(r"(19|20)\d{2}")
+_BIRTH_MONTH = re.compile(r"(0[1-9]|1[0-2])")
+_DIGITS = re.compile(r"\d+")
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(v: str) -> str | None:
+    if _ISO_DATE.fullmatch(v):
         return v
-    if re.fullmatch(r"\d{2}\.\d{2}\.\d{4}", v):
+    if _GERMAN_DATE.fullmatch(v):
         try:
             dt = datetime.strptime(v, "%d.%m.%Y").date()
             return dt.isoformat()
@@ -39,14 +70,21 @@ def _fmt_date_or_datetime(value: str) -> str | None:
     return None
 
 
+def _fmt_date_or_datetime(value: str) -> str | None:
+    v = _nz(value)
+    if not v:
+        return None
+    return _parse_date(v)
+
+
 def _fmt_birth_year_month(year: str, month: str) -> str | None:
     y = _nz(year)
     m = _nz(month)
     if not y or not m:
         return None
-    if not re.fullmatch(r"(19|20)\d{2}", y):
+    if not _BIRTH_YEAR.fullmatch(y):
         return None
-    if not re.fullmatch(r"(0[1-9]|1[0-2])", m):
+    if not _BIRTH_MONTH.fullmatch(m):
         return None
     return f"{y}-{m}"
 
@@ -56,35 +94,8 @@ def _valid_email(e: str) -> bool:
     return bool(s and "@" in s and "." in s.split("@")[-1])
 
 
-def _prune(obj):
-    if isinstance(obj, dict):
-        cleaned = {}
-        for k, v in obj.items():
-            v_clean = _prune(v)
-            if v_clean is None:
-                continue
-            if v_clean == "":
-                continue
-            if isinstance(v_clean, (list, dict)) and not v_clean:
-                continue
-            cleaned[k] = v_clean
-        return cleaned
-    if isinstance(obj, list):
-        cleaned_list = []
-        for v in obj:
-            v_clean = _prune(v)
-            if v_clean is None:
-                continue
-            if v_clean == "":
-                continue
-            if isinstance(v_clean, (list, dict)) and not v_clean:
-                continue
-            cleaned_list.append(v_clean)
-        return cleaned_list
-    return obj
-
-
 VALID_GENDERS = {"male", "female", "other", "unknown"}
+VALID_REPOSITORIES = {"gisaid", "ena", "sra", "pubmlst", "genbank", "other"}
 SNOMED_UPLOAD_STATUS = {
     "accepted": "385645004",
     "planned": "397943006",
@@ -99,550 +110,613 @@ SEQ_REASON_TO_SNOMED = {
 }
 
 
+# --- Statisches Gerüst: wird einmal beim Import gebaut und von allen Bundles geteilt ---
+SNOMED = "http://snomed.info/sct"
+LAB_ID_SYSTEM = "https://demis.rki.de/fhir/NamingSystem/DemisLaboratoryId"
+NOTIFICATION_ID_SYSTEM = "https://demis.rki.de/fhir/NamingSystem/NotificationId"
+NOTIFICATION_BUNDLE_ID_SYSTEM = "https://demis.rki.de/fhir/NamingSystem/NotificationBundleId"
+ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, NOTIFICATION_BUNDLE_ID_SYSTEM)
+
+
+def resource_id(notification_id: str, role: str) -> str:
+    """Deterministic id of a bundle resource: UUIDv5 of the notification id and the resource role."""
+    return str(uuid.uuid5(ID_NAMESPACE, f"{notification_id}/{role}"))
+
+
+def _meta(profile: str) -> dict:
+    return {"profile": [profile]}
+
+
+_META_BUNDLE_PROFILE = ["https://demis.rki.de/fhir/igs/StructureDefinition/NotificationBundleSequence"]
+_META_COMPOSITION = _meta("https://demis.rki.de/fhir/igs/StructureDefinition/NotificationSequence")
+_META_PATIENT = _meta("https://demis.rki.de/fhir/StructureDefinition/NotifiedPersonNotByName")
+_META_NOTIFIER_ROLE = _meta("https://demis.rki.de/fhir/StructureDefinition/NotifierRole")
+_META_NOTIFIER_FACILITY = _meta("https://demis.rki.de/fhir/StructureDefinition/NotifierFacility")
+_META_SUBMITTING_ROLE = _meta("https://demis.rki.de/fhir/StructureDefinition/SubmittingRole")
+_META_SUBMITTING_FACILITY = _meta("https://demis.rki.de/fhir/StructureDefinition/SubmittingFacility")
+_META_SPECIMEN = _meta("https://demis.rki.de/fhir/igs/StructureDefinition/SpecimenSequence")
+_META_DEVICE = _meta("https://demis.rki.de/fhir/igs/StructureDefinition/SequencingDevice")
+_META_ADAPTER = _meta("https://demis.rki.de/fhir/igs/StructureDefinition/AdapterSubstance")
+_META_PRIMER = _meta("https://demis.rki.de/fhir/igs/StructureDefinition/PrimerSubstance")
+_META_SEQUENCE = _meta("https://demis.rki.de/fhir/igs/StructureDefinition/Sequence")
+_META_OBSERVATION = _meta("https://demis.rki.de/fhir/igs/StructureDefinition/PathogenDetectionSequence")
+_META_DIAGNOSTIC_REPORT = _meta("https://demis.rki.de/fhir/igs/StructureDefinition/LaboratoryReportSequence")
+
+_COMPOSITION_TYPE = {"coding": [{"system": "http://loinc.org", "code": "34782-3", "display": "Infectious disease Note"}]}
+_LABORATORY_REPORT = {"coding": [{"system": "http://loinc.org", "code": "11502-2", "display": "Laboratory report"}]}
+_NOTIFICATION_ID_WITHOUT_VALUE = {"system": NOTIFICATION_ID_SYSTEM}
+_NOTIFIER_TYPE = [{
+    "coding": [{
+        "system": "https://demis.rki.de/fhir/CodeSystem/organizationType",
+        "code": "refLab",
+        "display": "Einrichtung der Spezialdiagnostik"
+    }]
+}]
+_ADDRESS_USE_PRIMARY = [{
+    "url": "https://demis.rki.de/fhir/StructureDefinition/AddressUse",
+    "valueCoding": {
+        "system": "https://demis.rki.de/fhir/CodeSystem/addressUse",
+        "code": "primary"
+    }
+}]
+_PATIENT_ADDRESS_WITHOUT_POSTAL_CODE = [{"extension": _ADDRESS_USE_PRIMARY}]
+_ADAPTER_CODE = {"coding": [{
+    "system": "https://demis.rki.de/fhir/igs/CodeSystem/sequencingSubstances",
+    "code": "adapter", "display": "Adapter Sequence"
+}]}
+_PRIMER_CODE = {"coding": [{
+    "system": "https://demis.rki.de/fhir/igs/CodeSystem/sequencingSubstances",
+    "code": "primer", "display": "Primer Sequence"
+}]}
+_SEQUENCING_STRATEGY_SYSTEM = "https://demis.rki.de/fhir/igs/CodeSystem/sequencingStrategy"
+_SEQUENCING_PLATFORM_SYSTEM = "https://demis.rki.de/fhir/igs/CodeSystem/sequencingPlatform"
+_ISOLATE_URL = "https://demis.rki.de/fhir/igs/StructureDefinition/Isolate"
+_UPLOAD_STATUS_EXTENSIONS = {
+    code: {
+        "url": "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceUploadStatus",
+        "valueCoding": {"system": SNOMED, "code": code}
+    }
+    for code in SNOMED_UPLOAD_STATUS.values()
+}
+_UPLOAD_DATE_URL = "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceUploadDate"
+_UPLOAD_SUBMITTER_URL = "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceUploadSubmitter"
+_SEQUENCE_AUTHOR_URL = "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceAuthor"
+_SEQUENCING_REASON_URL = "https://demis.rki.de/fhir/igs/StructureDefinition/SequencingReason"
+_SEQUENCE_DOCUMENT_REFERENCE_URL = "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceDocumentReference"
+_OBSERVATION_CATEGORY = [{"coding": [{"system": "http://terminology.hl7.org/CodeSystem/observation-category", "code": "laboratory"}]}]
+_OBSERVATION_CODE = {"coding": [{
+    "system": "http://loinc.org",
+    "code": "41852-5",
+    "display": "Microorganism or agent identified in Specimen",
+}]}
+_OBSERVATION_INTERPRETATION = [{"coding": [{"system": "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation", "code": "POS"}]}]
+_OBSERVATION_METHOD = {"coding": [{"system": SNOMED, "code": "117040002", "display": "Nucleic acid sequencing (procedure)"}]}
+_NOTIFICATION_CATEGORY_SYSTEM = "https://demis.rki.de/fhir/CodeSystem/notificationCategory"
+_CONCLUSION_CODE = [{
+    "coding": [{
+        "system": "https://demis.rki.de/fhir/CodeSystem/conclusionCode",
+        "code": "pathogenDetected",
+        "display": "Meldepflichtiger Erreger nachgewiesen"
+    }]
+}]
+
+
+def _substance(substance_id: str, meta: dict, code: dict, description: str | None) -> dict:
+    resource = {"resourceType": "Substance", "id": substance_id, "meta": meta, "code": code}
+    if description:
+        resource["description"] = description
+    return {"fullUrl": f"{IGS_SPEC_BASE}/Substance/{substance_id}", "resource": resource}
+
+
 def build_notification_bundle(row: CsvRow, doc_ids: [str]) -> dict:
+    """
+    Baut das IGS-Meldungsbundle für eine CSV-Zeile.
+    Konstante Teile sind vorberechnet und werden geteilt, es werden nur nicht-leere
+    Felder erzeugt (kein nachträgliches Prunen). Das Ergebnis nur lesen, nicht verändern.
+    """
     now_iso = datetime.now(timezone.utc).isoformat()
-    patient_id = str(uuid.uuid4())
-    organization_id = str(uuid.uuid4())
-    practitioner_role_id = str(uuid.uuid4())
-
-    # --- Adapter-Parsing ---
-    adapter1, adapter2 = ("", "")
-    if _nz(row.ADAPTER):
-        split_adapters = row.ADAPTER.split("+", 1)
-        adapter1 = split_adapters[0].strip()
-        adapter2 = split_adapters[1].strip() if len(split_adapters) > 1 else ""
+    notification_id = row.DEMIS_NOTIFICATION_ID
+    has_notification_id = notification_id is not None and notification_id != ""
+    if deterministic_ids and has_notification_id:
+        # gleiche Zeile -> gleiche IDs, Wiederholungen sind vergleichbar
+        def new_id(role):
+            return resource_id(notification_id, role)
+    else:
+        uuid4 = uuid.uuid4
+
+        def new_id(role):
+            return str(uuid4())
+    patient_id = new_id("patient")
+    organization_id = new_id("notifier-facility")
+    practitioner_role_id = new_id("notifier-role")
+    submitting_org_id = new_id("submitting-facility")
+    submitting_role_id = new_id("submitting-role")
+    adapter1_id = new_id("adapter-1")
+    adapter2_id = new_id("adapter-2")
+    primer_id = new_id("primer")
+    specimen_id = new_id("specimen")
+    device_id = new_id("device")
+    observation_id = new_id("observation")
+    diagnostic_report_id = new_id("diagnostic-report")
+    sequence_id = new_id("sequence")
+
+    patient_ref = {"reference": f"Patient/{patient_id}"}
+    specimen_ref = {"reference": f"Specimen/{specimen_id}"}
+    device_ref = {"reference": f"Device/{device_id}"}
+    status = _nz(row.STATUS) or "final"
 
     # --- Notifier/Sequenzierlabor ---
-    org_identifier_value = _nz(row.SEQUENCING_LAB_DEMIS_LAB_ID)
-    org_name = _nz(row.SEQUENCING_LAB_NAME) or "Unknown laboratory"
-    org_email = row.SEQUENCING_LAB_EMAIL if _valid_email(row.SEQUENCING_LAB_EMAIL) else "noreply@example.org"
-    org_address_line = _nz(row.SEQUENCING_LAB_ADDRESS) or "Unknown street 1"
-    org_city = _nz(row.SEQUENCING_LAB_CITY) or "Unbekannt"
-    org_postal = _nz(row.SEQUENCING_LAB_POSTAL_CODE) or "00000"
-    org_state = _nz(row.SEQUENCING_LAB_FEDERAL_STATE) or "DE-XX"
-
     org_resource = {
-        'resourceType': 'Organization',
-        'id': organization_id,
-        'meta': {'profile': ['https://demis.rki.de/fhir/StructureDefinition/NotifierFacility']},
-        **({
-            'identifier': [{
-                'system': 'https://demis.rki.de/fhir/NamingSystem/DemisLaboratoryId',
-                'value': org_identifier_value
-            }]
-        } if org_identifier_value else {}),
-        "type": [{
-            "coding": [{
-                "system": "https://demis.rki.de/fhir/CodeSystem/organizationType",
-                "code": "refLab",
-                "display": "Einrichtung der Spezialdiagnostik"
-            }]
-        }],
-        'name': org_name,
-        "telecom": [{"system": "email", "value": org_email, "use": "work"}],
-        'address': [{
-            'line': [org_address_line],
-            'city': org_city,
-            'postalCode': org_postal,
-            'country': 'DE',
-            "state": org_state,
-        }]
-    }
-
-    org_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/Organization/{organization_id}',
-        'resource': org_resource
+        "resourceType": "Organization",
+        "id": organization_id,
+        "meta": _META_NOTIFIER_FACILITY,
     }
+    org_identifier_value = _nz(row.SEQUENCING_LAB_DEMIS_LAB_ID)
+    if org_identifier_value:
+        org_resource["identifier"] = [{"system": LAB_ID_SYSTEM, "value": org_identifier_value}]
+    org_resource["type"] = _NOTIFIER_TYPE
+    org_resource["name"] = _nz(row.SEQUENCING_LAB_NAME) or "Unknown laboratory"
+    org_email = row.SEQUENCING_LAB_EMAIL if _valid_email(row.SEQUENCING_LAB_EMAIL) else "noreply@example.org"
+    org_resource["telecom"] = [{"system": "email", "value": org_email, "use": "work"}]
+    org_resource["address"] = [{
+        "line": [_nz(row.SEQUENCING_LAB_ADDRESS) or "Unknown street 1"],
+        "city": _nz(row.SEQUENCING_LAB_CITY) or "Unbekannt",
+        "postalCode": _nz(row.SEQUENCING_LAB_POSTAL_CODE) or "00000",
+        "country": "DE",
+        "state": _nz(row.SEQUENCING_LAB_FEDERAL_STATE) or "DE-XX",
+    }]
 
+    org_entry = {"fullUrl": f"{IGS_SPEC_BASE}/Organization/{organization_id}", "resource": org_resource}
     practitioner_role_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/PractitionerRole/{practitioner_role_id}',
-        'resource': {
-            'resourceType': 'PractitionerRole',
-            'id': practitioner_role_id,
-            'meta': {'profile': ['https://demis.rki.de/fhir/StructureDefinition/NotifierRole']},
-            'organization': {'reference': f'Organization/{organization_id}'}
+        "fullUrl": f"{IGS_SPEC_BASE}/PractitionerRole/{practitioner_role_id}",
+        "resource": {
+            "resourceType": "PractitionerRole",
+            "id": practitioner_role_id,
+            "meta": _META_NOTIFIER_ROLE,
+            "organization": {"reference": f"Organization/{organization_id}"}
         }
     }
 
     # --- Submitting (Primär-/Diagnostiklabor aus CSV) ---
-    submitting_org_id = str(uuid.uuid4())
-    submitting_role_id = str(uuid.uuid4())
-
-    sub_name  = _nz(row.PRIME_DIAGNOSTIC_LAB_NAME)
+    sub_name = _nz(row.PRIME_DIAGNOSTIC_LAB_NAME)
     sub_email = row.PRIME_DIAGNOSTIC_LAB_EMAIL if _valid_email(row.PRIME_DIAGNOSTIC_LAB_EMAIL) else None
-    sub_addr  = _nz(row.PRIME_DIAGNOSTIC_LAB_ADDRESS)
-    sub_city  = _nz(row.PRIME_DIAGNOSTIC_LAB_CITY)
-    sub_post  = _nz(row.PRIME_DIAGNOSTIC_LAB_POSTAL_CODE)
+    sub_addr = _nz(row.PRIME_DIAGNOSTIC_LAB_ADDRESS)
+    sub_city = _nz(row.PRIME_DIAGNOSTIC_LAB_CITY)
+    sub_post = _nz(row.PRIME_DIAGNOSTIC_LAB_POSTAL_CODE)
     sub_labid = _nz(row.PRIME_DIAGNOSTIC_LAB_DEMIS_LAB_ID)
-    sub_state = _nz(row.PRIME_DIAGNOSTIC_LAB_FEDERAL_STATE) or "DE-XX"
 
     has_telecom = bool(sub_email)
     has_address = bool(sub_addr or sub_city or sub_post)
     can_claim_submitting_profile = has_telecom and has_address
 
-    submitting_org_resource = {
-        "resourceType": "Organization",
-        "id": submitting_org_id,
-        **({"meta": {"profile": ["https://demis.rki.de/fhir/StructureDefinition/SubmittingFacility"]}}
-           if can_claim_submitting_profile else {}),
-        **({
-            "identifier": [{
-                "system": "https://demis.rki.de/fhir/NamingSystem/DemisLaboratoryId",
-                "value": sub_labid
-            }]
-        } if sub_labid else {}),
-        **({"name": sub_name} if sub_name else {}),
-        **({"telecom": [{"system": "email", "value": sub_email, "use": "work"}]}
-            if has_telecom else {}),
-        **({"address": [{
-            **({"line": [sub_addr]} if sub_addr else {}),
-            **({"city": sub_city} if sub_city else {}),
-            **({"postalCode": sub_post} if sub_post else {}),
-            **({"state": sub_state} if sub_state else {}),
-            "country": "DE"
-        }]} if has_address else {})
-    }
-
-    submitting_org_present = any(k for k in submitting_org_resource.keys() if k not in {"resourceType", "id", "meta"})
     submitting_org_entry = None
     submitting_role_entry = None
-
-    if submitting_org_present:
+    if sub_labid or sub_name or has_telecom or has_address:
+        submitting_org_resource = {"resourceType": "Organization", "id": submitting_org_id}
+        if can_claim_submitting_profile:
+            submitting_org_resource["meta"] = _META_SUBMITTING_FACILITY
+        if sub_labid:
+            submitting_org_resource["identifier"] = [{"system": LAB_ID_SYSTEM, "value": sub_labid}]
+        if sub_name:
+            submitting_org_resource["name"] = sub_name
+        if has_telecom:
+            submitting_org_resource["telecom"] = [{"system": "email", "value": sub_email, "use": "work"}]
+        if has_address:
+            address = {}
+            if sub_addr:
+                address["line"] = [sub_addr]
+            if sub_city:
+                address["city"] = sub_city
+            if sub_post:
+                address["postalCode"] = sub_post
+            address["state"] = _nz(row.PRIME_DIAGNOSTIC_LAB_FEDERAL_STATE) or "DE-XX"
+            address["country"] = "DE"
+            submitting_org_resource["address"] = [address]
         submitting_org_entry = {
             "fullUrl": f"{IGS_SPEC_BASE}/Organization/{submitting_org_id}",
             "resource": submitting_org_resource
         }
-        submitting_role_resource = {
-            "resourceType": "PractitionerRole",
-            "id": submitting_role_id,
-            **({"meta": {"profile": ["https://demis.rki.de/fhir/StructureDefinition/SubmittingRole"]}}
-               if can_claim_submitting_profile else {}),
-            "organization": {"reference": f"Organization/{submitting_org_id}"}
-        }
+
+        submitting_role_resource = {"resourceType": "PractitionerRole", "id": submitting_role_id}
+        if can_claim_submitting_profile:
+            submitting_role_resource["meta"] = _META_SUBMITTING_ROLE
+        submitting_role_resource["organization"] = {"reference": f"Organization/{submitting_org_id}"}
         submitting_role_entry = {
             "fullUrl": f"{IGS_SPEC_BASE}/PractitionerRole/{submitting_role_id}",
             "resource": submitting_role_resource
         }
 
     # --- Patient ---
+    patient_resource = {"resourceType": "Patient", "id": patient_id, "meta": _META_PATIENT}
     gender = (_nz(row.HOST_SEX) or "").strip().lower()
-    gender = gender if gender in VALID_GENDERS else None
+    if gender in VALID_GENDERS:
+        patient_resource["gender"] = gender
     birth_date = _fmt_birth_year_month(row.HOST_BIRTH_YEAR, row.HOST_BIRTH_MONTH)
+    if birth_date:
+        patient_resource["birthDate"] = birth_date
     geo_postal = _nz(row.GEOGRAPHIC_LOCATION)
-
-    patient_resource = {
-        'resourceType': 'Patient',
-        'id': patient_id,
-        'meta': {'profile': ['https://demis.rki.de/fhir/StructureDefinition/NotifiedPersonNotByName']},
-        **({'gender': gender} if gender else {}),
-        **({'birthDate': birth_date} if birth_date else {}),
-        "address": [{
-            "extension": [{
-                "url": "https://demis.rki.de/fhir/StructureDefinition/AddressUse",
-                "valueCoding": {
-                    "system": "https://demis.rki.de/fhir/CodeSystem/addressUse",
-                    "code": "primary"
-                }
-            }],
-            **({'postalCode': geo_postal} if geo_postal else {})
-        }]
-    }
-
-    patient_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/Patient/{patient_id}',
-        'resource': patient_resource
-    }
+    patient_resource["address"] = (
+        [{"extension": _ADDRESS_USE_PRIMARY, "postalCode": geo_postal}]
+        if geo_postal else _PATIENT_ADDRESS_WITHOUT_POSTAL_CODE
+    )
+    patient_entry = {"fullUrl": f"{IGS_SPEC_BASE}/Patient/{patient_id}", "resource": patient_resource}
 
     # --- Sequenzierung ---
-    adapter1_id = str(uuid.uuid4())
-    adapter2_id = str(uuid.uuid4())
-    primer_id = str(uuid.uuid4())
-
-    adapter1_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/Substance/{adapter1_id}',
-        'resource': {
-            'resourceType': 'Substance',
-            'id': adapter1_id,
-            'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/AdapterSubstance']},
-            'code': {'coding': [{
-                'system': 'https://demis.rki.de/fhir/igs/CodeSystem/sequencingSubstances',
-                'code': 'adapter', 'display': 'Adapter Sequence'
-            }]},
-            **({'description': _nz(adapter1)} if _nz(adapter1) else {})
-        }
-    }
-
-    adapter2_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/Substance/{adapter2_id}',
-        'resource': {
-            'resourceType': 'Substance',
-            'id': adapter2_id,
-            'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/AdapterSubstance']},
-            'code': {'coding': [{
-                'system': 'https://demis.rki.de/fhir/igs/CodeSystem/sequencingSubstances',
-                'code': 'adapter', 'display': 'Adapter Sequence'
-            }]},
-            **({'description': _nz(adapter2)} if _nz(adapter2) else {})
-        }
-    }
+    adapter1, adapter2 = ("", "")
+    if _nz(row.ADAPTER):
+        split_adapters = row.ADAPTER.split("+", 1)
+        adapter1 = split_adapters[0].strip()
+        adapter2 = split_adapters[1].strip() if len(split_adapters) > 1 else ""
+    adapter1_entry = _substance(adapter1_id, _META_ADAPTER, _ADAPTER_CODE, adapter1)
+    adapter2_entry = _substance(adapter2_id, _META_ADAPTER, _ADAPTER_CODE, adapter2)
 
-    primer_entry = None
-    if _nz(row.PRIMER_SCHEME):
-        primer_entry = {
-            'fullUrl': f'{IGS_SPEC_BASE}/Substance/{primer_id}',
-            'resource': {
-                'resourceType': 'Substance',
-                'id': primer_id,
-                'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/PrimerSubstance']},
-                'code': {'coding': [{
-                    'system': 'https://demis.rki.de/fhir/igs/CodeSystem/sequencingSubstances',
-                    'code': 'primer', 'display': 'Primer Sequence'
-                }]},
-                'description': _nz(row.PRIMER_SCHEME)
-            }
-        }
+    primer_scheme = _nz(row.PRIMER_SCHEME)
+    primer_entry = _substance(primer_id, _META_PRIMER, _PRIMER_CODE, primer_scheme) if primer_scheme else None
 
     # --- Specimen ---
-    spec_received = _fmt_date_or_datetime(row.DATE_OF_RECEIVING)
-    spec_collected = _fmt_date_or_datetime(row.DATE_OF_SAMPLING)
-    spec_sequenced = _fmt_date_or_datetime(row.DATE_OF_SEQUENCING)
-
-    specimen_id = str(uuid.uuid4())
     specimen_additives = [
-        {'reference': f"Substance/{adapter1_id}"},
-        {'reference': f"Substance/{adapter2_id}"}
+        {"reference": f"Substance/{adapter1_id}"},
+        {"reference": f"Substance/{adapter2_id}"}
     ]
     if primer_entry:
-        specimen_additives.append({'reference': f"Substance/{primer_id}"})
+        specimen_additives.append({"reference": f"Substance/{primer_id}"})
 
     collector_ref = (
-        f'PractitionerRole/{submitting_role_id}'
+        f"PractitionerRole/{submitting_role_id}"
         if submitting_role_entry is not None
-        else f'PractitionerRole/{practitioner_role_id}'
+        else f"PractitionerRole/{practitioner_role_id}"
     )
 
     specimen_resource = {
-        'resourceType': 'Specimen',
-        'id': specimen_id,
-        'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/SpecimenSequence']},
-        'status': 'available',
-        **({
-            'extension': [{
-                'url': 'https://demis.rki.de/fhir/igs/StructureDefinition/Isolate',
-                'valueString': _nz(row.ISOLATE)
-            }]
-        } if _nz(row.ISOLATE) else {}),
-        'type': {
-            'coding': [{
-                'system': 'http://snomed.info/sct',
-                **({'code': _nz(row.ISOLATION_SOURCE_CODE)} if _nz(row.ISOLATION_SOURCE_CODE) else {}),
-                **({'display': _nz(row.ISOLATION_SOURCE)} if _nz(row.ISOLATION_SOURCE) else {})
-            }]
-        },
-        'subject': {'reference': f'Patient/{patient_id}'},
-        **({'receivedTime': spec_received} if spec_received else {}),
-        'collection': {
-            'collector': {'reference': collector_ref},
-            **({'collectedDateTime': spec_collected} if spec_collected else {})
-        },
-        'processing': [{
-            **({'description': _nz(row.NAME_AMP_PROTOCOL)} if _nz(row.NAME_AMP_PROTOCOL) else {}),
-            **({
-                'procedure': {
-                    'coding': [{
-                        'system': 'https://demis.rki.de/fhir/igs/CodeSystem/sequencingStrategy',
-                        'code': _nz(row.SEQUENCING_STRATEGY)
-                    }]
-                }
-            } if _nz(row.SEQUENCING_STRATEGY) else {}),
-            'additive': specimen_additives,
-            **({'timeDateTime': spec_sequenced} if spec_sequenced else {})
-        }]
+        "resourceType": "Specimen",
+        "id": specimen_id,
+        "meta": _META_SPECIMEN,
+        "status": "available",
     }
+    isolate = _nz(row.ISOLATE)
+    if isolate:
+        specimen_resource["extension"] = [{"url": _ISOLATE_URL, "valueString": isolate}]
+    source_coding = {"system": SNOMED}
+    source_code = _nz(row.ISOLATION_SOURCE_CODE)
+    if source_code:
+        source_coding["code"] = source_code
+    source_display = _nz(row.ISOLATION_SOURCE)
+    if source_display:
+        source_coding["display"] = source_display
+    specimen_resource["type"] = {"coding": [source_coding]}
+    specimen_resource["subject"] = patient_ref
+    spec_received = _fmt_date_or_datetime(row.DATE_OF_RECEIVING)
+    if spec_received:
+        specimen_resource["receivedTime"] = spec_received
+    collection = {"collector": {"reference": collector_ref}}
+    spec_collected = _fmt_date_or_datetime(row.DATE_OF_SAMPLING)
+    if spec_collected:
+        collection["collectedDateTime"] = spec_collected
+    specimen_resource["collection"] = collection
+    processing = {}
+    amp_protocol = _nz(row.NAME_AMP_PROTOCOL)
+    if amp_protocol:
+        processing["description"] = amp_protocol
+    strategy = _nz(row.SEQUENCING_STRATEGY)
+    if strategy:
+        processing["procedure"] = {"coding": [{"system": _SEQUENCING_STRATEGY_SYSTEM, "code": strategy}]}
+    processing["additive"] = specimen_additives
+    spec_sequenced = _fmt_date_or_datetime(row.DATE_OF_SEQUENCING)
+    if spec_sequenced:
+        processing["timeDateTime"] = spec_sequenced
+    specimen_resource["processing"] = [processing]
 
-    specimen_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/Specimen/{specimen_id}',
-        'resource': specimen_resource
-    }
+    specimen_entry = {"fullUrl": f"{IGS_SPEC_BASE}/Specimen/{specimen_id}", "resource": specimen_resource}
 
     # --- Device ---
-    device_id = str(uuid.uuid4())
-    device_resource = {
-        'resourceType': 'Device',
-        'id': device_id,
-        'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/SequencingDevice']},
-        **({
-            'deviceName': [{'name': _nz(row.SEQUENCING_INSTRUMENT), 'type': 'model-name'}]
-        } if _nz(row.SEQUENCING_INSTRUMENT) else {}),
-        **({
-            'type': {
-                'coding': [{
-                    'system': 'https://demis.rki.de/fhir/igs/CodeSystem/sequencingPlatform',
-                    'code': _nz(row.SEQUENCING_PLATFORM),
-                    'display': _nz(row.SEQUENCING_PLATFORM)
-                }]
-            }
-        } if _nz(row.SEQUENCING_PLATFORM) else {})
-    }
-
-    device_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/Device/{device_id}',
-        'resource': device_resource
-    }
-
-    # --- IDs ---
-    observation_id = str(uuid.uuid4())
-    diagnostic_report_id = str(uuid.uuid4())
-    sequence_id = str(uuid.uuid4())
+    device_resource = {"resourceType": "Device", "id": device_id, "meta": _META_DEVICE}
+    instrument = _nz(row.SEQUENCING_INSTRUMENT)
+    if instrument:
+        device_resource["deviceName"] = [{"name": instrument, "type": "model-name"}]
+    platform = _nz(row.SEQUENCING_PLATFORM)
+    if platform:
+        device_resource["type"] = {"coding": [{
+            "system": _SEQUENCING_PLATFORM_SYSTEM,
+            "code": platform,
+            "display": platform
+        }]}
+    device_entry = {"fullUrl": f"{IGS_SPEC_BASE}/Device/{device_id}", "resource": device_resource}
 
     # --- Repository ---
     repo_name = (_nz(row.REPOSITORY_NAME) or "").strip().lower()
-    if repo_name not in {"gisaid", "ena", "sra", "pubmlst", "genbank", "other"}:
+    if repo_name not in VALID_REPOSITORIES:
         repo_name = "other"
+    repo_link = _nz(row.REPOSITORY_LINK)
+    repo_id = _nz(row.REPOSITORY_ID)
 
     raw_status = (_nz(row.UPLOAD_STATUS) or "").strip().lower()
     if raw_status in SNOMED_UPLOAD_STATUS:
         status_code = SNOMED_UPLOAD_STATUS[raw_status]
-    elif raw_status in SNOMED_UPLOAD_STATUS.values():
+    elif raw_status in _UPLOAD_STATUS_EXTENSIONS:
         status_code = raw_status
     else:
-        status_code = (
-            SNOMED_UPLOAD_STATUS["accepted"]
-            if (_nz(row.REPOSITORY_LINK) or _nz(row.REPOSITORY_ID))
-            else SNOMED_UPLOAD_STATUS["planned"]
-        )
-
-    repo_extensions = [{
-        "url": "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceUploadStatus",
-        "valueCoding": {
-            "system": "http://snomed.info/sct",
-            "code": status_code
-        }
-    }]
+        status_code = SNOMED_UPLOAD_STATUS["accepted"] if (repo_link or repo_id) else SNOMED_UPLOAD_STATUS["planned"]
 
+    repo_extensions = [_UPLOAD_STATUS_EXTENSIONS[status_code]]
     upload_date = _fmt_date_or_datetime(row.UPLOAD_DATE)
     if upload_date:
-        repo_extensions.append({
-            "url": "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceUploadDate",
-            "valueDateTime": upload_date
-        })
-    if _nz(row.UPLOAD_SUBMITTER):
-        repo_extensions.append({
-            "url": "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceUploadSubmitter",
-            "valueString": _nz(row.UPLOAD_SUBMITTER)
-        })
-
-    repository = {
-        "name": repo_name,
-        **({"url": _nz(row.REPOSITORY_LINK)} if _nz(row.REPOSITORY_LINK) else {}),
-        **({"datasetId": _nz(row.REPOSITORY_ID)} if _nz(row.REPOSITORY_ID) else {}),
-        "type": "other",
-        "extension": repo_extensions
-    }
-
-    # --- Sequencing reason & SequenceAuthor ---
-    seq_extensions = [{
-        "url": "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceDocumentReference",
-        "valueReference": {
-            "reference": f"{_fhir_base()}/DocumentReference/{doc_ids[0]}",
-            "type": "DocumentReference"
-        }
-    },{
-        "url": "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceDocumentReference",
-        "valueReference": {
-            "reference": f"{_fhir_base()}/DocumentReference/{doc_ids[1]}",
-            "type": "DocumentReference"
-        }
-    }]
-
-    if _nz(row.SEQUENCING_REASON):
-        key = _nz(row.SEQUENCING_REASON).lower()
-        code = SEQ_REASON_TO_SNOMED.get(key) or (_nz(row.SEQUENCING_REASON) if re.fullmatch(r"\d+", _nz(row.SEQUENCING_REASON)) else None)
-        if code:
-            seq_extensions.insert(0, {
-                "url": "https://demis.rki.de/fhir/igs/StructureDefinition/SequencingReason",
-                "valueCoding": {
-                    "system": "http://snomed.info/sct",
-                    "code": code
-                }
-            })
-
+        repo_extensions.append({"url": _UPLOAD_DATE_URL, "valueDateTime": upload_date})
+    upload_submitter = _nz(row.UPLOAD_SUBMITTER)
+    if upload_submitter:
+        repo_extensions.append({"url": _UPLOAD_SUBMITTER_URL, "valueString": upload_submitter})
+
+    repository = {"name": repo_name}
+    if repo_link:
+        repository["url"] = repo_link
+    if repo_id:
+        repository["datasetId"] = repo_id
+    repository["type"] = "other"
+    repository["extension"] = repo_extensions
+
+    # --- SequenceAuthor, Sequencing reason & DocumentReferences ---
+    seq_extensions = []
     author_txt = _nz(row.AUTHOR)
     if author_txt:
-        seq_extensions.insert(0, {
-            "url": "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceAuthor",
-            "valueString": author_txt
+        seq_extensions.append({"url": _SEQUENCE_AUTHOR_URL, "valueString": author_txt})
+    reason = _nz(row.SEQUENCING_REASON)
+    if reason:
+        code = SEQ_REASON_TO_SNOMED.get(reason.lower()) or (reason if _DIGITS.fullmatch(reason) else None)
+        if code:
+            seq_extensions.append({"url": _SEQUENCING_REASON_URL, "valueCoding": {"system": SNOMED, "code": code}})
+    document_reference_base = f"{_fhir_base()}/DocumentReference/"
+    for doc_id in (doc_ids[0], doc_ids[1]):
+        seq_extensions.append({
+            "url": _SEQUENCE_DOCUMENT_REFERENCE_URL,
+            "valueReference": {
+                "reference": f"{document_reference_base}{doc_id}",
+                "type": "DocumentReference"
+            }
         })
 
     # --- MolecularSequence ---
     molecular_sequence_resource = {
-        'resourceType': 'MolecularSequence',
-        'id': sequence_id,
-        'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/Sequence']},
-        'coordinateSystem': 1,
-        'specimen': {'reference': f'Specimen/{specimen_id}'},
-        'device': {'reference': f'Device/{device_id}'},
-        'extension': seq_extensions,
-        **({'identifier': [{"value": _nz(row.LAB_SEQUENCE_ID)}]} if _nz(row.LAB_SEQUENCE_ID) else {}),
-        "performer": {"reference": f"Organization/{organization_id}"},
-        "repository": [repository]
+        "resourceType": "MolecularSequence",
+        "id": sequence_id,
+        "meta": _META_SEQUENCE,
+        "coordinateSystem": 1,
+        "specimen": specimen_ref,
+        "device": device_ref,
+        "extension": seq_extensions,
     }
-
+    lab_sequence_id = _nz(row.LAB_SEQUENCE_ID)
+    if lab_sequence_id:
+        molecular_sequence_resource["identifier"] = [{"value": lab_sequence_id}]
+    molecular_sequence_resource["performer"] = {"reference": f"Organization/{organization_id}"}
+    molecular_sequence_resource["repository"] = [repository]
     molecular_sequence_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/MolecularSequence/{sequence_id}',
-        'resource': molecular_sequence_resource
+        "fullUrl": f"{IGS_SPEC_BASE}/MolecularSequence/{sequence_id}",
+        "resource": molecular_sequence_resource
     }
 
     # --- Observation ---
+    species_coding = {"system": SNOMED}
     obs_code = _nz(row.SPECIES_CODE)
+    if obs_code:
+        species_coding["code"] = obs_code
     obs_display = _nz(row.SPECIES)
+    if obs_display:
+        species_coding["display"] = obs_display
 
     observation_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/Observation/{observation_id}',
-        'resource': {
-            'resourceType': 'Observation',
-            'id': observation_id,
-            'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/PathogenDetectionSequence']},
-            **({'status': _nz(row.STATUS)} if _nz(row.STATUS) else {'status': 'final'}),
-            'category': [{'coding': [{'system': 'http://terminology.hl7.org/CodeSystem/observation-category', 'code': 'laboratory'}]}],
-            'code': {'coding': [{
-                'system': 'http://loinc.org',
-                'code': '41852-5',
-                'display': 'Microorganism or agent identified in Specimen',
-            }]},
-            "valueCodeableConcept": {
-                    "coding": [
-                        {
-                            "system": "http://snomed.info/sct",
-                            **({'code': obs_code} if obs_code else {}),
-                            **({'display': obs_display} if obs_display else {})
-                        }
-                    ]
-                },
-            'subject': {'reference': f'Patient/{patient_id}'},
-            'interpretation': [{'coding': [{'system': 'http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation', 'code': 'POS'}]}],
-            'method': {'coding': [{'system': 'http://snomed.info/sct', 'code': '117040002', 'display': 'Nucleic acid sequencing (procedure)'}]},
-            'specimen': {'reference': f'Specimen/{specimen_id}'},
-            'device': {'reference': f'Device/{device_id}'},
-            'derivedFrom': [{'reference': f'MolecularSequence/{sequence_id}'}]
+        "fullUrl": f"{IGS_SPEC_BASE}/Observation/{observation_id}",
+        "resource": {
+            "resourceType": "Observation",
+            "id": observation_id,
+            "meta": _META_OBSERVATION,
+            "status": status,
+            "category": _OBSERVATION_CATEGORY,
+            "code": _OBSERVATION_CODE,
+            "valueCodeableConcept": {"coding": [species_coding]},
+            "subject": patient_ref,
+            "interpretation": _OBSERVATION_INTERPRETATION,
+            "method": _OBSERVATION_METHOD,
+            "specimen": specimen_ref,
+            "device": device_ref,
+            "derivedFrom": [{"reference": f"MolecularSequence/{sequence_id}"}]
         }
     }
 
     # --- DiagnosticReport ---
+    dr_coding = {"system": _NOTIFICATION_CATEGORY_SYSTEM}
     dr_code = _nz(row.MELDETATBESTAND)
+    if dr_code:
+        dr_coding["code"] = dr_code
 
     diagnostic_report_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/DiagnosticReport/{diagnostic_report_id}',
-        'resource': {
-            'resourceType': 'DiagnosticReport',
-            'id': diagnostic_report_id,
-            'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/LaboratoryReportSequence']},
-            'status': 'final',
-            'code': {'coding': [{
-                'system': 'https://demis.rki.de/fhir/CodeSystem/notificationCategory',
-                **({'code': dr_code} if dr_code else {})
-            }]},
-            'subject': {'reference': f'Patient/{patient_id}'},
-            'issued': now_iso,
-            'result': [{'reference': f'Observation/{observation_id}'}],
-            'conclusion': 'NACHWEIS eines meldepflichtigen Erregers',
-            'conclusionCode': [{
-                'coding': [{
-                    'system': 'https://demis.rki.de/fhir/CodeSystem/conclusionCode',
-                    'code': 'pathogenDetected',
-                    'display': 'Meldepflichtiger Erreger nachgewiesen'
-                }]
-            }]
+        "fullUrl": f"{IGS_SPEC_BASE}/DiagnosticReport/{diagnostic_report_id}",
+        "resource": {
+            "resourceType": "DiagnosticReport",
+            "id": diagnostic_report_id,
+            "meta": _META_DIAGNOSTIC_REPORT,
+            "status": "final",
+            "code": {"coding": [dr_coding]},
+            "subject": patient_ref,
+            "issued": now_iso,
+            "result": [{"reference": f"Observation/{observation_id}"}],
+            "conclusion": "NACHWEIS eines meldepflichtigen Erregers",
+            "conclusionCode": _CONCLUSION_CODE
         }
     }
 
     # --- Composition ---
+    notification_identifier = (
+        {"system": NOTIFICATION_ID_SYSTEM, "value": notification_id}
+        if has_notification_id else _NOTIFICATION_ID_WITHOUT_VALUE
+    )
+    composition_resource = {"resourceType": "Composition"}
+    if has_notification_id:
+        composition_resource["id"] = notification_id
+    composition_resource["meta"] = _META_COMPOSITION
+    composition_resource["identifier"] = notification_identifier
+    composition_resource["status"] = status
+    composition_resource["type"] = _COMPOSITION_TYPE
+    composition_resource["category"] = [_LABORATORY_REPORT]
+    composition_resource["subject"] = patient_ref
+    composition_resource["author"] = [{"reference": f"PractitionerRole/{practitioner_role_id}"}]
+    composition_resource["relatesTo"] = [{
+        "code": "appends",
+        "targetReference": {"type": "Composition", "identifier": notification_identifier}
+    }]
+    composition_resource["date"] = now_iso
+    composition_resource["title"] = "Sequenzmeldung"
+    composition_resource["section"] = [{
+        "code": _LABORATORY_REPORT,
+        "entry": [{"reference": f"DiagnosticReport/{diagnostic_report_id}"}]
+    }]
     composition_entry = {
-        'fullUrl': f'{IGS_SPEC_BASE}/Composition/{row.DEMIS_NOTIFICATION_ID}',
-        'resource': {
-            'resourceType': 'Composition',
-            'id': row.DEMIS_NOTIFICATION_ID,
-            'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/NotificationSequence']},
-            'identifier': {
-                'system': 'https://demis.rki.de/fhir/NamingSystem/NotificationId',
-                'value': row.DEMIS_NOTIFICATION_ID
-            },
-            **({'status': _nz(row.STATUS)} if _nz(row.STATUS) else {'status': 'final'}),
-            'type': {'coding': [{'system': 'http://loinc.org', 'code': '34782-3', 'display': 'Infectious disease Note'}]},
-            'category': [{'coding': [{'system': 'http://loinc.org', 'code': '11502-2', 'display': 'Laboratory report'}]}],
-            'subject': {'reference': f'Patient/{patient_id}'},
-            'author': [{'reference': f'PractitionerRole/{practitioner_role_id}'}],
-            'relatesTo': [{
-                'code': 'appends',
-                'targetReference': {
-                    'type': 'Composition',
-                    'identifier': {'system': 'https://demis.rki.de/fhir/NamingSystem/NotificationId', 'value': row.DEMIS_NOTIFICATION_ID}
-                }
-            }],
-            'date': now_iso,
-            'title': 'Sequenzmeldung',
-            'section': [{
-                'code': {'coding': [{'system': 'http://loinc.org', 'code': '11502-2', 'display': 'Laboratory report'}]},
-                'entry': [{'reference': f'DiagnosticReport/{diagnostic_report_id}'}]
-            }]
-        }
+        "fullUrl": f"{IGS_SPEC_BASE}/Composition/{notification_id}",
+        "resource": composition_resource
     }
 
     # --- Bundle-Entries ---
-    entries = [
-        composition_entry,
-        patient_entry,
-        practitioner_role_entry,   # NotifierRole
-        org_entry,                 # NotifierFacility
-        *( [submitting_role_entry] if submitting_role_entry else [] ),
-        *( [submitting_org_entry] if submitting_org_entry else [] ),
-        specimen_entry,
-        device_entry,
-        adapter1_entry,
-        adapter2_entry,
-        *( [primer_entry] if primer_entry else [] ),
-        molecular_sequence_entry,
-        observation_entry,
-        diagnostic_report_entry
-    ]
-
-    bundle = {
-        'resourceType': 'Bundle',
-        'meta': {
-            'lastUpdated': now_iso,
-            'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/NotificationBundleSequence']
-        },
-        'identifier': {
-            'system': 'https://demis.rki.de/fhir/NamingSystem/NotificationBundleId',
-            'value': row.DEMIS_NOTIFICATION_ID
-        },
-        'type': 'document',
-        'timestamp': now_iso,
-        'entry': entries
+    entries = [composition_entry, patient_entry, practitioner_role_entry, org_entry]
+    if submitting_role_entry:
+        entries.append(submitting_role_entry)
+        entries.append(submitting_org_entry)
+    entries += [specimen_entry, device_entry, adapter1_entry, adapter2_entry]
+    if primer_entry:
+        entries.append(primer_entry)
+    entries += [molecular_sequence_entry, observation_entry, diagnostic_report_entry]
+
+    return {
+        "resourceType": "Bundle",
+        "meta": {"lastUpdated": now_iso, "profile": _META_BUNDLE_PROFILE},
+        "identifier": (
+            {"system": NOTIFICATION_BUNDLE_ID_SYSTEM, "value": notification_id}
+            if has_notification_id else {"system": NOTIFICATION_BUNDLE_ID_SYSTEM}
+        ),
+        "type": "document",
+        "timestamp": now_iso,
+        "entry": entries
     }
 
-    return _prune(bundle)
 
+# Platzhalter für die DocumentReference-IDs, solange die Dateien noch hochgeladen werden
+PLACEHOLDER_DOC_IDS = ("pending-file-1", "pending-file-2")
 
-def send_notification(row: CsvRow, doc_ids: [str]) -> dict:
-    bundle = build_notification_bundle(
-        row=row,
-        doc_ids=doc_ids
-    )
+_local = threading.local()
 
+
+def prebuild_notification_bundle(row: CsvRow) -> dict:
+    """Builds the bundle of a row before its uploads, with placeholder DocumentReference ids."""
+    return build_notification_bundle(row, PLACEHOLDER_DOC_IDS)
+
+
+def fill_notification_bundle(bundle: dict, doc_ids: [str]) -> dict:
+    """
+    Patches the real DocumentReference URLs and the send time into a prebuilt bundle.
+    Only dicts created per bundle are changed, never the shared constant parts.
+    """
+    document_reference_base = f"{_fhir_base()}/DocumentReference/"
+    references = [
+        extension["valueReference"]
+        for entry in bundle["entry"] if entry["resource"]["resourceType"] == "MolecularSequence"
+        for extension in entry["resource"]["extension"] if extension["url"] == _SEQUENCE_DOCUMENT_REFERENCE_URL
+    ]
+    for reference, doc_id in zip(references, (doc_ids[0], doc_ids[1])):
+        reference["reference"] = f"{document_reference_base}{doc_id}"
+
+    now_iso = datetime.now(timezone.utc).isoformat()
+    bundle["meta"]["lastUpdated"] = bundle["timestamp"] = now_iso
+    for entry in bundle["entry"]:
+        resource = entry["resource"]
+        if resource["resourceType"] == "Composition":
+            resource["date"] = now_iso
+        elif resource["resourceType"] == "DiagnosticReport":
+            resource["issued"] = now_iso
+    return bundle
+
+
+def row_key(row: CsvRow, files=()) -> str:
+    """
+    Fingerprint of a CSV row and its read files (name, size, mtime): identical
+    rows have the same key, so a row that was already notified can be skipped.
+    """
+    data = json.dumps([astuple(row), [list(f) for f in files]], separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def prebuilt(bundle: dict | None, key: str | None = None):
+    """
+    send_notification() in this block uses the prebuilt bundle instead of building
+    one and records the sent bundle under the row key in the run store.
+    """
+    _local.bundle, _local.key = bundle, key
+    try:
+        yield
+    finally:
+        _local.bundle = _local.key = None
+
+
+def _retry_delay(attempt: int) -> float:
+    return RETRY_BACKOFF * 2 ** attempt
+
+
+def post_notification(body: bytes) -> requests.Response:
+    """
+    POSTs a serialized bundle. Connection errors, timeouts and 5xx/429 are retried
+    up to NOTIFICATION_RETRIES times with the same bytes.
+    """
     url = _fhir_base() + "/$process-notification-sequence"
-    headers = {
-        'Authorization': f'Bearer {token_module.current_token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json'
-    }
+    for attempt in range(NOTIFICATION_RETRIES + 1):
+        headers = {
+            'Authorization': f'Bearer {token_module.current_token}',
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        last_try = attempt == NOTIFICATION_RETRIES
+        try:
+            response = post_json(url, body, headers, stage="send_notification", cert=(config.CERT, config.KEY))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if last_try:
+                raise
+            print(f"[WARN] Sending notification failed ({e}), retrying")
+        else:
+            if response.status_code not in RETRY_STATUS or last_try:
+                return response
+            print(f"[WARN] Sending notification failed ({response.status_code}), retrying")
+        time.sleep(_retry_delay(attempt))
+
+
+def send_notification(row: CsvRow, doc_ids: [str]) -> dict:
+    bundle = getattr(_local, "bundle", None)
+    if bundle is not None:
+        bundle = fill_notification_bundle(bundle, doc_ids)
+    else:
+        bundle = build_notification_bundle(
+            row=row,
+            doc_ids=doc_ids
+        )
+    # einmal serialisieren und speichern: Wiederholungen (auch replay-notifications) senden diese Bytes
+    body = encode_json(bundle)
+    stored = run_store.save_notification(
+        row.LAB_SEQUENCE_ID or row.DEMIS_NOTIFICATION_ID, row.DEMIS_NOTIFICATION_ID,
+        getattr(_local, "key", None), doc_ids, body,
+    )
 
-    response = requests.post(url, headers=headers, json=bundle, cert=(config.CERT, config.KEY))
+    try:
+        response = post_notification(body)
+    except Exception as e:
+        metrics.notifications.inc(result="failed")
+        run_store.update_notification(stored, "failed", error=str(e))
+        raise
     if response.status_code != 200:
+        metrics.notifications.inc(result="failed")
+        run_store.update_notification(stored, "failed", error=f"HTTP {response.status_code}")
         typer.secho(f'Error {response.status_code}:', fg=typer.colors.RED)
         try:
             print(response.json())
         except ValueError:
             print(response.text)
         response.raise_for_status()
-    return response.json()
+    metrics.notifications.inc(result="ok")
+    result = response.json()
+    parameters = result.get("parameter") if isinstance(result, dict) else None
+    run_store.update_notification(stored, "sent", transaction_id=extract_param(parameters or [], "transactionID"))
+    return result
@@ -7,6 +7,14 @@ from datetime import datetime
 base_dir = os.getcwd()
 logging_path = base_dir
 
+def resolve_path(path) -> Path:
+    """Absolute path with environment variables ($HOME, %APPDATA%) and ~ expanded."""
+    resolved_path = Path(os.path.expandvars(str(path))).expanduser()
+    try:
+        return resolved_path.resolve(strict=False)
+    except Exception:
+        return resolved_path.absolute()
+
 def set_logging_path(path: str):
     global logging_path
 
@@ -16,12 +24,7 @@ def set_logging_path(path: str):
     if raw == "" or raw.lower() in {"none", "null", "nil"}:
         return
 
-    resolved_path = Path(str(path))
-    resolved_path = Path(os.path.expandvars(str(resolved_path))).expanduser()
-    try:
-        resolved_path = resolved_path.resolve(strict=False)
-    except Exception:
-        resolved_path = resolved_path.absolute()
+    resolved_path = resolve_path(path)
 
     if resolved_path.exists() and not resolved_path.is_dir():
         raise NotADirectoryError(f"Path exists and is not a directory: {resolved_path}")
@@ -2,6 +2,8 @@ import typer
 import time
 import requests
 import igsupload.config as config
+import igsupload.metrics as metrics
+import igsupload.events as events
 
 def poll_validation_status(doc_id, token, timeout = 300): # timeout so there is no endless loop
 
@@ -11,6 +13,7 @@ def poll_validation_status(doc_id, token, timeout = 300): # timeout so there is
     }
 
     start_time = time.time()
+    wait_start = time.monotonic()
 
     while True:
         try:
@@ -26,18 +29,22 @@ def poll_validation_status(doc_id, token, timeout = 300): # timeout so there is
                 done = result.get("done")
                 message = result.get("message")
 
-                color_status = typer.colors.GREEN if status == "VALID" else typer.colors.RED
-                color_bool = typer.colors.GREEN if done else typer.colors.RED
-                styled_status = typer.style(status, fg=color_status)
-                styled_bool = typer.style(done, fg=color_bool)
-                
-                if message == None:
-                  print(f"Current status: {styled_status} (done={styled_bool})")
-                else:
-                  print(f"Current status: {styled_status} (done={styled_bool}) mit message: {message}")
+                if not events.quiet:
+                  color_status = typer.colors.GREEN if status == "VALID" else typer.colors.RED
+                  color_bool = typer.colors.GREEN if done else typer.colors.RED
+                  styled_status = typer.style(status, fg=color_status)
+                  styled_bool = typer.style(done, fg=color_bool)
+
+                  if message == None:
+                    print(f"Current status: {styled_status} (done={styled_bool})")
+                  else:
+                    print(f"Current status: {styled_status} (done={styled_bool}) mit message: {message}")
 
                 if done:
-                    print(f"{typer.style('Validation', fg=typer.colors.GREEN)} finished.")
+                    if not events.quiet:
+                        print(f"{typer.style('Validation', fg=typer.colors.GREEN)} finished.")
+                    events.emit("info" if status == "VALID" else "error", "validation", status=status, message=message)
+                    metrics.validation_wait_seconds.observe(time.monotonic() - wait_start, status=status)
                     return status
 
             else:
@@ -49,6 +56,7 @@ def poll_validation_status(doc_id, token, timeout = 300): # timeout so there is
 
         if time.time() - start_time > timeout:
             print(f"Validation took to long ({typer.style('Timeout', fg=typer.colors.RED)}).")
+            metrics.validation_wait_seconds.observe(time.monotonic() - wait_start, status="TIMEOUT")
             return "TIMEOUT"
 
         # waiting period
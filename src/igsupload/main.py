@@ -1,10 +1,33 @@
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import typer
 from igsupload.workflow import start
 from igsupload.config import load_env
 from igsupload.igsupload_logger import set_logging_path
+from igsupload.reads_index import set_read_roots
+from igsupload.reads_io import set_page_cache
+from igsupload.serialization import set_gzip
+from igsupload.timing import set_spans_file
+from igsupload.metrics import set_textfile
+import igsupload.igsupload_logger as igsupload_logger
+import igsupload.profiling as profiling
+import igsupload.events as events
+import igsupload.progress as progress
+import igsupload.compress as compress
+import igsupload.reads_check as reads_check
+import igsupload.gzip_check as gzip_check
+import igsupload.bandwidth as bandwidth
+import igsupload.concurrency as concurrency
+import igsupload.run_store as run_store
+import igsupload.dedup as dedup
+import igsupload.igs_notification as igs_notification
+import igsupload.get_token as token_module
+import igsupload.replay as replay
+import igsupload.status as status
 
 app = typer.Typer(add_completion=False)
 
@@ -33,6 +56,154 @@ def help_cmd():
     typer.echo("  igsupload --csv ./data.csv --config ./secrets/.env")
     typer.echo("  igsupload intro\n")
 
+@app.command("check-reads")
+def check_reads_cmd(files: List[Path] = typer.Argument(..., help="FASTQ/FASTA files (plain or .gz)")):
+    """
+    Checks the structure of read files locally, without uploading anything
+    """
+    failed = False
+    for path in files:
+        try:
+            result = reads_check.check_file(str(path))
+        except OSError as e:
+            typer.secho(f"{path}: {e}", fg=typer.colors.RED)
+            failed = True
+            continue
+        if result.ok:
+            typer.secho(f"{path}: OK ({result.records} records)", fg=typer.colors.GREEN)
+            continue
+        failed = True
+        typer.secho(f"{path}: invalid", fg=typer.colors.RED)
+        for error in result.errors:
+            typer.echo(f"  {error}")
+    if failed:
+        raise typer.Exit(code=1)
+
+@app.command("replay-notifications")
+def replay_notifications_cmd(
+    config: Optional[Path] = typer.Option(
+        None, "--config", help="Optional path to a .env file (overrides auto-detection)", exists=False, show_default=False
+    ),
+    log: Optional[Path] = typer.Option(
+        None, "--log", help="Log directory of the original runs", exists=False, show_default=False
+    ),
+    run_store_file: Optional[Path] = typer.Option(
+        None, "--run-store", help="SQLite file with the local upload history, 'none' disables it (no --dedup store, no replay-notifications). Default: <log dir>/logging/igsupload_runs.sqlite", show_default=False
+    ),
+    run: Optional[int] = typer.Option(
+        None, "--run", help="Only replay notifications of this run id", show_default=False
+    ),
+    concurrency: int = typer.Option(
+        replay.CONCURRENCY, "--concurrency", help="Notifications sent at the same time"
+    ),
+    rate: float = typer.Option(
+        replay.RATE, "--rate", help="Maximum notifications per second (0 = unlimited)"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Only list what would be resent"
+    ),
+):
+    """
+    Resends failed or interrupted notifications from the run store, without touching reads or DocumentReferences
+    """
+    try:
+        load_env(config_path=config)
+    except Exception as e:
+        typer.echo(typer.style(f"Config error: {e}", fg=typer.colors.RED))
+        raise typer.Exit(code=1)
+    set_logging_path(path=str(log))
+    path = run_store_file or run_store.default_path(igsupload_logger.logging_path)
+    if not Path(path).is_file():
+        typer.echo(typer.style(f"Error: run store '{path}' not found.", fg=typer.colors.RED))
+        raise typer.Exit(code=2)
+    run_store.set_run_store(path)
+
+    stored = run_store.notifications_to_replay(run)
+    if not stored:
+        typer.echo("No failed or pending notifications.")
+        return
+    for _, sample, notification_id, doc_ids, _ in stored:
+        typer.echo(f"{sample}: notification {notification_id}, DocumentReferences {', '.join(doc_ids)}")
+    if dry_run:
+        return
+
+    token_module.current_token, token_module.refresh_token = token_module.get_token()
+    results = replay.replay(stored, concurrency, rate)
+    failed = sum(not result.ok for result in results)
+    typer.echo(f"Replayed {len(results)} notification(s): {len(results) - failed} sent, {failed} failed")
+    if failed:
+        raise typer.Exit(code=1)
+
+@app.command("status")
+def status_cmd(
+    config: Optional[Path] = typer.Option(
+        None, "--config", help="Optional path to a .env file (overrides auto-detection)", exists=False, show_default=False
+    ),
+    log: Optional[Path] = typer.Option(
+        None, "--log", help="Log directory of the runs", exists=False, show_default=False
+    ),
+    run_store_file: Optional[Path] = typer.Option(
+        None, "--run-store", help="SQLite file with the local upload history, 'none' disables it (no --dedup store, no replay-notifications). Default: <log dir>/logging/igsupload_runs.sqlite", show_default=False
+    ),
+    since: Optional[str] = typer.Option(
+        None, "--since", help="Only uploads since this date (YYYY-MM-DD)", show_default=False
+    ),
+    problems: bool = typer.Option(
+        False, "--problems", help="Only uploads that are not VALID or have no transactionID"
+    ),
+    output_format: str = typer.Option(
+        "csv", "--format", help="Output format: 'csv' or 'json'"
+    ),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Write the table to this file instead of stdout", show_default=False
+    ),
+    concurrency: int = typer.Option(
+        status.CONCURRENCY, "--concurrency", help="Status queries at the same time"
+    ),
+    rate: float = typer.Option(
+        status.RATE, "--rate", help="Maximum status queries per second (0 = unlimited)"
+    ),
+    offline: bool = typer.Option(
+        False, "--offline", help="Only use the local history and cached answers, query nothing"
+    ),
+):
+    """
+    Reconciles past uploads: queries $validation-status for pending DocumentReferences and prints a table
+    """
+    if output_format not in status.FORMATS:
+        typer.echo(typer.style(f"Error: Invalid format: {output_format} (expected csv or json)", fg=typer.colors.RED), err=True)
+        raise typer.Exit(code=2)
+    try:
+        since_ts = datetime.fromisoformat(since).timestamp() if since else None
+    except ValueError:
+        typer.echo(typer.style(f"Error: Invalid date for --since: {since} (expected YYYY-MM-DD)", fg=typer.colors.RED), err=True)
+        raise typer.Exit(code=2)
+    # stdout gehört der Tabelle, alle Meldungen nach stderr
+    with redirect_stdout(sys.stderr):
+        if not offline:
+            try:
+                load_env(config_path=config)
+            except Exception as e:
+                typer.echo(typer.style(f"Config error: {e}", fg=typer.colors.RED))
+                raise typer.Exit(code=1)
+        set_logging_path(path=str(log))
+        path = run_store_file or run_store.default_path(igsupload_logger.logging_path)
+        if not Path(path).is_file():
+            typer.echo(typer.style(f"Error: run store '{path}' not found.", fg=typer.colors.RED))
+            raise typer.Exit(code=2)
+        run_store.set_run_store(path)
+        if not offline:
+            token_module.current_token, token_module.refresh_token = token_module.get_token()
+        records = status.reconcile(since_ts, concurrency, rate, offline=offline)
+    if problems:
+        records = [record for record in records if status.is_problem(record)]
+    if output is None:
+        status.write(records, output_format)
+        return
+    with open(output, "w", encoding="utf-8", newline="") as stream:
+        status.write(records, output_format, stream)
+    typer.echo(f"{len(records)} upload(s) written to {output}", err=True)
+
 @app.callback(invoke_without_command=True)
 def main(
     ctx: typer.Context,
@@ -45,6 +216,87 @@ def main(
     log: Optional[Path] = typer.Option(
         None, "--log", help="Optional path to a log file. If not set it will be put into the root project dircetory", exists=False, show_default=False
     ),
+    reads: Optional[List[Path]] = typer.Option(
+        None, "--reads", help="Directory with read files, scanned recursively (repeatable). Default: <csv dir>/../reads", show_default=False
+    ),
+    reads_pattern: Optional[List[str]] = typer.Option(
+        None, "--reads-pattern", help="Only index read files matching this glob, e.g. '*.fastq.gz' (repeatable)", show_default=False
+    ),
+    page_cache: str = typer.Option(
+        "default", "--page-cache", help="Page cache use while reading reads: 'default', 'drop' (free read data right away) or 'keep' (keep hashed data of files that fit into memory until uploaded, then free it)"
+    ),
+    parallel: str = typer.Option(
+        "auto", "--parallel", help="Concurrent part uploads: 'auto' adapts to the observed throughput and errors (remembered per host), or a fixed number"
+    ),
+    max_parallel: int = typer.Option(
+        8, "--max-parallel", help="Upper limit for --parallel auto"
+    ),
+    max_bandwidth: Optional[str] = typer.Option(
+        None, "--max-bandwidth", help="Limit the upload rate of all parts together, e.g. 200MB/s", show_default=False
+    ),
+    bandwidth_schedule: Optional[Path] = typer.Option(
+        None, "--bandwidth-schedule", help="File with upload limits by weekday and time of day (lines '<days> <from-to> <limit>'), re-read when changed", show_default=False
+    ),
+    gzip: bool = typer.Option(
+        False, "--gzip", help="Send JSON request bodies gzip-compressed (falls back automatically if the server rejects it)"
+    ),
+    compress_reads: bool = typer.Option(
+        False, "--compress", help="Gzip plain FASTQ/FASTA files on the fly (multi-threaded) and upload them as .gz"
+    ),
+    compress_threads: Optional[int] = typer.Option(
+        None, "--compress-threads", help="Threads for --compress. Default: number of CPUs", show_default=False
+    ),
+    compress_level: int = typer.Option(
+        6, "--compress-level", help="gzip level for --compress (1-9)"
+    ),
+    compress_dir: Optional[Path] = typer.Option(
+        None, "--compress-dir", help="Directory for the temporary compressed files. Default: system temp directory", show_default=False
+    ),
+    check_reads: bool = typer.Option(
+        False, "--check-reads", help="Check the FASTQ/FASTA structure while hashing and skip invalid files"
+    ),
+    gzip_check_enabled: bool = typer.Option(
+        True, "--gzip-check/--no-gzip-check", help="Verify CRC32/ISIZE of .gz read files while hashing and skip corrupt files"
+    ),
+    dedup_mode: str = typer.Option(
+        "off", "--dedup", help="Reuse the validated DocumentReference of identical read files (same SHA-256): 'off', 'run' (within this CSV) or 'store' (also from earlier runs in the run store)"
+    ),
+    dedup_max_age: float = typer.Option(
+        dedup.MAX_AGE / 3600, "--dedup-max-age", help="With --dedup store, only reuse DocumentReferences validated within this many hours"
+    ),
+    run_store_file: Optional[Path] = typer.Option(
+        None, "--run-store", help="SQLite file with the local upload history, 'none' disables it (no --dedup store, no replay-notifications). Default: <log dir>/logging/igsupload_runs.sqlite", show_default=False
+    ),
+    run_store_retention: float = typer.Option(
+        run_store.RETENTION_DAYS, "--run-store-retention", help="Delete run store entries (including unsent notification bundles) older than this many days; 0 keeps everything"
+    ),
+    deterministic_ids: bool = typer.Option(
+        False, "--deterministic-ids", help="Derive bundle resource ids from DEMIS_NOTIFICATION_ID (UUIDv5) and skip rows that were already notified unchanged"
+    ),
+    spans_file: Optional[Path] = typer.Option(
+        None, "--spans-file", help="Write per-stage timing spans as JSON lines to this file", show_default=False
+    ),
+    metrics_file: Optional[Path] = typer.Option(
+        None, "--metrics-file", help="Write OpenMetrics upload metrics to this file (node_exporter textfile collector), e.g. /var/lib/node_exporter/igsupload.prom", show_default=False
+    ),
+    event_log: Optional[Path] = typer.Option(
+        None, "--event-log", help="Append structured events (JSON lines: level, stage, sample, file, doc_id, bytes, duration) to this file", show_default=False
+    ),
+    quiet: bool = typer.Option(
+        False, "--quiet", "-q", help="Only print summaries and errors to the console"
+    ),
+    show_progress: Optional[bool] = typer.Option(
+        None, "--progress/--no-progress", help="Live progress with MB/s and ETA. Default: on if the output is a terminal", show_default=False
+    ),
+    profile: bool = typer.Option(
+        False, "--profile", help="Profile the run (cProfile + stack sampler) and print wall vs CPU time per stage"
+    ),
+    profile_dir: Optional[Path] = typer.Option(
+        None, "--profile-dir", help="Directory for profile results. Default: <log dir>/profile/<timestamp>", show_default=False
+    ),
+    profile_memory: bool = typer.Option(
+        False, "--profile-memory", help="With --profile: also record the top allocation sites via tracemalloc"
+    ),
 ):
     """
     Start the upload using --csv, optional --config and optional --log.
@@ -67,14 +319,76 @@ def main(
     # set log file path
     set_logging_path(path=str(log))
 
+    try:
+        set_read_roots(reads, reads_pattern)
+    except NotADirectoryError as e:
+        typer.echo(typer.style(f"Error: {e}", fg=typer.colors.RED))
+        raise typer.Exit(code=2)
+
+    try:
+        set_page_cache(page_cache)
+    except ValueError as e:
+        typer.echo(typer.style(f"Error: {e}", fg=typer.colors.RED))
+        raise typer.Exit(code=2)
+
+    try:
+        concurrency.set_parallel(parallel, max_parallel, base_dir=igsupload_logger.logging_path)
+        bandwidth.set_max_bandwidth(max_bandwidth)
+        bandwidth.set_schedule_file(bandwidth_schedule)
+    except (ValueError, FileNotFoundError) as e:
+        typer.echo(typer.style(f"Error: {e}", fg=typer.colors.RED))
+        raise typer.Exit(code=2)
+
+    set_gzip(gzip)
+    try:
+        compress.set_compress(compress_reads, compress_threads, compress_level, compress_dir)
+    except (ValueError, NotADirectoryError) as e:
+        typer.echo(typer.style(f"Error: {e}", fg=typer.colors.RED))
+        raise typer.Exit(code=2)
+    reads_check.set_check_reads(check_reads)
+    gzip_check.set_gzip_check(gzip_check_enabled)
+    set_spans_file(spans_file)
+    events.set_quiet(quiet)
+    progress.set_progress(show_progress)
+    try:
+        events.set_event_log(event_log)
+    except NotADirectoryError as e:
+        typer.echo(typer.style(f"Error: {e}", fg=typer.colors.RED))
+        raise typer.Exit(code=2)
+    try:
+        set_textfile(metrics_file)
+    except NotADirectoryError as e:
+        typer.echo(typer.style(f"Error: {e}", fg=typer.colors.RED))
+        raise typer.Exit(code=2)
+
     # CSV prüfen
     csv_path = csv.expanduser().resolve()
     if not csv_path.exists() or not csv_path.is_file():
         typer.echo(typer.style(f"Error: CSV path '{csv_path}' not found.", fg=typer.colors.RED))
         raise typer.Exit(code=2)
 
+    # Run-Store erst nach der CSV-Prüfung öffnen: ein Tippfehler in --csv legt keine Datei an und löscht nichts
+    try:
+        if run_store_file is not None and str(run_store_file).lower() == "none":
+            run_store.set_run_store(None)
+        else:
+            run_store.set_run_store(run_store_file or run_store.default_path(igsupload_logger.logging_path))
+            purged = run_store.purge(run_store_retention)
+            if purged:
+                print(f"[INFO] Run store: removed {purged} entries older than {run_store_retention:g} days")
+        dedup.set_dedup(dedup_mode, dedup_max_age)
+    except (ValueError, OSError) as e:
+        typer.echo(typer.style(f"Error: {e}", fg=typer.colors.RED))
+        raise typer.Exit(code=2)
+    if deterministic_ids and not run_store.enabled():
+        print("[WARN] --deterministic-ids without run store: rows that were already notified are not skipped")
+    igs_notification.set_deterministic_ids(deterministic_ids)
+
+    profiling.set_profile(profile, profile_dir, profile_memory, base_dir=igsupload_logger.logging_path)
+
     typer.echo(f"[INFO] load CSV-file: {csv_path}")
-    start(str(csv_path))
+    if profiling.run(start, str(csv_path)) is False:
+        raise typer.Exit(code=1)
 
 
 if __name__ == "__main__":
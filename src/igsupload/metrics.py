@@ -0,0 +1,197 @@
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from igsupload.igsupload_logger import resolve_path
+
+# OpenMetrics-Textdatei für den node_exporter textfile collector (--metrics-file)
+textfile_path: Optional[str] = None
+WRITE_INTERVAL = 15.0
+_last_write = 0.0
+_lock = threading.Lock()
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _labels_key(labels: dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, unit: str = ""):
+        self.name, self.help, self.unit = name, help, unit
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels_key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(_labels_key(labels), 0)
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}_total{_format_labels(key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self.values[_labels_key(labels)] = value
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets=SECONDS_BUCKETS, unit: str = ""):
+        self.name, self.help, self.unit = name, help, unit
+        self.buckets = tuple(buckets)
+        self.values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _labels_key(labels)
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            state[0][index] += 1
+            state[1] += 1
+            state[2] += value
+
+    def get(self, **labels):
+        """(count, sum) for the given labels."""
+        state = self.values.get(_labels_key(labels))
+        return (state[1], state[2]) if state else (0, 0.0)
+
+    def samples(self):
+        for key, (counts, count, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound) if bound == float("inf") else float(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(key, le)} {cumulative}"
+            yield f"{self.name}_count{_format_labels(key)} {count}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(total)}"
+
+
+# --- Metriken ---
+uploaded_bytes = Counter("igsupload_uploaded_bytes", "Bytes of read files uploaded in parts.", unit="bytes")
+parts_uploaded = Counter("igsupload_parts_uploaded", "Parts uploaded successfully.")
+parts_retried = Counter("igsupload_parts_retried", "Part uploads that were retried.")
+parts_failed = Counter("igsupload_parts_failed", "Part uploads that failed.")
+presigned_url_refreshes = Counter("igsupload_presigned_url_refreshes", "Presigned part URLs re-fetched before expiry or after a 403.")
+part_upload_seconds = Histogram("igsupload_part_upload_seconds", "Duration of one part PUT.", unit="seconds")
+hashed_bytes = Counter("igsupload_hashed_bytes", "Bytes hashed with SHA-256.", unit="bytes")
+hash_seconds = Counter("igsupload_hash_seconds", "Time spent hashing read files.", unit="seconds")
+hash_throughput = Gauge(
+    "igsupload_hash_throughput_bytes_per_second", "SHA-256 throughput of the last hashed file."
+)
+compressed_bytes = Counter("igsupload_compressed_bytes", "Bytes read and written by --compress, by direction.", unit="bytes")
+validation_wait_seconds = Histogram(
+    "igsupload_validation_wait_seconds", "Time from polling start until validation is done.", unit="seconds"
+)
+notifications = Counter("igsupload_notifications", "Sequence notifications sent, by result.")
+token_refreshes = Counter("igsupload_token_refreshes", "Token requests, by result.")
+run_in_progress = Gauge("igsupload_run_in_progress", "1 while an upload run is active.")
+last_run_timestamp = Gauge(
+    "igsupload_last_run_timestamp_seconds", "Unix time of the last metrics update.", unit="seconds"
+)
+
+REGISTRY = (
+    uploaded_bytes, parts_uploaded, parts_retried, parts_failed, presigned_url_refreshes, part_upload_seconds,
+    hashed_bytes, hash_seconds, hash_throughput, compressed_bytes, validation_wait_seconds,
+    notifications, token_refreshes, run_in_progress, last_run_timestamp,
+)
+
+
+def set_textfile(path: Optional[Path]):
+    """Sets the textfile-collector path (--metrics-file); None disables the export."""
+    global textfile_path
+    if path is None:
+        textfile_path = None
+        return
+    resolved = resolve_path(path)
+    if not resolved.parent.is_dir():
+        raise NotADirectoryError(f"Metrics directory not found: {resolved.parent}")
+    textfile_path = str(resolved)
+    print(f"[INFO] Writing metrics to: {textfile_path}")
+
+
+def reset():
+    with _lock:
+        for metric in REGISTRY:
+            metric.values.clear()
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if metric.unit:
+            lines.append(f"# UNIT {metric.name} {metric.unit}")
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        with _lock:
+            lines.extend(metric.samples())
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(force: bool = True):
+    """
+    Writes all metrics to textfile_path via a temp file + os.replace, so the
+    collector never reads a half-written file. Without force at most every
+    WRITE_INTERVAL seconds (for updates during the run).
+    """
+    global _last_write
+    if not textfile_path:
+        return
+    now = time.monotonic()
+    if not force and now - _last_write < WRITE_INTERVAL:
+        return
+    _last_write = now
+    last_run_timestamp.set(time.time())
+
+    directory = os.path.dirname(textfile_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".igsupload_metrics_", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(render())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, textfile_path)
+    except OSError as e:
+        print(f"[WARN] Could not write metrics file {textfile_path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
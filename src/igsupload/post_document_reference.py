@@ -1,6 +1,8 @@
 import typer
 import igsupload.config as config
 import requests
+from igsupload.serialization import post_json
+import igsupload.events as events
 
 def post_document_reference(document_reference, token):
     try:
@@ -9,16 +11,18 @@ def post_document_reference(document_reference, token):
           "Content-Type": "application/fhir+json"
         }
     
-        response = requests.post(
+        response = post_json(
             f"{config.BASE_URL}/fhir/DocumentReference",
-            headers=headers,
-            json=document_reference,
+            document_reference,
+            headers,
+            stage="post_document_reference",
             cert=(config.CERT, config.KEY)
         )
 
         if response.status_code == 201:
             result = response.json()
-            print(f"Upload {typer.style('successful', fg=typer.colors.GREEN)}: DocumentReference ID = {result.get('id')}")
+            if not events.quiet:
+                print(f"Upload {typer.style('successful', fg=typer.colors.GREEN)}: DocumentReference ID = {result.get('id')}")
             return result.get("id")
 
         print(f"{typer.style('Error', fg=typer.colors.RED)} during Upload: {response.status_code}")
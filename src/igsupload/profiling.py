@@ -0,0 +1,172 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+import igsupload.timing as timing
+from igsupload.igsupload_logger import resolve_path
+
+# --profile: Ausgabeverzeichnis; None = Profiling aus
+profile_dir: Optional[str] = None
+trace_memory = False
+SAMPLE_INTERVAL = 0.005
+TOP_ALLOCATIONS = 25
+
+
+def set_profile(enabled: bool, directory: Optional[Path] = None, memory: bool = False, base_dir: Optional[str] = None):
+    """
+    Enables --profile. Results go to `directory`, by default
+    <base_dir>/profile/<timestamp>. With memory=True tracemalloc is started as well.
+    """
+    global profile_dir, trace_memory
+    if not enabled:
+        profile_dir, trace_memory = None, False
+        return
+    if directory is None:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        directory = Path(base_dir or os.getcwd()) / "profile" / stamp
+    path = resolve_path(directory)
+    os.makedirs(path, exist_ok=True)
+    profile_dir = str(path)
+    trace_memory = memory
+    print(f"[INFO] Profiling enabled, results in: {profile_dir}")
+
+
+class StackSampler:
+    """
+    Low-overhead sampling profiler: a daemon thread records the Python stacks
+    of all other threads every `interval` seconds. Output is the collapsed
+    stack format ("thread;frame;frame count") used by flamegraph.pl/speedscope.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="igsupload-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def stage_breakdown(summary: dict) -> dict:
+    """Wall vs CPU per stage; the difference is time spent waiting on disk or network."""
+    breakdown = {}
+    for stage, s in summary.items():
+        wall, cpu = s["total"], s["cpu"]
+        breakdown[stage] = {
+            "count": s["count"],
+            "wall_seconds": round(wall, 6),
+            "cpu_seconds": round(cpu, 6),
+            "wait_seconds": round(max(wall - cpu, 0.0), 6),
+            "cpu_share": round(cpu / wall, 3) if wall else None,
+        }
+    return breakdown
+
+
+def _print_breakdown(breakdown: dict, wall: float, cpu: float):
+    typer.secho("\nProfile: wall vs CPU per stage", bold=True)
+    typer.echo(f"{'stage':<26}{'wall s':>10}{'cpu s':>10}{'wait s':>10}{'cpu %':>8}")
+    for stage, b in breakdown.items():
+        share = f"{b['cpu_share'] * 100:.0f}" if b["cpu_share"] is not None else "-"
+        typer.echo(f"{stage:<26}{b['wall_seconds']:>10.2f}{b['cpu_seconds']:>10.2f}{b['wait_seconds']:>10.2f}{share:>8}")
+    typer.echo(f"{'whole run':<26}{wall:>10.2f}{cpu:>10.2f}{max(wall - cpu, 0.0):>10.2f}")
+
+
+def run(fn, *args, **kwargs):
+    """
+    Runs fn (normally workflow.start) under cProfile and the stack sampler and
+    writes to profile_dir: profile.pstats, profile.txt (top functions),
+    profile.collapsed, stages.json and with trace_memory tracemalloc.txt.
+    Without --profile fn is simply called.
+    """
+    if not profile_dir:
+        return fn(*args, **kwargs)
+
+    if trace_memory:
+        tracemalloc.start(10)
+    sampler = StackSampler().start()
+    profiler = cProfile.Profile()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot() if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+        _write_results(profiler, sampler, snapshot, wall, cpu)
+
+
+def _write_results(profiler, sampler, snapshot, wall, cpu):
+    profiler.dump_stats(os.path.join(profile_dir, "profile.pstats"))
+    with open(os.path.join(profile_dir, "profile.txt"), "w", encoding="utf-8") as f:
+        stats = pstats.Stats(profiler, stream=f).strip_dirs().sort_stats("cumulative")
+        stats.print_stats(40)
+        stats.sort_stats("tottime").print_stats(40)
+    sampler.write_collapsed(os.path.join(profile_dir, "profile.collapsed"))
+
+    breakdown = stage_breakdown(timing.summarize())
+    with open(os.path.join(profile_dir, "stages.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "wall_seconds": round(wall, 6),
+            "cpu_seconds": round(cpu, 6),
+            "samples": sampler.samples,
+            "stages": breakdown,
+        }, f, indent=2)
+    _print_breakdown(breakdown, wall, cpu)
+
+    if snapshot is not None:
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        top = snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        with open(os.path.join(profile_dir, "tracemalloc.txt"), "w", encoding="utf-8") as f:
+            for stat in top:
+                f.write(f"{stat}\n")
+        typer.secho("\nTop allocation sites", bold=True)
+        for stat in top[:10]:
+            typer.echo(f"  {stat}")
+
+    typer.echo(f"Profile written to {profile_dir} (open profile.pstats with snakeviz, profile.collapsed with flamegraph.pl/speedscope)")
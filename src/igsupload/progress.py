@@ -0,0 +1,205 @@
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+# --progress/--no-progress; None = automatisch (nur wenn stderr ein Terminal ist)
+enabled: Optional[bool] = None
+REDRAW_INTERVAL = 0.2
+RATE_WINDOW = 0.5
+IDLE_GAP = 1.0
+EWMA_ALPHA = 0.3
+
+_lock = threading.Lock()
+_state = None
+
+
+def set_progress(value: Optional[bool]):
+    global enabled
+    enabled = value
+
+
+def _is_active(stream) -> bool:
+    if enabled is not None:
+        return enabled
+    isatty = getattr(stream, "isatty", None)
+    return bool(isatty and isatty())
+
+
+class _Rate:
+    """
+    Exponentially weighted moving average of bytes/s over RATE_WINDOW windows.
+    Pauses longer than IDLE_GAP (e.g. hashing while the upload waits) start a new window.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.value: Optional[float] = None
+        self._window_start = self._last = time.monotonic()
+        self._window_bytes = 0
+
+    def add(self, nbytes: int, now: float):
+        self.total += nbytes
+        idle = now - self._last > IDLE_GAP
+        self._last = now
+        if idle:
+            self._window_start, self._window_bytes = now, 0
+            return
+        self._window_bytes += nbytes
+        elapsed = now - self._window_start
+        if elapsed >= RATE_WINDOW:
+            current = self._window_bytes / elapsed
+            self.value = current if self.value is None else EWMA_ALPHA * current + (1 - EWMA_ALPHA) * self.value
+            self._window_start, self._window_bytes = now, 0
+
+
+class Progress:
+    def __init__(self, total_bytes: int, total_files: int, stream):
+        # getrennte Summen: mit --compress wird weniger hochgeladen als gehasht
+        self.hash_total = total_bytes
+        self.upload_total = total_bytes
+        self.total_files = total_files
+        self.stream = stream
+        self.hashed = _Rate()
+        self.uploaded = _Rate()
+        self.files: Dict[str, str] = {}
+        self.done_files = 0
+        self.started = time.monotonic()
+        self._last_draw = 0.0
+        self._width = 0
+
+    def eta(self) -> Optional[float]:
+        """Remaining hashing + uploading at the current rates (both run one after the other)."""
+        seconds = 0.0
+        for rate, total in ((self.hashed, self.hash_total), (self.uploaded, self.upload_total)):
+            remaining = max(total - rate.total, 0)
+            if remaining:
+                if not rate.value:
+                    return None
+                seconds += remaining / rate.value
+        return seconds
+
+    def line(self) -> str:
+        stages = {}
+        for stage in self.files.values():
+            stages[stage] = stages.get(stage, 0) + 1
+        active = " ".join(f"{stage}:{count}" for stage, count in sorted(stages.items()))
+        eta = self.eta()
+        return (
+            f"files {self.done_files}/{self.total_files}"
+            f"{' [' + active + ']' if active else ''} | "
+            f"hashed {_mb(self.hashed.total)}/{_mb(self.hash_total)} {_rate(self.hashed.value)} | "
+            f"uploaded {_mb(self.uploaded.total)}/{_mb(self.upload_total)} {_rate(self.uploaded.value)} | "
+            f"ETA {_duration(eta)}"
+        )
+
+    def draw(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_draw < REDRAW_INTERVAL:
+            return
+        self._last_draw = now
+        text = self.line()
+        padding = " " * max(self._width - len(text), 0)
+        self._width = len(text)
+        self.stream.write("\r" + text + padding)
+        self.stream.flush()
+
+
+def _mb(nbytes: int) -> str:
+    return f"{nbytes / 1e6:,.0f} MB" if nbytes >= 1e7 else f"{nbytes / 1e6:.1f} MB"
+
+
+def _rate(value: Optional[float]) -> str:
+    return f"({value / 1e6:.1f} MB/s)" if value else "(- MB/s)"
+
+
+def _duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60:02d}:{rest % 60:02d}"
+
+
+def wanted() -> bool:
+    """True if start() would show the display (checked first, so totals are only computed when needed)."""
+    return _is_active(sys.stderr)
+
+
+def start(total_bytes: int, total_files: int, stream=None):
+    """Starts the display for one run; does nothing if the output is not a terminal."""
+    global _state
+    stream = stream or sys.stderr
+    with _lock:
+        _state = Progress(total_bytes, total_files, stream) if _is_active(stream) else None
+
+
+def active() -> bool:
+    """True while the display is drawn (per-part console output is suppressed then)."""
+    return _state is not None
+
+
+def add_hashed(nbytes: int):
+    state = _state
+    if state is None:
+        return
+    with _lock:
+        state.hashed.add(nbytes, time.monotonic())
+        state.draw()
+
+
+def add_uploaded(nbytes: int):
+    state = _state
+    if state is None:
+        return
+    with _lock:
+        state.uploaded.add(nbytes, time.monotonic())
+        state.draw()
+
+
+def uploads_as(raw_size: int, upload_size: int):
+    """A file is uploaded with another size than it was counted with (--compress spool file)."""
+    state = _state
+    if state is None:
+        return
+    with _lock:
+        state.upload_total += upload_size - raw_size
+
+
+def skip(hash_bytes: int = 0, upload_bytes: int = 0, files: int = 0):
+    """
+    Work that will not happen (row skipped, upload skipped or deduplicated) is
+    removed from the totals; `files` that were never started count as done.
+    """
+    state = _state
+    if state is None:
+        return
+    with _lock:
+        state.hash_total -= hash_bytes
+        state.upload_total -= upload_bytes
+        state.done_files += files
+        state.draw()
+
+
+def file_stage(file_name: str, stage: Optional[str]):
+    """Moves a file to a stage (hash, upload, validate, ...); None marks it as done."""
+    state = _state
+    if state is None:
+        return
+    with _lock:
+        if stage is None:
+            if state.files.pop(file_name, None) is not None:
+                state.done_files += 1
+        else:
+            state.files[file_name] = stage
+        state.draw()
+
+
+def finish():
+    global _state
+    with _lock:
+        state, _state = _state, None
+        if state is not None:
+            state.draw(force=True)
+            state.stream.write("\n")
+            state.stream.flush()
@@ -0,0 +1,200 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from itertools import repeat
+from typing import List
+
+from igsupload.gzip_check import GzipVerifier
+
+# --check-reads: Struktur von FASTQ/FASTA lokal prüfen, im selben Lesedurchlauf wie der Hash
+enabled = False
+
+BUFFER_SIZE = 4 * 1024 * 1024
+MAX_ERRORS = 10
+
+_IUPAC = b"ACGTURYSWKMBDHVNacgturyswkmbdhvn"
+SEQUENCE_ALPHABET = _IUPAC + b".-*\r"
+QUALITY_ALPHABET = bytes(range(33, 127)) + b"\r"
+
+
+def set_check_reads(enable: bool):
+    global enabled
+    enabled = bool(enable)
+
+
+def is_fasta(file_name: str) -> bool:
+    return file_name.endswith((".fasta", ".fa", ".fasta.gz", ".fa.gz"))
+
+
+@dataclass
+class CheckResult:
+    records: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+class _LineChecker(ABC):
+    """
+    Collects fed bytes into large buffers and checks complete lines per buffer
+    with C-level bytes operations (split, map, translate) instead of per-byte Python.
+    """
+
+    def __init__(self):
+        self.result = CheckResult()
+        self.line_no = 0  # Zeilen vor dem aktuellen Puffer
+        self._chunks: List[bytes] = []
+        self._size = 0
+
+    def update(self, data: bytes):
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        if self._size >= BUFFER_SIZE:
+            buffer = b"".join(self._chunks)
+            end = buffer.rfind(b"\n")
+            rest = buffer[end + 1:]
+            self._chunks, self._size = [rest], len(rest)
+            if end >= 0:
+                self._check(buffer[:end].split(b"\n"))
+
+    def finish(self) -> CheckResult:
+        data = b"".join(self._chunks)
+        self._chunks, self._size = [], 0
+        if data.endswith(b"\n"):
+            data = data[:-1]
+        if data:
+            self._check(data.split(b"\n"))
+        self._finish()
+        return self.result
+
+    def _error(self, offset: int, message: str):
+        if len(self.result.errors) < MAX_ERRORS:
+            self.result.errors.append(f"line {self.line_no + offset + 1}: {message}")
+
+    @abstractmethod
+    def _check(self, lines: List[bytes]):
+        """Checks complete lines; line_no is the number of lines before them."""
+
+    def _finish(self):
+        pass
+
+
+class FastqChecker(_LineChecker):
+    """4-line records: @header, sequence, +[header], quality of the same length."""
+
+    def __init__(self):
+        super().__init__()
+        self._carry: List[bytes] = []  # unvollständiger Record aus dem letzten Puffer
+
+    def _check(self, lines: List[bytes]):
+        lines = self._carry + lines
+        usable = len(lines) - len(lines) % 4
+        self._carry = lines[usable:]
+
+        headers, sequences, separators, qualities = (lines[i:usable:4] for i in range(4))
+        if not (all(map(bytes.startswith, headers, repeat(b"@")))
+                and all(map(bytes.startswith, separators, repeat(b"+")))
+                and all(sequences)
+                and list(map(len, sequences)) == list(map(len, qualities))
+                and not b"".join(sequences).translate(None, SEQUENCE_ALPHABET)
+                and not b"".join(qualities).translate(None, QUALITY_ALPHABET)):
+            self._locate(lines, usable)
+
+        self.result.records += usable // 4
+        self.line_no += usable
+
+    def _locate(self, lines: List[bytes], usable: int):
+        # nur im Fehlerfall Record für Record prüfen, um Zeilennummern zu melden
+        for start in range(0, usable, 4):
+            header, sequence, separator, quality = lines[start:start + 4]
+            if not header.startswith(b"@"):
+                self._error(start, "record header must start with '@'")
+            if not sequence:
+                self._error(start + 1, "empty sequence")
+            invalid = sequence.translate(None, SEQUENCE_ALPHABET)
+            if invalid:
+                self._error(start + 1, f"invalid sequence characters {_show(invalid)}")
+            if not separator.startswith(b"+"):
+                self._error(start + 2, "separator line must start with '+'")
+            if len(sequence) != len(quality):
+                self._error(start + 3, f"quality length {len(quality)} != sequence length {len(sequence)}")
+            invalid = quality.translate(None, QUALITY_ALPHABET)
+            if invalid:
+                self._error(start + 3, f"invalid quality characters {_show(invalid)}")
+            if len(self.result.errors) >= MAX_ERRORS:
+                return
+
+    def _finish(self):
+        if self._carry:
+            self._error(0, f"truncated record ({len(self._carry)} of 4 lines)")
+        elif self.result.records == 0 and self.result.ok:
+            self._error(0, "no FASTQ records")
+
+
+class FastaChecker(_LineChecker):
+    """'>' headers, each followed by at least one non-empty sequence line."""
+
+    def __init__(self):
+        super().__init__()
+        self._header_line = None  # letzter Header, solange noch keine Sequenzzeile folgte
+        self._started = False
+
+    def _check(self, lines: List[bytes]):
+        is_header = [line[:1] == b">" for line in lines]
+        sequences = [line for line, header in zip(lines, is_header) if not header]
+        if b"".join(sequences).translate(None, SEQUENCE_ALPHABET):
+            for i, line in enumerate(lines):
+                invalid = not is_header[i] and line.translate(None, SEQUENCE_ALPHABET)
+                if invalid:
+                    self._error(i, f"invalid sequence characters {_show(invalid)}")
+
+        for i, header in enumerate(is_header):
+            if header:
+                if self._header_line is not None:
+                    self._error(self._header_line - self.line_no, "header without sequence")
+                self._header_line = self.line_no + i
+                self._started = True
+                self.result.records += 1
+            elif not self._started:
+                self._error(i, "file must start with a '>' header")
+                self._started = True
+            elif not lines[i]:
+                self._error(i, "empty line")
+            else:
+                self._header_line = None
+        self.line_no += len(lines)
+
+    def _finish(self):
+        if self._header_line is not None:
+            self._error(self._header_line - self.line_no, "header without sequence (truncated file?)")
+        elif self.result.records == 0 and self.result.ok:
+            self._error(0, "no FASTA records")
+
+
+def _show(invalid: bytes) -> str:
+    return repr("".join(sorted(set(invalid.decode("latin-1")))))
+
+
+def checker_for(file_name: str):
+    """
+    Checker for the uncompressed content of file_name; fed by create_hash /
+    compress_read, for .gz files by gzip_check.GzipVerifier(sink=checker).
+    """
+    return FastaChecker() if is_fasta(file_name) else FastqChecker()
+
+
+def check_file(file_path: str, file_name: str = None) -> CheckResult:
+    file_name = file_name or file_path
+    checker = checker_for(file_name)
+    consumer = GzipVerifier(sink=checker) if file_name.endswith(".gz") else checker
+    with open(file_path, "rb") as f:
+        while chunk := f.read(BUFFER_SIZE):
+            consumer.update(chunk)
+    if consumer is checker:
+        return checker.finish()
+    gzip_result = consumer.finish()
+    result = checker.finish()
+    if not gzip_result.ok:
+        result.errors.insert(0, gzip_result.error)
+    return result
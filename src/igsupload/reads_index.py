@@ -0,0 +1,158 @@
+import os
+import re
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase, translate
+from typing import Dict, Iterable, List, Optional, Union
+
+from igsupload.reads_io import ConcatRead, concat_name, is_multi
+from igsupload.igsupload_logger import resolve_path
+
+read_roots: List[str] = []
+read_patterns: List[str] = []
+
+
+def set_read_roots(roots: Optional[Iterable] = None, patterns: Optional[Iterable[str]] = None):
+    """
+    Sets the directories scanned for read files (--reads) and optional glob
+    patterns for file names (--reads-pattern). Without roots the workflow
+    falls back to <csv dir>/../reads.
+    """
+    global read_roots, read_patterns
+
+    resolved = []
+    for root in roots or []:
+        path = resolve_path(root)
+        if not path.is_dir():
+            raise NotADirectoryError(f"Reads directory not found: {path}")
+        resolved.append(str(path))
+    read_roots = resolved
+    read_patterns = [p for p in (patterns or []) if p]
+    if read_roots:
+        print(f"[INFO] Reads directories: {', '.join(read_roots)}")
+
+
+def default_roots(csv_path: str) -> List[str]:
+    return read_roots or [os.path.abspath(os.path.join(os.path.dirname(csv_path), "..", "reads"))]
+
+
+@dataclass(frozen=True, slots=True)
+class ReadEntry:
+    path: str
+    size: int
+    mtime: float
+
+
+@dataclass
+class ReadsIndex:
+    roots: List[str]
+    by_name: Dict[str, List[ReadEntry]] = field(default_factory=dict)
+    by_relpath: Dict[str, ReadEntry] = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.by_relpath)
+
+    def resolve(self, file_name: str) -> Union[ReadEntry, ConcatRead]:
+        """
+        Looks up a FILE_n_NAME value. Plain names are matched anywhere below the
+        roots, names with a directory part relative to a root (e.g. run_42/S1_R1.fastq).
+        A comma list or glob (S1_L00*_R1_001.fastq.gz) of several lane files
+        resolves to one ConcatRead.
+        """
+        if is_multi(file_name):
+            return self._resolve_multi(file_name)
+        return self._resolve_one(file_name)
+
+    def _resolve_multi(self, file_name: str) -> Union[ReadEntry, ConcatRead]:
+        names, entries = [], []
+        for item in (part.strip() for part in file_name.split(",")):
+            if not item:
+                continue
+            if not any(c in item for c in "*?["):
+                names.append(item)
+                entries.append(self._resolve_one(item))
+                continue
+            key = item.replace(os.sep, "/").strip("/")
+            candidates = self.by_relpath if "/" in key else self.by_name
+            matched = sorted(name for name in candidates if fnmatchcase(name, key))
+            if not matched:
+                raise FileNotFoundError(f"No files match: {item} (searched {', '.join(self.roots)})")
+            for name in matched:
+                names.append(name)
+                entries.append(self._resolve_one(name))
+
+        if len({entry.path for entry in entries}) != len(entries):
+            raise ValueError(f"Files listed more than once: {file_name}")
+        if len({_kind(name) for name in names}) > 1:
+            raise ValueError(f"Cannot concatenate different file types: {', '.join(names)}")
+        if len(entries) == 1:
+            return entries[0]
+        return ConcatRead(parts=tuple(entries), name=concat_name(names))
+
+    def _resolve_one(self, file_name: str) -> ReadEntry:
+        key = file_name.replace(os.sep, "/").strip("/")
+        entry = self.by_relpath.get(key)
+        if entry is not None:
+            return entry
+
+        matches = self.by_name.get(key, [])
+        if len(matches) == 1:
+            return matches[0]
+        if not matches:
+            raise FileNotFoundError(f"File not found: {file_name} (searched {', '.join(self.roots)})")
+        paths = ", ".join(sorted(m.path for m in matches))
+        raise ValueError(
+            f"Ambiguous file name: {file_name} matches {len(matches)} files ({paths}). "
+            "Use a path relative to the reads directory in the CSV."
+        )
+
+
+def _kind(file_name: str) -> str:
+    """Extension incl. .gz, e.g. '.fastq.gz' (lanes must all have the same)."""
+    name = file_name.lower()
+    compressed = name.endswith(".gz")
+    base = os.path.splitext(name[:-3] if compressed else name)[1]
+    return base + (".gz" if compressed else "")
+
+
+def _walk(directory: str):
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk(entry.path)
+        elif entry.is_file():
+            yield entry
+
+
+def build_reads_index(roots: Iterable[str], patterns: Optional[Iterable[str]] = None) -> ReadsIndex:
+    """
+    Scans all roots once (recursively, via os.scandir) and caches
+    name -> (path, size, mtime), so no per-file stat is needed later.
+    """
+    roots = [os.path.abspath(r) for r in roots]
+    patterns = list(patterns or [])
+    matcher = re.compile("|".join(translate(p) for p in patterns)).match if patterns else None
+
+    index = ReadsIndex(roots=roots)
+    seen = set()
+    for root in roots:
+        for entry in _walk(root):
+            if matcher is not None and not matcher(entry.name):
+                continue
+            stat = entry.stat()
+            # dieselbe Datei über überlappende Roots nur einmal aufnehmen
+            # (DirEntry.stat() liefert unter Windows st_ino = 0)
+            file_id = (stat.st_dev, stat.st_ino)
+            if stat.st_ino:
+                if file_id in seen:
+                    continue
+                seen.add(file_id)
+
+            read = ReadEntry(path=entry.path, size=stat.st_size, mtime=stat.st_mtime)
+            relpath = os.path.relpath(entry.path, root).replace(os.sep, "/")
+            index.by_relpath.setdefault(relpath, read)
+            index.by_name.setdefault(entry.name, []).append(read)
+    return index
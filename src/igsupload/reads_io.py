@@ -0,0 +1,200 @@
+import io
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple, Union
+
+# Lane-Kennung von BCL Convert / bcl2fastq: Sample_S1_L001_R1_001.fastq.gz
+_LANE = re.compile(r"_L\d{3}(?=_)")
+
+# --page-cache: Umgang mit dem Page Cache beim Lesen der Read-Dateien
+#   default: keine Hinweise an den Kernel
+#   drop:    sequentiell lesen und gelesene Bereiche sofort freigeben (Hash- und Upload-Durchlauf)
+#   keep:    gehashte Bereiche im Cache lassen, bis ihr Part hochgeladen ist. Der Upload braucht den
+#            vollständigen Hash vorab, also wird die Datei zweimal gelesen; nur wenn sie in den freien
+#            Speicher passt, kommt der zweite Durchlauf aus dem Cache. Größere Dateien werden wie bei
+#            drop gehasht, sie würden sonst nur den Cache anderer Prozesse verdrängen.
+PAGE_CACHE_MODES = ("default", "drop", "keep")
+page_cache = "default"
+READAHEAD = 8 * 1024 * 1024
+DROP_STEP = 8 * 1024 * 1024
+
+_fadvise = getattr(os, "posix_fadvise", None)  # nicht unter Windows/macOS
+
+
+def set_page_cache(mode: str):
+    global page_cache
+    if mode not in PAGE_CACHE_MODES:
+        raise ValueError(f"Invalid page cache mode: {mode} (expected one of {', '.join(PAGE_CACHE_MODES)})")
+    page_cache = mode
+    if mode != "default" and _fadvise is None:
+        print(f"[WARN] --page-cache {mode} has no effect on this platform (no posix_fadvise)")
+
+
+def is_multi(file_name: str) -> bool:
+    """True for FILE_n_NAME values that list (a,b) or glob (S1_L00*_R1_001.fastq.gz) several files."""
+    return "," in file_name or any(c in file_name for c in "*?[")
+
+
+@dataclass(frozen=True)
+class ConcatRead:
+    """
+    Several lane files uploaded as one virtual file: size and SHA-256 cover the
+    concatenation, parts may cross file boundaries, nothing is written to disk.
+    Concatenated .gz files are a valid multi-member gzip file.
+    """
+    parts: Tuple  # ReadEntry, in upload order
+    name: str     # name used for the DocumentReference
+
+    @property
+    def path(self) -> Tuple[str, ...]:
+        return tuple(part.path for part in self.parts)
+
+    @property
+    def size(self) -> int:
+        return sum(part.size for part in self.parts)
+
+    @property
+    def mtime(self) -> float:
+        return max(part.mtime for part in self.parts)
+
+
+def concat_name(names: Sequence[str]) -> str:
+    """Upload name of a lane set: the first file name without its lane (_L001)."""
+    first = os.path.basename(names[0])
+    return _LANE.sub("", first, count=1)
+
+
+class AdvisedFile(io.FileIO):
+    """
+    Read-only file with posix_fadvise hints: SEQUENTIAL on open, WILLNEED for
+    the next READAHEAD bytes while reading and, with drop, DONTNEED for
+    everything already read (in DROP_STEP steps and on close), so streaming
+    large files does not evict the page cache of other processes.
+    """
+
+    def __init__(self, path: str, drop: bool):
+        super().__init__(path, "rb")
+        self._drop = drop
+        self._pos = 0
+        self._dropped = 0
+        _fadvise(self.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        _fadvise(self.fileno(), 0, READAHEAD, os.POSIX_FADV_WILLNEED)
+        self._advised = READAHEAD
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data = super().read(size)
+            self._advance(len(data))
+            return data
+        buffer = bytearray(size)
+        n = self.readinto(buffer)
+        del buffer[n:]
+        return bytes(buffer)
+
+    def readinto(self, buffer) -> int:
+        # FileIO liest ungepuffert: auf NFS/CIFS/FUSE kann ein read() weniger liefern,
+        # die Teilgrößen für den Upload müssen aber exakt stimmen
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view):
+            n = super().readinto(view[filled:])
+            if not n:
+                break
+            filled += n
+            self._advance(n)
+        return filled
+
+    def _advance(self, n: int):
+        self._pos += n
+        if self._pos + READAHEAD // 2 >= self._advised:
+            _fadvise(self.fileno(), self._pos, READAHEAD, os.POSIX_FADV_WILLNEED)
+            self._advised = self._pos + READAHEAD
+        if self._drop and self._pos - self._dropped >= DROP_STEP:
+            _fadvise(self.fileno(), self._dropped, self._pos - self._dropped, os.POSIX_FADV_DONTNEED)
+            self._dropped = self._pos
+
+    def close(self):
+        if not self.closed and self._drop:
+            # Rest bis Dateiende (len 0)
+            _fadvise(self.fileno(), self._dropped, 0, os.POSIX_FADV_DONTNEED)
+        super().close()
+
+
+def _cache_available() -> Optional[int]:
+    """Memory the page cache may use (MemAvailable), None if unknown."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _advise(paths: Sequence[str], stage: Optional[str]) -> Optional[bool]:
+    """None for plain reads, otherwise whether read data is dropped right away."""
+    if page_cache == "default" or _fadvise is None or stage is None:
+        return None
+    if page_cache == "drop" or stage == "upload":
+        return True
+    available = _cache_available()
+    return available is not None and sum(os.path.getsize(p) for p in paths) > available
+
+
+def _open_file(path: str, drop: Optional[bool]):
+    if drop is None:
+        return open(path, "rb")
+    return AdvisedFile(path, drop)
+
+
+class ConcatReader(io.RawIOBase):
+    """Read-only file object over several files, read(n) continues across file boundaries."""
+
+    def __init__(self, paths: Sequence[str], stage: Optional[str] = None):
+        super().__init__()
+        self._paths = list(paths)
+        self._drop = _advise(self._paths, stage)
+        self._index = 0
+        self._file = _open_file(self._paths[0], self._drop) if self._paths else None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view) and self._file is not None:
+            n = self._file.readinto(view[filled:])
+            if n:
+                filled += n
+                continue
+            self._file.close()
+            self._index += 1
+            self._file = _open_file(self._paths[self._index], self._drop) if self._index < len(self._paths) else None
+        return filled
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return self.readall()
+        buffer = bytearray(size)
+        n = self.readinto(buffer)
+        del buffer[n:]
+        return bytes(buffer)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().close()
+
+
+def open_read(path: Union[str, Sequence[str]], stage: Optional[str] = None):
+    """
+    Opens a read file for binary reading; a tuple/list of paths (ConcatRead.path)
+    as one stream. stage ("hash" or "upload") selects the --page-cache hints.
+    """
+    if isinstance(path, (tuple, list)):
+        return ConcatReader(path, stage)
+    return _open_file(path, _advise([path], stage))
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+import typer
+
+import igsupload.run_store as run_store
+import igsupload.metrics as metrics
+from igsupload.bandwidth import TokenBucket
+from igsupload.igs_notification import post_notification
+from igsupload.igsupload_logger import log_to_csv, extract_param
+
+# igsupload replay-notifications: gespeicherte Bundles erneut senden, ohne Reads/DocumentReferences
+CONCURRENCY = 4
+RATE = 5.0  # Requests pro Sekunde
+
+
+@dataclass
+class ReplayResult:
+    sample: str
+    notification_id: str
+    ok: bool
+    transaction_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _replay_one(stored, limiter: TokenBucket) -> ReplayResult:
+    row_id, sample, notification_id, doc_ids, body = stored
+    limiter.consume(1)
+    try:
+        response = post_notification(body)
+    except Exception as e:
+        error = str(e)
+    else:
+        if response.status_code == 200:
+            result = response.json()
+            parameters = (result.get("parameter") or []) if isinstance(result, dict) else []
+            transaction_id = extract_param(parameters, "transactionID")
+            run_store.update_notification(row_id, "sent", transaction_id=transaction_id)
+            metrics.notifications.inc(result="ok")
+            file_names = [run_store.file_name_of(doc_id) for doc_id in doc_ids]
+            log_to_csv(
+                filename=next((name for name in reversed(file_names) if name), ""),
+                notification_id=extract_param(parameters, "submitterGeneratedNotificationID") or notification_id or "",
+                transaction_id=transaction_id or "",
+                lab_sequence_id=extract_param(parameters, "labSequenceID") or "",
+                document_reference_id=doc_ids,
+                status="OK",
+            )
+            return ReplayResult(sample, notification_id, True, transaction_id=transaction_id)
+        error = f"HTTP {response.status_code}"
+    metrics.notifications.inc(result="failed")
+    run_store.update_notification(row_id, "failed", error=error)
+    return ReplayResult(sample, notification_id, False, error=error)
+
+
+def replay(stored_notifications, concurrency: int = CONCURRENCY, rate: Optional[float] = RATE) -> List[ReplayResult]:
+    """Resends stored bundles byte for byte, `concurrency` at a time and at most `rate` per second."""
+    limiter = TokenBucket(rate or None, burst=1)
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix="replay") as pool:
+        results = list(pool.map(lambda stored: _replay_one(stored, limiter), stored_notifications))
+    for result in results:
+        if result.ok:
+            typer.secho(f"{result.sample}: sent, transaction {result.transaction_id}", fg=typer.colors.GREEN)
+        else:
+            typer.secho(f"{result.sample}: failed ({result.error})", fg=typer.colors.RED)
+    return results
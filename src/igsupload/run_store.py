@@ -0,0 +1,288 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from igsupload.igsupload_logger import resolve_path
+
+# Lokale Lauf-Historie (SQLite): Uploads mit SHA-256, doc_id und Status über Läufe hinweg
+store_path: Optional[str] = None
+# 'pending' eines noch laufenden Laufs wird gerade gesendet; erst danach gilt es als abgebrochen
+STALE_PENDING = 600
+run_id: Optional[int] = None
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        csv_path TEXT,
+        started REAL,
+        finished REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS uploads (
+        id INTEGER PRIMARY KEY,
+        run_id INTEGER REFERENCES runs(id),
+        sample TEXT,
+        file_name TEXT,
+        sha256 TEXT,
+        size INTEGER,
+        doc_id TEXT,
+        status TEXT,
+        reused INTEGER DEFAULT 0,
+        updated REAL
+    )""",
+    "CREATE INDEX IF NOT EXISTS uploads_sha256 ON uploads (sha256, size)",
+    # serialisiertes Bundle, damit Wiederholungen exakt dieselben Bytes senden
+    """CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER PRIMARY KEY,
+        run_id INTEGER REFERENCES runs(id),
+        sample TEXT,
+        notification_id TEXT,
+        row_key TEXT,
+        doc_ids TEXT,
+        body BLOB,
+        status TEXT,
+        transaction_id TEXT,
+        error TEXT,
+        attempts INTEGER DEFAULT 0,
+        updated REAL
+    )""",
+    "CREATE INDEX IF NOT EXISTS notifications_row_key ON notifications (row_key, status)",
+    # letzter bekannter $validation-status je doc_id (igsupload status), endgültige werden nicht neu abgefragt
+    """CREATE TABLE IF NOT EXISTS validation_status (
+        doc_id TEXT PRIMARY KEY,
+        status TEXT,
+        done INTEGER,
+        message TEXT,
+        checked REAL
+    )""",
+)
+# Upload-Status, die sich noch ändern können (Upload abgebrochen, Polling-Timeout)
+UNFINISHED = ("UPLOADING", "TIMEOUT")
+
+
+# --run-store-retention: Einträge (auch nicht gesendete Bundles) werden nach so vielen Tagen gelöscht
+RETENTION_DAYS = 30
+
+
+def default_path(log_dir: str) -> str:
+    return os.path.join(log_dir, "logging", "igsupload_runs.sqlite")
+
+
+def set_run_store(path: Optional[Path]):
+    """Opens (and creates) the run store; None disables it."""
+    global store_path
+    close()
+    if path is None:
+        store_path = None
+        return
+    resolved = resolve_path(path)
+    resolved.parent.mkdir(parents=True, exist_ok=True)
+    store_path = str(resolved)
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    global _conn
+    if _conn is None and store_path:
+        # mehrere Läufe (cron) dürfen gleichzeitig schreiben: WAL + busy timeout
+        _conn = sqlite3.connect(store_path, timeout=30, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        # gelöschte Bundles (Patientendaten) nicht als freie Seiten in der Datei lassen
+        _conn.execute("PRAGMA secure_delete=ON")
+        for statement in SCHEMA:
+            _conn.execute(statement)
+    return _conn
+
+
+def enabled() -> bool:
+    return store_path is not None
+
+
+def close():
+    global _conn, run_id
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+        run_id = None
+
+
+def execute(sql: str, params=()):
+    """Runs one statement under the store lock; returns all rows (empty without a store)."""
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return []
+        return conn.execute(sql, params).fetchall()
+
+
+def start_run(csv_path: str):
+    global run_id
+    if not enabled():
+        return
+    with _lock:
+        cursor = _connect().execute("INSERT INTO runs (csv_path, started) VALUES (?, ?)", (csv_path, time.time()))
+        run_id = cursor.lastrowid
+
+
+def finish_run():
+    if run_id is not None:
+        execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), run_id))
+
+
+def record_upload(sample: str, file_name: str, sha256: str, size: int, doc_id: Optional[str], status: str,
+                  reused: bool = False) -> Optional[int]:
+    if not enabled():
+        return None
+    with _lock:
+        cursor = _connect().execute(
+            "INSERT INTO uploads (run_id, sample, file_name, sha256, size, doc_id, status, reused, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, sample, file_name, sha256, size, doc_id, status, int(reused), time.time()),
+        )
+        return cursor.lastrowid
+
+
+def update_upload(upload: Optional[int], status: str):
+    if upload is not None:
+        execute("UPDATE uploads SET status = ?, updated = ? WHERE id = ?", (status, time.time(), upload))
+
+
+def find_validated(sha256: str, size: int, since: Optional[float] = None) -> Optional[str]:
+    """
+    doc_id of the latest upload with this content that reached VALID, from any run
+    (only uploads validated at or after `since`; reuses do not count as a validation).
+    """
+    rows = execute(
+        "SELECT doc_id FROM uploads WHERE sha256 = ? AND size = ? AND status = 'VALID' AND doc_id IS NOT NULL "
+        "AND reused = 0 AND updated >= ? ORDER BY updated DESC LIMIT 1",
+        (sha256, size, since or 0),
+    )
+    return rows[0][0] if rows else None
+
+
+def save_notification(sample: str, notification_id: str, row_key: Optional[str], doc_ids, body: bytes) -> Optional[int]:
+    """Stores a serialized bundle as 'pending' before it is sent; returns its id (None without a store)."""
+    if not enabled():
+        return None
+    with _lock:
+        cursor = _connect().execute(
+            "INSERT INTO notifications (run_id, sample, notification_id, row_key, doc_ids, body, status, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)",
+            (run_id, sample, notification_id, row_key, json.dumps(list(doc_ids)), body, time.time()),
+        )
+        return cursor.lastrowid
+
+
+def update_notification(notification: Optional[int], status: str, transaction_id: Optional[str] = None,
+                        error: Optional[str] = None, attempts: int = 1):
+    """Records the outcome; the body of a sent notification is dropped (only failed ones are replayed)."""
+    if notification is None:
+        return
+    execute(
+        "UPDATE notifications SET status = ?, transaction_id = ?, error = ?, attempts = attempts + ?, updated = ?, "
+        "body = CASE WHEN ? = 'sent' THEN NULL ELSE body END WHERE id = ?",
+        (status, transaction_id, error, attempts, time.time(), status, notification),
+    )
+
+
+def find_sent(row_key: str) -> Optional[str]:
+    """transactionID of an identical row that was already notified successfully."""
+    rows = execute(
+        "SELECT transaction_id FROM notifications WHERE row_key = ? AND status = 'sent' ORDER BY updated DESC LIMIT 1",
+        (row_key,),
+    )
+    return rows[0][0] if rows else None
+
+
+def notifications_to_replay(run: Optional[int] = None):
+    """
+    Failed and abandoned ('pending' of a finished or stale run) notifications,
+    only the latest attempt per notification id: (id, sample, notification_id, doc_ids, body).
+    """
+    sql = (
+        "SELECT n.id, n.sample, n.notification_id, n.doc_ids, n.body FROM notifications n "
+        "LEFT JOIN runs r ON r.id = n.run_id "
+        "WHERE (n.status = 'failed' OR (n.status = 'pending' AND (r.finished IS NOT NULL OR n.updated < ?))) "
+        "AND NOT EXISTS (SELECT 1 FROM notifications s WHERE s.id > n.id "
+        "AND s.notification_id = n.notification_id AND s.notification_id != '') "
+    )
+    params = [time.time() - STALE_PENDING]
+    if run is not None:
+        sql += "AND n.run_id = ? "
+        params.append(run)
+    return [
+        (row_id, sample, notification_id, json.loads(doc_ids), body)
+        for row_id, sample, notification_id, doc_ids, body in execute(sql + "ORDER BY n.id", params)
+    ]
+
+
+def file_name_of(doc_id: str) -> Optional[str]:
+    rows = execute("SELECT file_name FROM uploads WHERE doc_id = ? ORDER BY updated DESC LIMIT 1", (doc_id,))
+    return rows[0][0] if rows else None
+
+
+def history(since: Optional[float] = None):
+    """
+    Uploads with their cached $validation-status and notification:
+    (run_id, started, sample, file_name, doc_id, status, done, notification_status, transaction_id).
+    """
+    rows = execute(
+        "SELECT u.run_id, r.started, u.sample, u.file_name, u.doc_id, "
+        "COALESCE(v.status, u.status), COALESCE(v.done, u.status NOT IN (?, ?)) "
+        "FROM uploads u LEFT JOIN runs r ON r.id = u.run_id LEFT JOIN validation_status v ON v.doc_id = u.doc_id "
+        "WHERE u.doc_id IS NOT NULL AND u.updated >= ? ORDER BY u.id",
+        (*UNFINISHED, since or 0),
+    )
+    # Meldung je doc_id: die letzte, die es enthält
+    notifications = {}
+    for doc_ids, status, transaction_id in execute(
+        "SELECT doc_ids, status, transaction_id FROM notifications WHERE updated >= ? ORDER BY id", (since or 0,)
+    ):
+        for doc_id in json.loads(doc_ids):
+            notifications[doc_id] = (status, transaction_id)
+    return [
+        (*row[:5], row[5], bool(row[6]), *notifications.get(row[4], (None, None)))
+        for row in rows
+    ]
+
+
+def save_validation_status(doc_id: str, status: Optional[str], done: bool, message: Optional[str]):
+    execute(
+        "INSERT OR REPLACE INTO validation_status (doc_id, status, done, message, checked) VALUES (?, ?, ?, ?, ?)",
+        (doc_id, status, int(bool(done)), message, time.time()),
+    )
+
+
+def purge(retention_days: Optional[float] = RETENTION_DAYS) -> int:
+    """
+    Deletes uploads, notifications (with their bundles), cached validation answers
+    and runs last updated more than retention_days ago; 0/None keeps everything.
+    Returns the number of deleted uploads and notifications.
+    """
+    if retention_days is not None and retention_days < 0:
+        raise ValueError(f"Invalid run store retention: {retention_days} (expected days >= 0)")
+    if not enabled() or not retention_days:
+        return 0
+    cutoff = time.time() - retention_days * 86400
+    with _lock:
+        conn = _connect()
+        deleted = conn.execute("DELETE FROM notifications WHERE updated < ?", (cutoff,)).rowcount
+        deleted += conn.execute("DELETE FROM uploads WHERE updated < ?", (cutoff,)).rowcount
+        conn.execute(
+            "DELETE FROM validation_status WHERE checked < ? "
+            "AND NOT EXISTS (SELECT 1 FROM uploads u WHERE u.doc_id = validation_status.doc_id)",
+            (cutoff,),
+        )
+        conn.execute(
+            "DELETE FROM runs WHERE started < ? "
+            "AND NOT EXISTS (SELECT 1 FROM uploads u WHERE u.run_id = runs.id) "
+            "AND NOT EXISTS (SELECT 1 FROM notifications n WHERE n.run_id = runs.id)",
+            (cutoff,),
+        )
+    return deleted
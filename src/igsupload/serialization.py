@@ -0,0 +1,67 @@
+import gzip
+import json
+
+import requests
+
+import igsupload.timing as timing
+
+try:  # optional, pip install igsupload[fast]
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# gzip request bodies (--gzip). Switched off automatically once the server answers 415.
+use_gzip = False
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+_gzip_rejected = False
+
+
+def set_gzip(enabled: bool):
+    global use_gzip, _gzip_rejected
+    use_gzip = bool(enabled)
+    _gzip_rejected = False
+
+
+def encode_json(payload) -> bytes:
+    """Compact UTF-8 JSON (orjson if installed, otherwise the stdlib encoder)."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def encode_body(payload, headers: dict, compress: bool = None):
+    """
+    Pre-encodes a JSON payload for requests.post(data=...).
+    Returns (body, headers, raw_size); gzip is only used for bodies >= GZIP_MIN_BYTES.
+    """
+    body = payload if isinstance(payload, bytes) else encode_json(payload)
+    raw_size = len(body)
+    if compress is None:
+        compress = use_gzip and not _gzip_rejected
+    if compress and raw_size >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        headers = {**headers, "Content-Encoding": "gzip"}
+    return body, headers, raw_size
+
+
+def post_json(url: str, payload, headers: dict, stage: str, **kwargs):
+    """
+    POSTs a JSON payload as pre-encoded (optionally gzipped) bytes. The encoding is
+    timed as an "encode_body" span with raw and sent size; the request itself is
+    timed by the caller's stage span. A 415 on a gzipped body disables gzip for the
+    rest of the run and the request is repeated uncompressed.
+    """
+    global _gzip_rejected
+
+    with timing.span("encode_body", request=stage) as span:
+        body, request_headers, raw_size = encode_body(payload, headers)
+        span.update(bytes=raw_size, sent_bytes=len(body), gzip="Content-Encoding" in request_headers)
+
+    response = requests.post(url, headers=request_headers, data=body, **kwargs)
+    if response.status_code == 415 and "Content-Encoding" in request_headers:
+        print("[INFO] Server does not accept gzip request bodies, sending uncompressed.")
+        _gzip_rejected = True
+        body, request_headers, _ = encode_body(payload, headers, compress=False)
+        response = requests.post(url, headers=request_headers, data=body, **kwargs)
+    return response
@@ -1,11 +1,33 @@
 import base64
 import re
 import hashlib
+import time
+import igsupload.metrics as metrics
+import igsupload.progress as progress
+from igsupload.reads_io import open_read
 
-def create_hash(file_path):
+PROGRESS_STEP = 4 * 1024 * 1024
+
+def create_hash(file_path, *consumers):
+  # consumers: weitere Prüfungen (z. B. reads_check) bekommen dieselben Chunks, die Datei wird nur einmal gelesen
   sha256 = hashlib.sha256()
-  with open(file_path, "rb") as f:
+  size = 0
+  reported = 0
+  start = time.perf_counter()
+  with open_read(file_path, "hash") as f:
     while chunk := f.read(8192): # 8192 = 8 kb more efficiant
       sha256.update(chunk)
+      for consumer in consumers:
+        consumer.update(chunk)
+      size += len(chunk)
+      if size - reported >= PROGRESS_STEP:
+        progress.add_hashed(size - reported)
+        reported = size
+  progress.add_hashed(size - reported)
+  seconds = time.perf_counter() - start
+  metrics.hashed_bytes.inc(size)
+  metrics.hash_seconds.inc(seconds)
+  if seconds > 0:
+    metrics.hash_throughput.set(size / seconds)
   return sha256.hexdigest()
 
@@ -1,6 +1,7 @@
 import typer
 import requests
 import igsupload.config as config
+import igsupload.events as events
 
 def start_validation(doc_id, token):
 
@@ -17,7 +18,8 @@ def start_validation(doc_id, token):
         )
 
         if response.status_code == 204:
-            print(f"Validation was started {typer.style('successfully', fg=typer.colors.GREEN)}.")
+            if not events.quiet:
+                print(f"Validation was started {typer.style('successfully', fg=typer.colors.GREEN)}.")
 
             
         else:
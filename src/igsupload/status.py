@@ -0,0 +1,118 @@
+import csv
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import igsupload.config as config
+import igsupload.get_token as token_module
+import igsupload.run_store as run_store
+from igsupload.bandwidth import TokenBucket
+
+# igsupload status: Abgleich der lokalen Lauf-Historie mit $validation-status
+CONCURRENCY = 8
+RATE = 10.0  # Requests pro Sekunde
+FORMATS = ("csv", "json")
+FIELDS = (
+    "run", "started", "sample", "file_name", "doc_id", "validation_status",
+    "notification_status", "transaction_id",
+)
+
+
+def _session(concurrency: int) -> requests.Session:
+    """One keep-alive connection pool for all status queries, as large as the number of workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(concurrency, 1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.cert = (config.CERT, config.KEY)
+    return session
+
+
+def query_status(session: requests.Session, doc_id: str) -> Optional[dict]:
+    """Current $validation-status of a DocumentReference, None if it could not be queried."""
+    try:
+        response = session.get(
+            f"{config.BASE_URL}/S3Controller/upload/{doc_id}/$validation-status",
+            headers={"Authorization": f"Bearer {token_module.current_token}", "Accept": "application/json"},
+        )
+    except requests.RequestException as e:
+        print(f"[WARN] Status query for {doc_id} failed: {e}")
+        return None
+    if response.status_code != 200:
+        print(f"[WARN] Status query for {doc_id} failed: HTTP {response.status_code}")
+        return None
+    return response.json()
+
+
+def refresh(doc_ids: List[str], concurrency: int = CONCURRENCY, rate: Optional[float] = RATE) -> int:
+    """
+    Queries the given doc_ids concurrently (rate limited) and caches every answer
+    in the run store right away, so an interrupted check keeps its progress.
+    Returns the number of answers.
+    """
+    if not doc_ids:
+        return 0
+    limiter = TokenBucket(rate or None, burst=1)
+    answered = 0
+    lock = threading.Lock()
+
+    def check(doc_id):
+        nonlocal answered
+        limiter.consume(1)
+        result = query_status(session, doc_id)
+        if result is None:
+            return
+        run_store.save_validation_status(doc_id, result.get("status"), result.get("done"), result.get("message"))
+        with lock:
+            answered += 1
+
+    with _session(concurrency) as session, ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        list(pool.map(check, doc_ids))
+    return answered
+
+
+def reconcile(since: Optional[float] = None, concurrency: int = CONCURRENCY, rate: Optional[float] = RATE,
+              offline: bool = False) -> List[dict]:
+    """
+    Reconciled table of all uploads in the run history: only doc_ids whose
+    validation is not final yet are queried, final answers come from the cache.
+    """
+    pending = sorted({row[4] for row in run_store.history(since) if not row[6]})
+    if pending and not offline:
+        answered = refresh(pending, concurrency, rate)
+        print(f"[INFO] Queried {answered}/{len(pending)} pending DocumentReferences", file=sys.stderr)
+    return [
+        {
+            "run": run_id,
+            "started": datetime.fromtimestamp(started).isoformat(timespec="seconds") if started else "",
+            "sample": sample,
+            "file_name": file_name,
+            "doc_id": doc_id,
+            "validation_status": status if done else f"{status} (pending)",
+            "notification_status": notification_status or "",
+            "transaction_id": transaction_id or "",
+        }
+        for run_id, started, sample, file_name, doc_id, status, done, notification_status, transaction_id
+        in run_store.history(since)
+    ]
+
+
+def is_problem(record: dict) -> bool:
+    return record["validation_status"] != "VALID" or not record["transaction_id"]
+
+
+def write(records: List[dict], fmt: str = "csv", stream=None):
+    stream = stream or sys.stdout
+    if fmt == "json":
+        json.dump(records, stream, indent=2)
+        stream.write("\n")
+        return
+    writer = csv.DictWriter(stream, fieldnames=FIELDS, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(records)
@@ -0,0 +1,214 @@
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import typer
+
+from igsupload.igsupload_logger import resolve_path
+
+# Reihenfolge der Stages in der Zusammenfassung
+STAGES = (
+    "create_hash",
+    "compress",
+    "encode_body",
+    "post_document_reference",
+    "get_presigned_url",
+    "put_part",
+    "put_chunks",
+    "post_upload_body",
+    "start_validation",
+    "poll_validation_status",
+    "prebuild_notification",
+    "send_notification",
+)
+
+# Dauerstichprobe je Stage für p50/p95; count/total/max usw. bleiben exakt
+RESERVOIR_SIZE = 1024
+
+spans_path: Optional[str] = None
+_run_start = time.perf_counter()
+_lock = threading.Lock()
+_spans_file = None
+_local = threading.local()
+_stats: Dict[str, "_StageStats"] = {}
+# callables notified with every finished span (e.g. the event log)
+listeners: List = []
+
+
+class _StageStats:
+    """Running totals of one stage plus a bounded reservoir sample of the durations."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.cpu = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.errors = 0
+        self.samples: List[float] = []
+        self._random = random.Random(0)
+
+    def add(self, record: dict):
+        seconds = record["seconds"]
+        self.count += 1
+        self.total += seconds
+        self.cpu += record.get("cpu_seconds", 0.0)
+        self.max = max(self.max, seconds)
+        self.bytes += record.get("bytes") or 0
+        if "error" in record:
+            self.errors += 1
+        # reservoir sampling (Algorithm R): every span has the same chance to be kept
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(seconds)
+        else:
+            index = self._random.randrange(self.count)
+            if index < RESERVOIR_SIZE:
+                self.samples[index] = seconds
+
+
+def set_spans_file(path: Optional[Path]):
+    """Writes every finished span as one JSON line to this file (--spans-file)."""
+    global spans_path
+    spans_path = str(resolve_path(path)) if path else None
+    if spans_path:
+        print(f"[INFO] Writing timing spans to: {spans_path}")
+
+
+def reset():
+    """Starts a new run: clears the stage statistics and (re)opens the spans file."""
+    global _run_start, _spans_file
+    with _lock:
+        _stats.clear()
+        _run_start = time.perf_counter()
+        if _spans_file is not None:
+            _spans_file.close()
+            _spans_file = None
+        if spans_path:
+            _spans_file = open(spans_path, "w", encoding="utf-8")
+
+
+def close():
+    global _spans_file
+    with _lock:
+        if _spans_file is not None:
+            _spans_file.close()
+            _spans_file = None
+
+
+@contextmanager
+def context(**attrs):
+    """Attributes (e.g. file, sample) added to every span opened inside the block."""
+    previous = getattr(_local, "attrs", {})
+    _local.attrs = {**previous, **attrs}
+    try:
+        yield
+    finally:
+        _local.attrs = previous
+
+
+def annotate(**attrs):
+    """Adds attributes (e.g. doc_id once it is known) until the enclosing context() ends."""
+    _local.attrs = {**getattr(_local, "attrs", {}), **attrs}
+
+
+def current_context() -> dict:
+    return getattr(_local, "attrs", {})
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """
+    Times a block with the monotonic clock (wall) and the thread CPU clock. attrs (file, sample, bytes, part, ...)
+    are stored with the span; the yielded dict can be extended inside the block.
+    Exceptions are recorded as "error" and re-raised. The finished span is added to the per-stage statistics,
+    written to the spans file and passed to the listeners, it is not kept in memory.
+    """
+    record = {"stage": stage, **getattr(_local, "attrs", {}), **attrs}
+    start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        record["start"] = round(start - _run_start, 6)
+        record["seconds"] = end - start
+        record["cpu_seconds"] = time.thread_time() - cpu_start
+        with _lock:
+            _stats.setdefault(stage, _StageStats()).add(record)
+            if _spans_file is not None:
+                _spans_file.write(json.dumps(record, default=str) + "\n")
+                _spans_file.flush()
+        for listener in listeners:
+            listener(record)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    # nearest-rank
+    index = max(0, min(len(ordered) - 1, -(-len(ordered) * q // 100) - 1))
+    return ordered[int(index)]
+
+
+def summarize(records: Optional[List[dict]] = None) -> Dict[str, dict]:
+    """
+    Aggregates spans per stage: count, total, cpu, p50/p95/max (seconds) and bytes/s. Without records the
+    statistics of the current run are used; p50/p95 then come from a sample of at most RESERVOIR_SIZE spans.
+    """
+    if records is None:
+        with _lock:
+            return _summarize(_stats)
+    stats: Dict[str, _StageStats] = {}
+    for record in records:
+        stats.setdefault(record["stage"], _StageStats()).add(record)
+    return _summarize(stats)
+
+
+def _summarize(stats: Dict[str, _StageStats]) -> Dict[str, dict]:
+    order = {stage: i for i, stage in enumerate(STAGES)}
+    summary = {}
+    for stage in sorted(stats, key=lambda s: (order.get(s, len(order)), s)):
+        s = stats[stage]
+        durations = sorted(s.samples)
+        summary[stage] = {
+            "count": s.count,
+            "total": s.total,
+            "cpu": s.cpu,
+            "p50": _percentile(durations, 50),
+            "p95": _percentile(durations, 95),
+            "max": s.max,
+            "bytes": s.bytes,
+            "bytes_per_second": s.bytes / s.total if s.bytes and s.total else None,
+            "errors": s.errors,
+        }
+    return summary
+
+
+def _format_rate(bytes_per_second: Optional[float]) -> str:
+    if bytes_per_second is None:
+        return "-"
+    return f"{bytes_per_second / 1e6:.1f} MB/s"
+
+
+def print_summary(summary: Optional[Dict[str, dict]] = None):
+    summary = summarize() if summary is None else summary
+    if not summary:
+        return
+    run_seconds = time.perf_counter() - _run_start
+
+    typer.secho("\nTiming summary", bold=True)
+    typer.echo(f"{'stage':<26}{'count':>7}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'throughput':>14}")
+    for stage, s in summary.items():
+        line = (
+            f"{stage:<26}{s['count']:>7}{s['total']:>10.2f}{s['p50'] * 1000:>10.1f}"
+            f"{s['p95'] * 1000:>10.1f}{s['max'] * 1000:>10.1f}{_format_rate(s['bytes_per_second']):>14}"
+        )
+        if s["errors"]:
+            line += typer.style(f"  ({s['errors']} failed)", fg=typer.colors.RED)
+        typer.echo(line)
+    typer.echo(f"Total run time: {run_seconds:.2f} s")
@@ -1,37 +1,153 @@
+import itertools
 import os
 import json
+import time
 import typer
 import igsupload.config as config
 import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import igsupload.timing as timing
+from igsupload.timing import span
+import igsupload.concurrency as concurrency
+import igsupload.metrics as metrics
+import igsupload.events as events
+import igsupload.progress as progress
+import igsupload.bandwidth as bandwidth
+from igsupload.reads_io import open_read
+from igsupload.get_presigned_url import PresignedUrls
+
+# Drosselung durch S3 (429 / 503 SlowDown) und Verbindungsabbrüche werden wiederholt, andere Fehler nicht
+RETRY_STATUS = frozenset((429, 503))
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.5
 
 def put_chunks(file_path, chunk_size, presigned_urls, upload_id):
+    """
+    Uploads the parts concurrently; the number of parts in flight is adjusted
+    by an AIMD controller (see concurrency). Chunks are read in order and only
+    while a slot is free, so at most `limit` parts are held in memory.
+    presigned_urls may be a PresignedUrls that can re-fetch expiring URLs.
+    Returns the completed parts up to the first part that failed.
+    """
     json_object = {
         "uploadId": upload_id,
         "completedChunks": []
     }
+    if not presigned_urls:
+        return json_object
+    # eine einfache Liste ohne Refresh-Möglichkeit wird nur auf Ablauf überwacht
+    urls = presigned_urls if hasattr(presigned_urls, "renew") else PresignedUrls(presigned_urls)
+
+    controller = concurrency.controller_for(urls[0])
+    context = timing.current_context()
+    etags = {}
+    failed = []
+    in_flight = set()
+
+    def collect(done):
+        for future in done:
+            in_flight.discard(future)
+            part_number, etag = future.result()
+            if etag is None:
+                failed.append(part_number)
+            else:
+                etags[part_number] = etag
 
-    for part_number, chunk in enumerate(split_file_in_chunks(file_path, chunk_size), start=1):
-        url = presigned_urls[part_number - 1]
-        response = requests.put(url, data=chunk)
+    chunks = split_file_in_chunks(file_path, chunk_size)
+    with ThreadPoolExecutor(max_workers=controller.maximum, thread_name_prefix="igsupload-part") as pool:
+        for part_number in itertools.count(1):
+            # erst auf einen freien Slot warten, dann den nächsten Part lesen
+            while len(in_flight) >= controller.slots:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+            if failed:
+                break
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            in_flight.add(pool.submit(_upload_part, urls, part_number, chunk, controller, context))
+            del chunk  # gehört jetzt nur noch dem Upload
+        collect(wait(in_flight).done)
+    chunks.close()
 
-        if response.status_code != 200:
-            print(f"{typer.style('Error', fg=typer.colors.RED)} while uploading chunk {part_number}: {response.status_code}")
-            break
+    concurrency.save(urls[0], controller)
 
-        etag = response.headers.get("ETag", "").strip('"')
+    # nur die lückenlose Folge ab Part 1 ist abgeschlossen
+    part_number = 1
+    while part_number in etags:
         json_object["completedChunks"].append({
             "partNumber": part_number,
-            "eTag": etag
+            "eTag": etags[part_number]
         })
+        part_number += 1
+
+    return json_object
 
+def _upload_part(urls, part_number, chunk, controller, context):
+    """
+    PUT of one part with up to MAX_RETRIES retries on 429/503/connection errors
+    and one retry with fresh URLs after a 403 (expired URL); returns (part, eTag or None).
+    """
+    retries = 0
+    renewed = False
+    with timing.context(**context), span("put_part", part=part_number, bytes=len(chunk)) as record:
+        while True:
+            url = urls.get(part_number)
+            start = time.perf_counter()
+            try:
+                response = requests.put(url, data=bandwidth.body(chunk))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, status = None, type(e).__name__
+            else:
+                status = response.status_code
+            seconds = time.perf_counter() - start
+            metrics.part_upload_seconds.observe(seconds)
+            record["status_code"] = status
+            record["attempts"] = record.get("attempts", 0) + 1
+
+            if status == 200:
+                controller.on_success(len(chunk), seconds)
+                break
+            if status == 403 and not renewed and urls.renew(url):
+                renewed = True
+                continue
+            if status in RETRY_STATUS or response is None:
+                controller.on_error()
+                if retries < MAX_RETRIES:
+                    metrics.parts_retried.inc()
+                    time.sleep(_retry_delay(response, retries))
+                    retries += 1
+                    continue
+            record["error"] = f"HTTP {status}" if response is not None else status
+            metrics.parts_failed.inc()
+            print(f"{typer.style('Error', fg=typer.colors.RED)} while uploading chunk {part_number}: {status}")
+            return part_number, None
+
+    metrics.parts_uploaded.inc()
+    metrics.uploaded_bytes.inc(len(chunk))
+    progress.add_uploaded(len(chunk))
+    metrics.write_textfile(force=False)
+    etag = response.headers.get("ETag", "").strip('"')
+
+    # die Fortschrittsanzeige (stderr) ersetzt die Zeile pro Part
+    if not events.quiet and not progress.active():
         print(f"Chunk {part_number} {typer.style('uploaded', fg=typer.colors.GREEN)}, eTag: {etag}")
+    return part_number, etag
 
-    return json_object
+def _retry_delay(response, attempt):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), 30.0)
+        except ValueError:
+            pass
+    return RETRY_BACKOFF * 2 ** attempt
 
 def split_file_in_chunks(file_path, chunk_size):
-  with open(file_path, "rb") as file:
+  # file_path kann auch ein Tupel von Lane-Dateien sein (ein virtueller Stream)
+  with open_read(file_path, "upload") as file:
     while True:
       chunk = file.read(chunk_size)
       if not chunk:
         break
-      yield chunk
\ No newline at end of file
+      yield chunk
+      del chunk  # nicht bis zum nächsten read() festhalten
\ No newline at end of file
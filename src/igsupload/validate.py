@@ -0,0 +1,187 @@
+import re
+from dataclasses import dataclass
+from datetime import date
+from itertools import islice
+from operator import attrgetter
+from typing import Iterable, List
+
+import typer
+
+from igsupload.document_reference import get_demis_content_type
+from igsupload.extract_csv import CsvRow
+from igsupload.reads_index import ReadsIndex
+from igsupload.igs_notification import (
+    VALID_GENDERS,
+    VALID_REPOSITORIES,
+    SEQ_REASON_TO_SNOMED,
+    SNOMED_UPLOAD_STATUS,
+)
+
+# Rows are checked column by column in batches, so memory stays flat for huge CSVs
+BATCH_SIZE = 10_000
+
+_ISO_DATE = re.compile(r"(\d{4})-(0[1-9]|1[0-2])(?:-(\d{2}))?")
+_GERMAN_DATE = re.compile(r"(\d{2})\.(\d{2})\.(\d{4})")
+_POSTAL_CODE = re.compile(r"\d{5}")
+_GEOGRAPHIC_LOCATION = re.compile(r"\d{3}")
+_FEDERAL_STATE = re.compile(r"DE-[A-Z]{2}")
+_SNOMED_CODE = re.compile(r"\d{6,18}")
+_EMAIL = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+_BIRTH_YEAR = re.compile(r"(19|20)\d{2}")
+_BIRTH_MONTH = re.compile(r"0[1-9]|1[0-2]")
+_SHA256 = re.compile(r"[0-9a-fA-F]{64}")
+
+
+def _is_date(value: str) -> bool:
+    match = _ISO_DATE.fullmatch(value)
+    if match:
+        year, month, day = match.groups()
+        if day is None:
+            return True
+        parts = (int(year), int(month), int(day))
+    else:
+        match = _GERMAN_DATE.fullmatch(value)
+        if not match:
+            return False
+        day, month, year = match.groups()
+        parts = (int(year), int(month), int(day))
+    try:
+        date(*parts)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_sequencing_reason(value: str) -> bool:
+    return value.lower() in SEQ_REASON_TO_SNOMED or value.isdigit()
+
+
+def _is_upload_status(value: str) -> bool:
+    value = value.lower()
+    return value in SNOMED_UPLOAD_STATUS or value in SNOMED_UPLOAD_STATUS.values()
+
+
+def _is_read_file_name(value: str) -> bool:
+    # auch Listen/Globs mehrerer Lane-Dateien (a_L001_R1.fastq.gz,a_L002_R1.fastq.gz)
+    try:
+        for name in value.split(","):
+            get_demis_content_type(name.strip())
+    except ValueError:
+        return False
+    return True
+
+
+_DATE_HINT = "expected YYYY-MM, YYYY-MM-DD or DD.MM.YYYY"
+
+# Spalte -> (Prüffunktion, Hinweis). Leere Werte werden nicht geprüft.
+COLUMN_RULES = {
+    "DATE_OF_SAMPLING": (_is_date, _DATE_HINT),
+    "DATE_OF_RECEIVING": (_is_date, _DATE_HINT),
+    "DATE_OF_SEQUENCING": (_is_date, _DATE_HINT),
+    "UPLOAD_DATE": (_is_date, _DATE_HINT),
+    "SPECIES_CODE": (_SNOMED_CODE.fullmatch, "expected a SNOMED CT code (6-18 digits)"),
+    "ISOLATION_SOURCE_CODE": (_SNOMED_CODE.fullmatch, "expected a SNOMED CT code (6-18 digits)"),
+    "HOST_SEX": (lambda v: v.lower() in VALID_GENDERS, f"expected one of {sorted(VALID_GENDERS)}"),
+    "HOST_BIRTH_MONTH": (_BIRTH_MONTH.fullmatch, "expected two digits 01-12"),
+    "HOST_BIRTH_YEAR": (_BIRTH_YEAR.fullmatch, "expected a year 1900-2099"),
+    "SEQUENCING_REASON": (_is_sequencing_reason, f"expected one of {sorted(SEQ_REASON_TO_SNOMED)} or a SNOMED CT code"),
+    "GEOGRAPHIC_LOCATION": (_GEOGRAPHIC_LOCATION.fullmatch, "expected the first three digits of the postal code"),
+    "PRIME_DIAGNOSTIC_LAB_POSTAL_CODE": (_POSTAL_CODE.fullmatch, "expected a five digit postal code"),
+    "PRIME_DIAGNOSTIC_LAB_FEDERAL_STATE": (_FEDERAL_STATE.fullmatch, "expected an ISO 3166-2 code like DE-BE"),
+    "PRIME_DIAGNOSTIC_LAB_EMAIL": (_EMAIL.fullmatch, "invalid e-mail address"),
+    "SEQUENCING_LAB_POSTAL_CODE": (_POSTAL_CODE.fullmatch, "expected a five digit postal code"),
+    "SEQUENCING_LAB_FEDERAL_STATE": (_FEDERAL_STATE.fullmatch, "expected an ISO 3166-2 code like DE-BE"),
+    "SEQUENCING_LAB_EMAIL": (_EMAIL.fullmatch, "invalid e-mail address"),
+    "REPOSITORY_NAME": (lambda v: v.lower() in VALID_REPOSITORIES, f"expected one of {sorted(VALID_REPOSITORIES)}"),
+    "UPLOAD_STATUS": (_is_upload_status, f"expected one of {sorted(SNOMED_UPLOAD_STATUS)} or its SNOMED CT code"),
+    "FILE_1_NAME": (_is_read_file_name, "unsupported file format (FASTA/FASTQ, optionally .gz)"),
+    "FILE_1_SHA256SUM": (_SHA256.fullmatch, "expected 64 hex characters"),
+    "FILE_2_NAME": (_is_read_file_name, "unsupported file format (FASTA/FASTQ, optionally .gz)"),
+    "FILE_2_SHA256SUM": (_SHA256.fullmatch, "expected 64 hex characters"),
+}
+
+_COLUMNS = tuple(COLUMN_RULES) + ("DEMIS_NOTIFICATION_ID",)
+_get_columns = attrgetter(*_COLUMNS)
+
+
+@dataclass
+class MetadataIssue:
+    row: int
+    column: str
+    value: str
+    message: str
+
+    def __str__(self):
+        return f"Row {self.row}, {self.column} = '{self.value}': {self.message}"
+
+
+def _check_batch(batch: List[CsvRow], first_row: int, issues: List[MetadataIssue]):
+    columns = dict(zip(_COLUMNS, zip(*map(_get_columns, batch))))
+
+    for column, (is_valid, hint) in COLUMN_RULES.items():
+        values = columns[column]
+        invalid = [i for i, v in enumerate(values) if v and not is_valid(v)]
+        issues.extend(MetadataIssue(first_row + i, column, values[i], hint) for i in invalid)
+
+    # Geburtsdatum wird nur mit Jahr UND Monat übernommen
+    years, months = columns["HOST_BIRTH_YEAR"], columns["HOST_BIRTH_MONTH"]
+    for i, (year, month) in enumerate(zip(years, months)):
+        if bool(year) != bool(month):
+            column, value = ("HOST_BIRTH_MONTH", month) if year else ("HOST_BIRTH_YEAR", year)
+            issues.append(MetadataIssue(
+                first_row + i, column, value, "HOST_BIRTH_YEAR and HOST_BIRTH_MONTH must be set together"
+            ))
+
+
+def validate_metadata(rows: Iterable[CsvRow], reads: ReadsIndex) -> List[MetadataIssue]:
+    """
+    Pre-flight check of the whole metadata CSV before any upload starts.
+    Returns every problem found; an empty list means the CSV can be uploaded.
+    """
+    issues: List[MetadataIssue] = []
+    seen_ids = {}
+    file_errors = {}
+    rows = iter(rows)
+    first_row = 1
+
+    while batch := list(islice(rows, BATCH_SIZE)):
+        _check_batch(batch, first_row, issues)
+
+        for i, row in enumerate(batch, start=first_row):
+            notification_id = row.DEMIS_NOTIFICATION_ID
+            if not notification_id:
+                issues.append(MetadataIssue(i, "DEMIS_NOTIFICATION_ID", "", "missing notification id"))
+            elif notification_id in seen_ids:
+                issues.append(MetadataIssue(
+                    i, "DEMIS_NOTIFICATION_ID", notification_id, f"duplicate of row {seen_ids[notification_id]}"
+                ))
+            else:
+                seen_ids[notification_id] = i
+
+            for column in ("FILE_1_NAME", "FILE_2_NAME"):
+                file_name = getattr(row, column)
+                if not file_name:
+                    continue
+                if file_name not in file_errors:
+                    try:
+                        reads.resolve(file_name)
+                        file_errors[file_name] = None
+                    except (FileNotFoundError, ValueError) as e:
+                        file_errors[file_name] = str(e)
+                if file_errors[file_name]:
+                    issues.append(MetadataIssue(i, column, file_name, file_errors[file_name]))
+
+        first_row += len(batch)
+
+    issues.sort(key=lambda issue: (issue.row, _COLUMNS.index(issue.column)))
+    return issues
+
+
+def print_issues(issues: List[MetadataIssue]):
+    for issue in issues:
+        typer.secho(str(issue), fg=typer.colors.RED)
+    rows = len({issue.row for issue in issues})
+    typer.secho(
+        f"Metadata check failed: {len(issues)} problem(s) in {rows} row(s). Nothing was uploaded.",
+        fg=typer.colors.RED
+    )
@@ -1,105 +1,356 @@
-import os
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 import uuid
 import typer
 
 import igsupload.get_token as token_module
-from igsupload.extract_csv import read_csv
+from igsupload.extract_csv import iter_csv
 from igsupload.document_reference import build_document_reference
 from igsupload.sha256_hash import create_hash
 from igsupload.post_document_reference import post_document_reference
-from igsupload.get_presigned_url import get_presigned_url
+from igsupload.get_presigned_url import get_presigned_url, PresignedUrls
 from igsupload.upload_chunks import put_chunks
 from igsupload.finish_upload import post_upload_body
 from igsupload.start_validation import start_validation
 from igsupload.long_polling_val import poll_validation_status
-from igsupload.igs_notification import send_notification
+from igsupload.igs_notification import send_notification, prebuild_notification_bundle, prebuilt, row_key
+import igsupload.igs_notification as igs_notification
+from igsupload.bundle_check import check_bundle
 from igsupload.igsupload_logger import log_to_csv, extract_param
+from igsupload.validate import validate_metadata, print_issues
+from igsupload.reads_index import build_reads_index, default_roots
+import igsupload.reads_index as reads_index
+from igsupload.reads_io import ConcatRead
+import igsupload.timing as timing
+import igsupload.metrics as metrics
+import igsupload.events as events
+import igsupload.progress as progress
+import igsupload.compress as compress
+import igsupload.reads_check as reads_check
+import igsupload.gzip_check as gzip_check
+import igsupload.dedup as dedup
+import igsupload.run_store as run_store
+
+# Meldungsbundles werden eine Zeile im Voraus gebaut und geprüft, während die vorige Zeile hochlädt
+PREBUILD_WORKERS = 2
 
 
 def start(csv_path: str):
     """
     Haupt-Workflow: CSV einlesen, jede Datei verarbeiten, validieren
     und anschließend eine Sequenzmeldung senden und loggen.
+    Gibt False zurück, wenn die Metadaten-Prüfung fehlschlägt (dann wird nichts hochgeladen).
     """
+    # Reads-Verzeichnisse einmalig scannen, danach keine Einzel-Stats mehr
+    reads = build_reads_index(default_roots(csv_path), reads_index.read_patterns)
+    # Gesamte CSV vorab prüfen, bevor ein einziges Byte gesendet wird
+    issues = validate_metadata(iter_csv(csv_path), reads)
+    if issues:
+        print_issues(issues)
+        return False
+
     # Token im Hintergrund regelmäßig aktualisieren
     token_thread = threading.Thread(target=token_module.update_token, daemon=True)
     token_thread.start()
     time.sleep(2)
 
-    rows = read_csv(csv_path)
-    doc_ids = []
+    timing.reset()
+    gzip_check.reset()
+    dedup.reset()
+    run_store.start_run(csv_path)
+    metrics.run_in_progress.set(1)
+    metrics.write_textfile()
+    if progress.wanted():
+        progress.start(*_total_work(csv_path, reads))
+    pool = ThreadPoolExecutor(max_workers=PREBUILD_WORKERS, thread_name_prefix="prebuild")
+    try:
+        # Zeilen erneut streamen (die Prüfung oben hat die CSV schon einmal komplett gelesen),
+        # damit nicht alle Zeilen gleichzeitig im Speicher liegen
+        for row, bundle_future in _with_prebuilt(iter_csv(csv_path), pool):
+            with timing.context(sample=row.LAB_SEQUENCE_ID or row.DEMIS_NOTIFICATION_ID):
+                _process_row(row, reads, bundle_future)
+            metrics.write_textfile(force=False)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        progress.finish()
+        timing.print_summary()
+        gzip_check.print_summary()
+        dedup.print_summary()
+        run_store.finish_run()
+        timing.close()
+        events.flush()
+        metrics.run_in_progress.set(0)
+        metrics.write_textfile()
+
+
+def _total_work(csv_path, reads):
+    """Bytes und Anzahl aller Read-Dateien der CSV (für Fortschritt und ETA)."""
+    total_bytes = total_files = 0
+    for row in iter_csv(csv_path):
+        for size in _file_sizes(row, reads):
+            total_bytes += size
+            total_files += 1
+    return total_bytes, total_files
+
+
+def _file_sizes(row, reads):
+    """Größen der auffindbaren Read-Dateien der Zeile (fehlende zählen nicht zum Fortschritt)."""
+    for file_name in (row.FILE_1_NAME, row.FILE_2_NAME):
+        if not file_name:
+            continue
+        try:
+            yield reads.resolve(file_name).size
+        except (FileNotFoundError, ValueError):
+            continue
+
+
+def _skip_row(row, reads):
+    """Zeile wird nicht hochgeladen: ihre Dateien gelten in der Fortschrittsanzeige als erledigt."""
+    if progress.active():
+        for size in _file_sizes(row, reads):
+            progress.skip(size, size, files=1)
+
+
+def _prebuild(row):
+    """Bundle mit Platzhalter-doc_ids und die Verstöße gegen die Profilregeln."""
+    # läuft im Pool-Thread, dort gibt es keinen timing.context()
+    with timing.span("prebuild_notification", sample=row.LAB_SEQUENCE_ID or row.DEMIS_NOTIFICATION_ID):
+        try:
+            bundle = prebuild_notification_bundle(row)
+        except Exception as e:
+            return None, [f"cannot build notification bundle: {e}"]
+        return bundle, check_bundle(bundle)
+
+
+def _with_prebuilt(rows, pool):
+    """Liefert (Zeile, Future des Bundles); das Bundle der nächsten Zeile entsteht schon im Pool."""
+    pending = None
     for row in rows:
-        for file_num in (1,2):
-            file_name = getattr(row, f"FILE_{file_num}_NAME")
+        future = pool.submit(_prebuild, row)
+        if pending is not None:
+            yield pending
+        pending = (row, future)
+    if pending is not None:
+        yield pending
 
-            if not file_name:
-                continue
 
-            file_path = os.path.abspath(
-                os.path.join(os.path.dirname(csv_path), "..", "reads", file_name)
-            )
+def _bundle_ok(row, future):
+    """Prebuilt bundle of the row, or None (with the issues printed) if it fails the profile rules."""
+    # noch nicht vom Pool angefangen: direkt hier bauen statt zu warten
+    bundle, issues = _prebuild(row) if future.cancel() else future.result()
+    if not issues:
+        return bundle
+    sample = row.LAB_SEQUENCE_ID or row.DEMIS_NOTIFICATION_ID
+    typer.secho(f"Notification bundle for {sample} fails the local profile checks, skipping its uploads:", fg=typer.colors.RED)
+    for issue in issues:
+        typer.secho(f"  {issue}", fg=typer.colors.RED)
+    events.emit("error", "prebuild_notification", issues[0], issues=issues)
+    return None
+
+
+def _row_key(row, reads):
+    """Schlüssel der Zeile samt Größe/mtime ihrer Read-Dateien (geänderte Dateien -> neue Meldung)."""
+    files = []
+    for file_name in (row.FILE_1_NAME, row.FILE_2_NAME):
+        try:
+            read = reads.resolve(file_name) if file_name else None
+        except (FileNotFoundError, ValueError):
+            read = None
+        files.append((file_name, read.size, read.mtime) if read else (file_name,))
+    return row_key(row, files)
+
+
+def _already_notified(row, key):
+    """Mit --deterministic-ids werden Zeilen übersprungen, die genau so schon gemeldet wurden."""
+    if not igs_notification.deterministic_ids:
+        return False
+    transaction_id = run_store.find_sent(key)
+    if transaction_id is None:
+        return False
+    sample = row.LAB_SEQUENCE_ID or row.DEMIS_NOTIFICATION_ID
+    typer.secho(f"Skipping {sample}: identical row already notified (transaction {transaction_id})", fg=typer.colors.YELLOW)
+    events.emit("info", "notification_skipped", transaction_id=transaction_id)
+    return True
+
+
+def _gzip_ok(file_name, result):
+    """Unvollständige/defekte .gz-Dateien (z. B. rsync noch aktiv) werden nicht hochgeladen."""
+    gzip_check.record(file_name, result)
+    if result.ok:
+        return True
+    typer.secho(f"Corrupt gzip file {file_name}, skipping upload: {result.error}", fg=typer.colors.RED)
+    events.emit("error", "gzip_check", result.error, members=result.members)
+    return False
+
+
+def _reads_ok(file_name, result):
+    """Meldet Strukturfehler aus --check-reads; die Datei wird dann nicht hochgeladen."""
+    if result.ok:
+        return True
+    typer.secho(f"Invalid read file {file_name}, skipping upload:", fg=typer.colors.RED)
+    for error in result.errors:
+        typer.secho(f"  {error}", fg=typer.colors.RED)
+    events.emit("error", "check_reads", result.errors[0], errors=result.errors, records=result.records)
+    return False
+
+
+def _process_row(row, reads, bundle_future=None):
+    """Lädt die Dateien einer CSV-Zeile hoch und sendet danach die Sequenzmeldung."""
+    key = _row_key(row, reads)
+    if _already_notified(row, key):
+        _skip_row(row, reads)
+        return
+    bundle = None
+    if bundle_future is not None:
+        bundle = _bundle_ok(row, bundle_future)
+        if bundle is None:
+            _skip_row(row, reads)
+            return
+    doc_ids = []
+    sample = row.LAB_SEQUENCE_ID or row.DEMIS_NOTIFICATION_ID
+    for file_num in (1,2):
+        file_name = getattr(row, f"FILE_{file_num}_NAME")
+
+        if not file_name:
+            continue
+
+        if not events.quiet:
             typer.echo(f"Processing file: {file_name}")
 
-            if not os.path.exists(file_path):
-                typer.secho(f"File not found: {file_path}", fg=typer.colors.RED)
+        try:
+            read = reads.resolve(file_name)
+        except (FileNotFoundError, ValueError) as e:
+            typer.secho(str(e), fg=typer.colors.RED)
+            events.emit("error", "resolve_file", str(e), file=file_name)
+            continue
+        # mehrere Lane-Dateien werden als ein virtueller Stream unter einem Namen hochgeladen
+        upload_name = read.name if isinstance(read, ConcatRead) else file_name
+        file_path, upload_size = read.path, read.size
+
+        with timing.context(file=file_name), ExitStack() as cleanup:
+            progress.file_stage(file_name, "hash")
+            # --check-reads und die gzip-Prüfung laufen im selben Lesedurchlauf wie Hash bzw. Kompression
+            checkers = [reads_check.checker_for(upload_name)] if reads_check.enabled else []
+            verifier = None
+            if upload_name.endswith(".gz") and (gzip_check.enabled or checkers):
+                verifier = gzip_check.GzipVerifier(sink=checkers[0] if checkers else None)
+                cleanup.callback(verifier.finish)  # Worker-Thread auch bei Fehlern beenden
+            if compress.should_compress(upload_name):
+                # gzip + SHA-256 + Größe in einem Durchlauf, hochgeladen wird die Spool-Datei
+                with timing.span("compress", bytes=read.size) as span:
+                    compressed = compress.compress_read(read.path, consumers=checkers)
+                    span["compressed_bytes"] = compressed.size
+                cleanup.callback(compressed.remove)
+                progress.uploads_as(read.size, compressed.size)
+                hash_value = compressed.sha256
+                file_path, upload_name, upload_size = compressed.path, upload_name + ".gz", compressed.size
+            else:
+                # SHA-256 Hash
+                with timing.span("create_hash", bytes=read.size):
+                    hash_value = create_hash(file_path, *([verifier] if verifier else checkers))
+            if verifier and not _gzip_ok(file_name, verifier.finish()):
+                progress.skip(upload_bytes=upload_size)
+                continue
+            if checkers and not _reads_ok(file_name, checkers[0].finish()):
+                progress.skip(upload_bytes=upload_size)
                 continue
 
-            # SHA-256 Hash
-            hash_value = create_hash(file_path)
+            # identischer Inhalt wurde schon validiert: DocumentReference wiederverwenden statt erneut hochladen
+            reused_id = dedup.lookup(hash_value, upload_size)
+            if reused_id:
+                if not events.quiet:
+                    typer.echo(f"Reusing validated DocumentReference {reused_id} for identical file {file_name}")
+                events.emit("info", "dedup", file=file_name, doc_id=reused_id, bytes=upload_size)
+                timing.annotate(doc_id=reused_id, reused=True)
+                progress.skip(upload_bytes=upload_size)
+                run_store.record_upload(sample, upload_name, hash_value, upload_size, reused_id, "VALID", reused=True)
+                doc_ids += [reused_id]
+                continue
 
             # create and post DocumentReference
-            doc_ref = build_document_reference(file_name, hash_value)
-            doc_id = post_document_reference(doc_ref, token_module.current_token)
+            doc_ref = build_document_reference(upload_name, hash_value)
+            with timing.span("post_document_reference") as span:
+                doc_id = post_document_reference(doc_ref, token_module.current_token)
+                if not doc_id:
+                    span["error"] = "no DocumentReference id"
             doc_ids += [doc_id]
             if not doc_id:
                 typer.secho(f"Failed to create DocumentReference for {file_name}", fg=typer.colors.RED)
+                progress.skip(upload_bytes=upload_size)
                 continue
+            timing.annotate(doc_id=doc_id)
+            stored_upload = run_store.record_upload(sample, upload_name, hash_value, upload_size, doc_id, "UPLOADING")
 
             # upload chunks
-            size = os.path.getsize(file_path)
-            upload_id, urls, part_size = get_presigned_url(
-                token_module.current_token, doc_id, size
-            )
-            complete_body = put_chunks(file_path, part_size, urls, upload_id)
-            post_upload_body(doc_id, complete_body, token_module.current_token)
+            progress.file_stage(file_name, "upload")
+            with timing.span("get_presigned_url"):
+                upload_id, urls, part_size = get_presigned_url(
+                    token_module.current_token, doc_id, upload_size
+                )
+            # Part-URLs vor Ablauf bzw. nach 403 neu holen (gleiche uploadId, der Upload läuft weiter)
+            urls = PresignedUrls(urls, upload_id, refresh=lambda: get_presigned_url(
+                token_module.current_token, doc_id, upload_size
+            ))
+            with timing.span("put_chunks", bytes=upload_size):
+                complete_body = put_chunks(file_path, part_size, urls, upload_id)
+            with timing.span("post_upload_body"):
+                post_upload_body(doc_id, complete_body, token_module.current_token)
 
             # validation of files
-            start_validation(doc_id, token_module.current_token)
-            status = poll_validation_status(doc_id, token_module.current_token)
+            progress.file_stage(file_name, "validate")
+            with timing.span("start_validation"):
+                start_validation(doc_id, token_module.current_token)
+            with timing.span("poll_validation_status") as span:
+                status = poll_validation_status(doc_id, token_module.current_token)
+                span["status"] = status
+                if status != "VALID":
+                    span["error"] = status
+            run_store.update_upload(stored_upload, status)
             if status != "VALID":
                 typer.secho(f"Validation failed for {file_name}", fg=typer.colors.RED)
                 continue
+            dedup.remember(hash_value, upload_size, doc_id)
 
-        try:
+    for file_name in (row.FILE_1_NAME, row.FILE_2_NAME):
+        progress.file_stage(file_name, None)
+
+    try:
+        with timing.span("send_notification"), prebuilt(bundle, key):
             result = send_notification(row, doc_ids)
+        if not events.quiet:
             typer.secho(f"Notification for {file_name} sent successfully.", fg=typer.colors.GREEN)
             typer.echo("Server response:")
             typer.echo(result)
 
-            if isinstance(result, dict) and "parameter" in result:
+        if isinstance(result, dict) and "parameter" in result:
+            if not events.quiet:
                 typer.secho("Logging the Results...", fg=typer.colors.GREEN)
-                notification_id = extract_param(result["parameter"], "submitterGeneratedNotificationID")
-                transaction_id = extract_param(result["parameter"], "transactionID")
-                lab_sequence_id = extract_param(result["parameter"], "labSequenceID")
-
-                log_to_csv(
-                    filename=file_name,
-                    notification_id=notification_id or "",
-                    transaction_id=transaction_id or "",
-                    lab_sequence_id=lab_sequence_id or "",
-                    document_reference_id=doc_ids,
-                    status="OK"
-                )
+            notification_id = extract_param(result["parameter"], "submitterGeneratedNotificationID")
+            transaction_id = extract_param(result["parameter"], "transactionID")
+            lab_sequence_id = extract_param(result["parameter"], "labSequenceID")
+            events.emit("info", "notification", transaction_id=transaction_id, doc_ids=doc_ids)
+            if events.quiet:
+                typer.echo(f"{row.LAB_SEQUENCE_ID or notification_id}: {len(doc_ids)} file(s) uploaded, notification {transaction_id}")
 
-        except Exception as e:
-            if hasattr(e, 'response') and e.response is not None:
-                resp = e.response
-                typer.secho(f"Error {resp.status_code} sending notification for {file_name}", fg=typer.colors.RED)
-                try:
-                    typer.echo(resp.json())
-                except ValueError:
-                    typer.echo(resp.text)
-            else:
-                typer.secho(f"Unexpected error for {file_name}: {e}", fg=typer.colors.RED)
+            log_to_csv(
+                filename=file_name,
+                notification_id=notification_id or "",
+                transaction_id=transaction_id or "",
+                lab_sequence_id=lab_sequence_id or "",
+                document_reference_id=doc_ids,
+                status="OK"
+            )
+
+    except Exception as e:
+        events.emit("error", "notification", str(e), doc_ids=doc_ids)
+        if hasattr(e, 'response') and e.response is not None:
+            resp = e.response
+            typer.secho(f"Error {resp.status_code} sending notification for {file_name}", fg=typer.colors.RED)
+            try:
+                typer.echo(resp.json())
+            except ValueError:
+                typer.echo(resp.text)
+        else:
+            typer.secho(f"Unexpected error for {file_name}: {e}", fg=typer.colors.RED)
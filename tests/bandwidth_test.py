@@ -0,0 +1,121 @@
+import os
+import time
+from datetime import datetime
+import pytest
+
+from igsupload import bandwidth
+from igsupload.bandwidth import TokenBucket, ThrottledBody, parse_schedule, parse_rate
+
+SCHEDULE = """
+# Bürozeiten gedrosselt
+Mon-Fri  08:00-18:00  50MB/s
+Fri-Mon  22:00-06:00  unlimited   # Nächte am Wochenende
+*        *            200MB/s
+"""
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(bandwidth, "max_bandwidth", None)
+    monkeypatch.setattr(bandwidth, "schedule_path", None)
+    monkeypatch.setattr(bandwidth, "schedule", [])
+    monkeypatch.setattr(bandwidth, "_bucket", TokenBucket())
+    monkeypatch.setattr(bandwidth, "_current_rate", None)
+    monkeypatch.setattr(bandwidth, "_last_refresh", 0.0)
+
+def test_parse_rate():
+    assert parse_rate("50MB/s") == 50_000_000
+    assert parse_rate("1MiB") == 1024 * 1024
+    assert parse_rate(2000) == 2000
+    assert parse_rate(None) is None
+    assert parse_rate("0") is None
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+
+def test_parse_rate_unlimited():
+    assert parse_rate("unlimited") is None
+    assert parse_rate("200MB/s") == 200e6
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(1_000_000)
+    start = time.monotonic()
+    for _ in range(10):
+        bucket.consume(50_000)
+    # 500 KB bei 1 MB/s abzüglich Burst (250 KB)
+    assert 0.2 <= time.monotonic() - start < 0.6
+
+def test_token_bucket_unlimited_and_live_change():
+    bucket = TokenBucket()
+    start = time.monotonic()
+    bucket.consume(10 ** 12)
+    assert time.monotonic() - start < 0.05
+    bucket.set_rate(1000)
+    assert bucket.burst == bandwidth.BLOCK_SIZE
+
+def test_token_bucket_as_request_limiter():
+    bucket = TokenBucket(50, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.consume(1)
+    assert bucket.burst == 1
+    assert 0.08 <= time.monotonic() - start < 0.3
+
+@pytest.mark.parametrize("when,rate", [
+    ("2024-06-03 09:00", 50e6),      # Montag, Bürozeit
+    ("2024-06-03 18:00", 200e6),     # Montag, nach Feierabend
+    ("2024-06-07 23:30", None),      # Freitagnacht
+    ("2024-06-04 03:00", None),      # Dienstag früh gehört zur Montagnacht (Fri-Mon)
+    ("2024-06-05 03:00", 200e6),     # Mittwoch früh: Dienstagnacht ist nicht freigegeben
+    ("2024-06-08 05:59", None),      # Samstag früh (Nacht von Freitag)
+    ("2024-06-08 12:00", 200e6),     # Samstag Mittag
+])
+def test_schedule_rules(when, rate):
+    bandwidth.schedule = parse_schedule(SCHEDULE)
+    assert bandwidth.rate_at(datetime.strptime(when, "%Y-%m-%d %H:%M")) == rate
+
+@pytest.mark.parametrize("line,message", [
+    ("Mon 08:00-18:00", "expected '<days> <from-to> <limit>'"),
+    ("Moo * 1MB/s", "Invalid weekday: moo"),
+    ("Mon 8-18 1MB/s", "Invalid time: 8"),
+    ("Mon 08:00 1MB/s", "Invalid time range"),
+    ("Mon 18:00-24:00 1MB/s", "Invalid time: 24:00"),
+    ("Mon 08:00-08:00 1MB/s", "Invalid time range: 08:00-08:00 \\(empty window"),
+    ("Mon * fast", "Invalid rate: fast"),
+])
+def test_schedule_errors(line, message):
+    with pytest.raises(ValueError, match=f"line 2: {message}"):
+        parse_schedule("# header\n" + line)
+
+def test_schedule_file_reloaded_when_changed(tmp_path, capsys):
+    path = tmp_path / "schedule.txt"
+    path.write_text("* * 10MB/s\n")
+    bandwidth.set_schedule_file(path)
+    assert bandwidth._bucket.rate == 10e6
+
+    path.write_text("* * 20MB/s\n")
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    bandwidth.refresh(force=True)
+    assert bandwidth._bucket.rate == 20e6
+
+    # kaputte Änderung: alte Regeln bleiben
+    path.write_text("nonsense\n")
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    bandwidth.refresh(force=True)
+    assert bandwidth._bucket.rate == 20e6
+    assert "Could not reload bandwidth schedule" in capsys.readouterr().out
+
+def test_schedule_file_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        bandwidth.set_schedule_file(tmp_path / "missing.txt")
+
+def test_throttled_body():
+    data = bytes(range(256)) * 1000
+    body = ThrottledBody(data)
+    assert len(body) == len(data)
+    pieces = list(iter(lambda: body.read(8192), b""))
+    assert b"".join(pieces) == data
+    assert len(body) == 0
+
+def test_body_only_wrapped_with_limit():
+    assert bandwidth.body(b"abc") == b"abc"
+    bandwidth.set_max_bandwidth("1MB/s")
+    assert isinstance(bandwidth.body(b"abc"), ThrottledBody)
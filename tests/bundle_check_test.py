@@ -0,0 +1,49 @@
+import copy
+import json
+from pathlib import Path
+import pytest
+
+from igsupload.bundle_check import check_bundle
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+
+@pytest.fixture
+def bundle():
+    return json.loads((GOLDEN_DIR / "notification_bundle_full_row.json").read_text(encoding="utf-8"))
+
+def resource(bundle, resource_type):
+    return next(e["resource"] for e in bundle["entry"] if e["resource"]["resourceType"] == resource_type)
+
+@pytest.mark.parametrize("path", sorted(GOLDEN_DIR.glob("notification_bundle_*.json")), ids=lambda p: p.stem)
+def test_golden_bundles_pass(path):
+    assert check_bundle(json.loads(path.read_text(encoding="utf-8"))) == []
+
+def test_missing_required_element(bundle):
+    del resource(bundle, "Specimen")["subject"]
+    issues = check_bundle(bundle)
+    assert len(issues) == 1
+    assert issues[0].endswith(".subject: required by SpecimenSequence")
+
+def test_dangling_reference(bundle):
+    bundle["entry"] = [e for e in bundle["entry"] if e["resource"]["resourceType"] != "Device"]
+    issues = check_bundle(bundle)
+    assert any("reference Device/" in issue and "not found in the bundle" in issue for issue in issues)
+
+def test_invalid_status_and_dates(bundle):
+    resource(bundle, "Observation")["status"] = "done"
+    resource(bundle, "Patient")["birthDate"] = "1990-13"
+    resource(bundle, "Specimen")["collection"]["collectedDateTime"] = "31.02.2022"
+    issues = " | ".join(check_bundle(bundle))
+    assert "status: invalid value 'done'" in issues
+    assert "birthDate: invalid date '1990-13'" in issues
+    assert "collectedDateTime: invalid date '31.02.2022'" in issues
+
+def test_document_reference_count(bundle):
+    sequence = resource(bundle, "MolecularSequence")
+    sequence["extension"] = [e for e in sequence["extension"] if "valueReference" not in e][:1] + sequence["extension"][-1:]
+    assert any("expected 2 SequenceDocumentReference, got 1" in issue for issue in check_bundle(bundle))
+
+def test_composition_must_come_first(bundle):
+    broken = copy.deepcopy(bundle)
+    broken["entry"].append(broken["entry"].pop(0))
+    assert "Bundle.entry: the first entry must be the Composition" in check_bundle(broken)
@@ -0,0 +1,77 @@
+import gzip
+import hashlib
+import os
+import random
+import zlib
+import pytest
+
+from igsupload import compress
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(compress, "enabled", False)
+    monkeypatch.setattr(compress, "threads", 4)
+    monkeypatch.setattr(compress, "level", 6)
+    monkeypatch.setattr(compress, "spool_dir", None)
+
+def make_fastq(path, reads=20000, seed=1):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for i in range(reads):
+            seq = "".join(rng.choice("ACGT") for _ in range(100))
+            f.write(f"@read{i}\n{seq}\n+\n{'F' * 100}\n")
+    return path
+
+@pytest.mark.parametrize("block_size", [compress.BLOCK_SIZE, 100_000, 7])
+def test_output_is_standard_gzip(tmp_path, block_size):
+    source = make_fastq(tmp_path / "S1_R1.fastq", reads=2000 if block_size == 7 else 20000)
+    result = compress.compress_read(str(source), block_size=block_size)
+    try:
+        data = open(result.path, "rb").read()
+        assert gzip.decompress(data) == source.read_bytes()
+        assert result.size == len(data) == os.path.getsize(result.path)
+        assert result.sha256 == hashlib.sha256(data).hexdigest()
+        assert result.source_size == source.stat().st_size
+        # a single gzip member with correct CRC/ISIZE trailer
+        d = zlib.decompressobj(wbits=31)
+        d.decompress(data)
+        assert d.eof and d.unused_data == b""
+    finally:
+        result.remove()
+    assert not os.path.exists(result.path)
+
+def test_compression_ratio_close_to_single_stream(tmp_path):
+    source = make_fastq(tmp_path / "S1_R1.fastq")
+    result = compress.compress_read(str(source), block_size=128 * 1024)
+    single = len(gzip.compress(source.read_bytes(), compresslevel=6))
+    assert result.size < single * 1.02
+    result.remove()
+
+def test_empty_file(tmp_path):
+    source = tmp_path / "empty.fastq"
+    source.write_bytes(b"")
+    result = compress.compress_read(str(source))
+    assert gzip.decompress(open(result.path, "rb").read()) == b""
+    result.remove()
+
+def test_spool_dir(tmp_path):
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    compress.set_compress(True, 2, 1, spool)
+    source = make_fastq(tmp_path / "a.fastq", reads=10)
+    result = compress.compress_read(str(source))
+    assert os.path.dirname(result.path) == str(spool)
+    result.remove()
+
+def test_should_compress():
+    assert compress.should_compress("a.fastq") is False
+    compress.set_compress(True)
+    assert compress.should_compress("a.fastq") is True
+    assert compress.should_compress("a.fq") is True
+    assert compress.should_compress("a.fastq.gz") is False
+
+def test_invalid_settings(tmp_path):
+    with pytest.raises(ValueError):
+        compress.set_compress(True, compress_level=11)
+    with pytest.raises(NotADirectoryError):
+        compress.set_compress(True, directory=tmp_path / "missing")
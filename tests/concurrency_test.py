@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+from unittest import mock
+import pytest
+
+from igsupload import concurrency
+from igsupload import upload_chunks
+from igsupload.concurrency import AimdController
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(concurrency, "parallel", None)
+    monkeypatch.setattr(concurrency, "max_parallel", 8)
+    monkeypatch.setattr(concurrency, "state_path", None)
+    monkeypatch.setattr(upload_chunks, "RETRY_BACKOFF", 0.01)
+
+def finish_window(controller, end, nbytes=1000, seconds=0.01):
+    """Finishes one window of `slots` parts at time end."""
+    for _ in range(controller.slots):
+        controller.on_success(nbytes, seconds, now=end)
+
+def test_additive_increase_while_throughput_improves():
+    controller = AimdController(2, maximum=4, now=0)
+    finish_window(controller, end=1.0)      # 2 KB/s
+    assert controller.limit == 3
+    finish_window(controller, end=2.0)      # 3 KB/s
+    assert controller.limit == 4
+    finish_window(controller, end=2.5)
+    assert controller.limit == 4            # Maximum
+
+def test_hold_when_throughput_stops_improving():
+    controller = AimdController(2, maximum=8, now=0)
+    finish_window(controller, end=1.0)      # 2 KB/s
+    finish_window(controller, end=3.0)      # 1.5 KB/s, Latenz unverändert
+    assert controller.limit == 3
+
+def test_decrease_when_latency_grows():
+    controller = AimdController(4, maximum=8, now=0)
+    finish_window(controller, end=1.0, seconds=0.01)
+    assert controller.limit == 5
+    finish_window(controller, end=3.0, seconds=0.05)  # langsamer und Parts warten länger
+    assert controller.limit == 4
+
+def test_multiplicative_decrease_on_errors_with_cooldown():
+    controller = AimdController(8, maximum=8, now=0)
+    controller.on_error(now=10.0)
+    controller.on_error(now=10.1)  # gleichzeitig fehlgeschlagener Part: zählt nicht doppelt
+    assert controller.limit == 4
+    controller.on_error(now=11.5)
+    assert controller.limit == 2
+    for n in range(5):
+        controller.on_error(now=20.0 + 2 * n)
+    assert controller.limit == 1
+
+def test_fixed_parallel():
+    concurrency.set_parallel("3")
+    controller = concurrency.controller_for("https://s3.example/a")
+    controller.on_error()
+    assert controller.fixed and controller.slots == 3
+
+@pytest.mark.parametrize("value", ["0", "many"])
+def test_invalid_parallel(value):
+    with pytest.raises(ValueError, match="Invalid --parallel value"):
+        concurrency.set_parallel(value)
+
+def test_converged_value_is_stored_per_host(tmp_path):
+    concurrency.set_parallel("auto", 8, base_dir=str(tmp_path))
+    controller = concurrency.controller_for("https://s3.example/bucket/part1")
+    assert controller.limit == concurrency.INITIAL_PARALLEL
+    controller.limit = 6.5
+    concurrency.save("https://s3.example/bucket/part1", controller)
+    concurrency.save("https://other.example/x", AimdController(3, 8))
+
+    state = json.loads((tmp_path / "igsupload_concurrency.json").read_text())
+    assert state == {"s3.example": 6.5, "other.example": 3}
+    assert concurrency.controller_for("https://s3.example/bucket/part9").limit == 6.5
+
+def make_response(status, etag=None, headers=None):
+    response = mock.Mock()
+    response.status_code = status
+    response.headers = headers or ({"ETag": f'"{etag}"'} if etag else {})
+    return response
+
+def test_parts_upload_concurrently_and_in_order(tmp_path):
+    path = tmp_path / "reads.fastq"
+    path.write_bytes(b"A" * 1000)
+    urls = [f"https://s3.example/{n}" for n in range(1, 11)]
+    lock = threading.Lock()
+    active = peak = 0
+
+    def put(url, data):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return make_response(200, etag=f"e{url.rsplit('/', 1)[1]}")
+
+    concurrency.set_parallel("4")
+    with mock.patch("igsupload.upload_chunks.requests.put", side_effect=put):
+        result = upload_chunks.put_chunks(str(path), 100, urls, "up")
+
+    assert [c["partNumber"] for c in result["completedChunks"]] == list(range(1, 11))
+    assert [c["eTag"] for c in result["completedChunks"]] == [f"e{n}" for n in range(1, 11)]
+    assert 1 < peak <= 4
+
+def test_chunks_are_read_only_for_free_slots(tmp_path, monkeypatch):
+    path = tmp_path / "reads.fastq"
+    path.write_bytes(b"A" * 600)
+    lock = threading.Lock()
+    done = 0
+    held = []  # gelesene, noch nicht hochgeladene Parts beim Lesen jedes Parts
+    original = upload_chunks.split_file_in_chunks
+
+    def counting(file_path, chunk_size):
+        for number, chunk in enumerate(original(file_path, chunk_size), start=1):
+            with lock:
+                held.append(number - done)
+            yield chunk
+
+    def put(url, data):
+        nonlocal done
+        time.sleep(0.02)
+        with lock:
+            done += 1
+        return make_response(200, etag=url)
+
+    monkeypatch.setattr(upload_chunks, "split_file_in_chunks", counting)
+    concurrency.set_parallel("2")
+    with mock.patch("igsupload.upload_chunks.requests.put", side_effect=put):
+        result = upload_chunks.put_chunks(str(path), 100, [f"u{n}" for n in range(1, 7)], "up")
+
+    assert len(result["completedChunks"]) == 6
+    assert max(held) == 2
+
+def test_throttled_part_is_retried(tmp_path):
+    path = tmp_path / "reads.fastq"
+    path.write_bytes(b"A" * 200)
+    responses = {"u1": [make_response(429, headers={"Retry-After": "0"}), make_response(200, "e1")],
+                 "u2": [make_response(503), make_response(200, "e2")]}
+    concurrency.set_parallel("1")
+    with mock.patch("igsupload.upload_chunks.requests.put", side_effect=lambda url, data: responses[url].pop(0)):
+        result = upload_chunks.put_chunks(str(path), 100, ["u1", "u2"], "up")
+    assert [c["eTag"] for c in result["completedChunks"]] == ["e1", "e2"]
+
+def test_only_contiguous_parts_are_completed(tmp_path):
+    path = tmp_path / "reads.fastq"
+    path.write_bytes(b"A" * 300)
+
+    def put(url, data):
+        if url == "u2":
+            return make_response(429)
+        return make_response(200, etag=url)
+
+    concurrency.set_parallel("3")
+    with mock.patch("igsupload.upload_chunks.requests.put", side_effect=put), mock.patch("builtins.print"):
+        result = upload_chunks.put_chunks(str(path), 100, ["u1", "u2", "u3"], "up")
+    # Part 3 ist zwar hochgeladen, aber ohne Part 2 nicht abschließbar
+    assert [c["partNumber"] for c in result["completedChunks"]] == [1]
@@ -0,0 +1,54 @@
+import pytest
+
+from igsupload import dedup, run_store
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(dedup, "mode", "off")
+    monkeypatch.setattr(dedup, "max_age", dedup.MAX_AGE)
+    dedup.reset()
+    yield
+    run_store.set_run_store(None)
+
+def test_off_never_reuses():
+    dedup.remember("abc", 10, "doc-1")
+    assert dedup.lookup("abc", 10) is None
+
+def test_run_reuses_within_the_run(capsys):
+    dedup.set_dedup("run")
+    assert dedup.lookup("abc", 10) is None
+    dedup.remember("abc", 10, "doc-1")
+    assert dedup.lookup("abc", 10) == "doc-1"
+    assert dedup.lookup("abc", 11) is None  # gleiche Prüfsumme, andere Größe
+
+    dedup.print_summary()
+    assert "Deduplicated: 1 file(s)" in capsys.readouterr().out
+    dedup.reset()
+    assert dedup.lookup("abc", 10) is None
+
+def test_store_reuses_earlier_runs(tmp_path):
+    with pytest.raises(ValueError, match="run store"):
+        dedup.set_dedup("store")
+    run_store.set_run_store(tmp_path / "runs.sqlite")
+    run_store.record_upload("S1", "S1_R1.fastq", "abc", 10, "doc-1", "VALID")
+    dedup.set_dedup("store")
+    assert dedup.lookup("abc", 10) == "doc-1"
+    assert dedup.reused_bytes == 10
+
+def test_store_reuses_only_recent_validations(tmp_path):
+    run_store.set_run_store(tmp_path / "runs.sqlite")
+    run_store.record_upload("S1", "S1_R1.fastq", "abc", 10, "doc-1", "VALID")
+    run_store.execute("UPDATE uploads SET updated = updated - 3 * 3600")
+    # eine spätere Wiederverwendung verlängert die Gültigkeit nicht
+    run_store.record_upload("S2", "S2_R1.fastq", "abc", 10, "doc-1", "VALID", reused=True)
+
+    dedup.set_dedup("store", max_age_hours=2)
+    assert dedup.lookup("abc", 10) is None
+    dedup.set_dedup("store", max_age_hours=4)
+    assert dedup.lookup("abc", 10) == "doc-1"
+    with pytest.raises(ValueError, match="Invalid dedup max age"):
+        dedup.set_dedup("store", max_age_hours=0)
+
+def test_invalid_mode():
+    with pytest.raises(ValueError, match="Invalid dedup mode"):
+        dedup.set_dedup("always")
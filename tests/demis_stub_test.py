@@ -0,0 +1,422 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+import pytest
+import requests
+
+import igsupload.config as config
+import igsupload.get_token as token_module
+import igsupload.timing as timing
+from igsupload.demis_stub import DemisStub, TOKEN_PATH
+
+def make_file(tmp_path, name="S1_R1.fastq", size=2500):
+    path = tmp_path / name
+    path.write_bytes(b"@r\nACGT\n+\nFFFF\n" * (size // 16))
+    return path
+
+def create_upload(stub, data, token="t"):
+    headers = {"Authorization": f"Bearer {token}"}
+    doc = {"content": [{"attachment": {"hash": hashlib.sha256(data).hexdigest()}}]}
+    doc_id = requests.post(f"{stub.base_url}/fhir/DocumentReference", json=doc, headers=headers).json()["id"]
+    info = requests.get(
+        f"{stub.base_url}/S3Controller/upload/{doc_id}/s3-upload-info", params={"fileSize": len(data)}
+    ).json()
+    return doc_id, info
+
+def upload_parts(info, data):
+    size = info["partSizeBytes"]
+    chunks = []
+    for n, url in enumerate(info["presignedUrls"], start=1):
+        response = requests.put(url, data=data[(n - 1) * size:n * size])
+        assert response.status_code == 200
+        chunks.append({"partNumber": n, "eTag": response.headers["ETag"].strip('"')})
+    return {"uploadId": info["uploadId"], "completedChunks": chunks}
+
+@pytest.fixture
+def stub():
+    with DemisStub(part_size=1000, seed=1) as s:
+        yield s
+
+def test_token(stub):
+    response = requests.post(stub.root_url + TOKEN_PATH, data={"grant_type": "password"})
+    assert response.status_code == 200
+    assert response.json()["access_token"]
+    assert stub.request_counts["token"] == 1
+
+def test_full_upload_is_valid(stub):
+    data = os.urandom(2500)
+    doc_id, info = create_upload(stub, data)
+    assert len(info["presignedUrls"]) == 3
+    assert "X-Amz-Expires=" in info["presignedUrls"][0]
+
+    body = upload_parts(info, data)
+    base = f"{stub.base_url}/S3Controller/upload/{doc_id}"
+    assert requests.post(f"{base}/$finish-upload", json=body).status_code == 204
+    assert requests.post(f"{base}/$validate").status_code == 204
+    status = requests.get(f"{base}/$validation-status").json()
+    assert status == {"status": "VALID", "done": True, "message": None}
+
+def test_hash_mismatch_is_invalid(stub):
+    data = os.urandom(1500)
+    doc_id, info = create_upload(stub, data)
+    body = upload_parts(info, data[::-1])
+    base = f"{stub.base_url}/S3Controller/upload/{doc_id}"
+    requests.post(f"{base}/$finish-upload", json=body)
+    requests.post(f"{base}/$validate")
+    status = requests.get(f"{base}/$validation-status").json()
+    assert status["status"] == "INVALID"
+    assert status["message"] == "Hash does not match"
+
+def test_finish_upload_with_wrong_etags(stub):
+    data = os.urandom(1500)
+    doc_id, info = create_upload(stub, data)
+    body = upload_parts(info, data)
+    body["completedChunks"][0]["eTag"] = "bogus"
+    response = requests.post(f"{stub.base_url}/S3Controller/upload/{doc_id}/$finish-upload", json=body)
+    assert response.status_code == 400
+
+def test_validation_delay():
+    with DemisStub(validation_delay=0.3) as stub:
+        data = b"x" * 10
+        doc_id, info = create_upload(stub, data)
+        base = f"{stub.base_url}/S3Controller/upload/{doc_id}"
+        requests.post(f"{base}/$finish-upload", json=upload_parts(info, data))
+        requests.post(f"{base}/$validate")
+        assert requests.get(f"{base}/$validation-status").json()["done"] is False
+        time.sleep(0.35)
+        assert requests.get(f"{base}/$validation-status").json()["status"] == "VALID"
+
+def test_expired_presigned_url():
+    with DemisStub(url_expires=-1) as stub:
+        _, info = create_upload(stub, b"abc")
+        assert requests.put(info["presignedUrls"][0], data=b"abc").status_code == 403
+
+def test_error_rate():
+    with DemisStub(error_rate=1.0, error_status=500) as stub:
+        _, info = create_upload(stub, b"abc")
+        assert requests.put(info["presignedUrls"][0], data=b"abc").status_code == 500
+
+def test_bandwidth_cap():
+    with DemisStub(bandwidth="100KB/s") as stub:
+        data = os.urandom(30_000)
+        _, info = create_upload(stub, data)
+        start = time.monotonic()
+        upload_parts(info, data)
+        assert time.monotonic() - start >= 0.25
+
+def test_notification_accepts_gzip(stub):
+    bundle = {"identifier": {"value": "n-1"}, "entry": [
+        {"resource": {"resourceType": "MolecularSequence", "identifier": [{"value": "lab-7"}]}}
+    ]}
+    body = gzip.compress(json.dumps(bundle).encode())
+    response = requests.post(
+        f"{stub.base_url}/fhir/$process-notification-sequence",
+        data=body, headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    params = {p["name"]: p["valueIdentifier"]["value"] for p in response.json()["parameter"]}
+    assert params["submitterGeneratedNotificationID"] == "n-1"
+    assert params["labSequenceID"] == "lab-7"
+    assert params["transactionID"].startswith("IGS-")
+    assert stub.notifications == [bundle]
+
+def test_notification_gzip_rejected():
+    with DemisStub(accept_gzip=False) as stub:
+        response = requests.post(
+            f"{stub.base_url}/fhir/$process-notification-sequence",
+            data=gzip.compress(b"{}"), headers={"Content-Encoding": "gzip"}
+        )
+        assert response.status_code == 415
+
+def run_workflow(tmp_path, monkeypatch, suffix="", names=None, fields=None, **stub_options):
+    from igsupload.extract_csv import header
+    from igsupload.workflow import start
+    import igsupload.igsupload_logger as logger
+
+    reads = tmp_path / "reads"
+    reads.mkdir(parents=True)
+    names = names or ("S1_R1.fastq" + suffix, "S1_R2.fastq" + suffix)
+    for name in names:
+        make_file(reads, name)
+    values = {field: "" for field in header}
+    values.update({
+        "DEMIS_NOTIFICATION_ID": "a1b2c3", "FILE_1_NAME": names[0], "FILE_2_NAME": names[1],
+        "SEQUENCING_LAB_DEMIS_LAB_ID": "10285", "LAB_SEQUENCE_ID": "S1",
+    })
+    values.update(fields or {})
+    csv_dir = tmp_path / "csv"
+    csv_dir.mkdir()
+    csv_path = csv_dir / "meta.csv"
+    csv_path.write_text(";".join(header) + "\n" + ";".join(values[f] for f in header) + "\n")
+
+    monkeypatch.setattr(token_module, "current_token", None)
+    monkeypatch.setattr(token_module, "refresh_token", None)
+    monkeypatch.setattr(logger, "logging_path", str(tmp_path))
+    with DemisStub(**stub_options) as stub:
+        monkeypatch.setattr(config, "BASE_URL", stub.base_url)
+        monkeypatch.setattr(config, "CERT", None)
+        monkeypatch.setattr(config, "KEY", None)
+        start(str(csv_path))
+    return stub, reads
+
+def test_workflow_against_stub(tmp_path, monkeypatch):
+    spans_file = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(timing, "spans_path", str(spans_file))
+    stub, reads = run_workflow(tmp_path, monkeypatch, part_size=1000)
+    assert stub.request_counts["document_reference"] == 2
+    assert stub.request_counts["put_part"] == 6
+    assert all(upload.status == "VALID" for upload in stub.uploads.values())
+    assert len(stub.notifications) == 1
+    assert stub.notifications[0]["identifier"]["value"] == "a1b2c3"
+
+    summary = timing.summarize()
+    assert summary["put_part"]["count"] == 6
+    assert summary["create_hash"]["bytes"] == sum(p.stat().st_size for p in reads.iterdir())
+    spans = [json.loads(line) for line in spans_file.read_text().splitlines()]
+    assert len(spans) == sum(s["count"] for s in summary.values())
+    assert all(span["sample"] == "S1" for span in spans)
+
+def test_workflow_with_compress(tmp_path, monkeypatch):
+    import igsupload.compress as compress
+    monkeypatch.setattr(compress, "enabled", True)
+    stub, reads = run_workflow(tmp_path, monkeypatch, part_size=100)
+
+    assert len(stub.uploads) == 2
+    assert all(upload.status == "VALID" for upload in stub.uploads.values())
+    source_size = sum(p.stat().st_size for p in reads.iterdir())
+    assert sum(upload.file_size for upload in stub.uploads.values()) < source_size
+    assert timing.summarize()["compress"]["count"] == 2
+
+def test_workflow_progress_with_compress(tmp_path, monkeypatch, capsys):
+    import igsupload.compress as compress
+    import igsupload.progress as progress
+    monkeypatch.setattr(compress, "enabled", True)
+    monkeypatch.setattr(progress, "enabled", True)
+    stub, reads = run_workflow(tmp_path, monkeypatch, part_size=100)
+
+    out, err = capsys.readouterr()
+    final = err.rstrip("\n").split("\r")[-1]
+    source = sum(p.stat().st_size for p in reads.iterdir()) / 1e6
+    uploaded = sum(upload.file_size for upload in stub.uploads.values()) / 1e6
+    # hochgeladen wird die kleinere Spool-Datei, die Summe muss dazu passen
+    assert final.startswith("files 2/2")
+    assert f"hashed {source:.1f} MB/{source:.1f} MB" in final
+    assert f"uploaded {uploaded:.1f} MB/{uploaded:.1f} MB" in final
+    assert "Chunk 1 " not in out
+
+def test_workflow_skips_invalid_reads(tmp_path, monkeypatch):
+    import sys
+    import igsupload.reads_check as reads_check
+    monkeypatch.setattr(reads_check, "enabled", True)
+
+    original = make_file
+    def make_truncated_r2(directory, name):
+        path = original(directory, name)
+        if name.endswith("R2.fastq"):
+            path.write_bytes(path.read_bytes()[:-5])
+        return path
+    monkeypatch.setattr(sys.modules[__name__], "make_file", make_truncated_r2)
+    stub, _ = run_workflow(tmp_path, monkeypatch)
+
+    # nur R1 wird hochgeladen, das abgeschnittene R2 nicht
+    assert len(stub.uploads) == 1
+    assert timing.summarize()["create_hash"]["count"] == 2
+
+def test_workflow_skips_truncated_gzip(tmp_path, monkeypatch, capsys):
+    import gzip
+    import sys
+    original = make_file
+    def make_gzip(directory, name):
+        path = original(directory, name)
+        data = gzip.compress(path.read_bytes())
+        # R2 ist eine unvollständige Kopie
+        path.write_bytes(data[:-20] if "R2" in name else data)
+        return path
+    monkeypatch.setattr(sys.modules[__name__], "make_file", make_gzip)
+    stub, _ = run_workflow(tmp_path, monkeypatch, suffix=".gz")
+
+    assert len(stub.uploads) == 1
+    out = capsys.readouterr().out
+    assert "Gzip check" in out and "truncated gzip stream" in out
+
+def test_workflow_concatenates_lanes(tmp_path, monkeypatch):
+    import hashlib
+    import sys
+    original = make_file
+    def make_lanes(directory, name):
+        # ein Eintrag der CSV -> vier Lane-Dateien unterschiedlicher Größe
+        for lane in range(1, 5):
+            original(directory, name.replace("*", str(lane)), size=400 * lane)
+    monkeypatch.setattr(sys.modules[__name__], "make_file", make_lanes)
+    stub, reads = run_workflow(
+        tmp_path, monkeypatch, names=("S1_L00*_R1_001.fastq", "S1_L00*_R2_001.fastq"), part_size=1000
+    )
+
+    assert sorted(upload.title for upload in stub.uploads.values()) == ["S1_R1_001.fastq", "S1_R2_001.fastq"]
+    assert all(upload.status == "VALID" for upload in stub.uploads.values())
+    for upload in stub.uploads.values():
+        lanes = sorted(reads.glob(upload.title.replace("S1_", "S1_L00?_")))
+        data = b"".join(lane.read_bytes() for lane in lanes)
+        assert len(lanes) == 4
+        assert upload.file_size == len(data)
+        assert upload.file_hash == hashlib.sha256(data).hexdigest()
+
+def test_workflow_with_bandwidth_limit(tmp_path, monkeypatch):
+    import igsupload.bandwidth as bandwidth
+    monkeypatch.setattr(bandwidth, "_bucket", bandwidth.TokenBucket())
+    monkeypatch.setattr(bandwidth, "schedule_path", None)
+    monkeypatch.setattr(bandwidth, "schedule", [])
+    monkeypatch.setattr(bandwidth, "BLOCK_SIZE", 256)
+    monkeypatch.setattr(bandwidth, "max_bandwidth", None)
+    monkeypatch.setattr(bandwidth, "_current_rate", None)
+    bandwidth.set_max_bandwidth("10KB/s")
+    stub, reads = run_workflow(tmp_path, monkeypatch, part_size=1000)
+
+    assert all(upload.status == "VALID" for upload in stub.uploads.values())
+    # ~5 KB bei 10 KB/s, abzüglich 2,5 KB Burst
+    assert timing.summarize()["put_part"]["total"] >= 0.15
+
+def test_workflow_with_parallel_parts(tmp_path, monkeypatch):
+    import json
+    import igsupload.concurrency as concurrency
+    monkeypatch.setattr(concurrency, "state_path", str(tmp_path / "concurrency.json"))
+    monkeypatch.setattr(concurrency, "parallel", None)
+    stub, _ = run_workflow(tmp_path, monkeypatch, part_size=100, latency=0.005)
+
+    assert all(upload.status == "VALID" for upload in stub.uploads.values())
+    assert all(len(upload.parts) == upload.part_count > 20 for upload in stub.uploads.values())
+    state = json.loads((tmp_path / "concurrency.json").read_text())
+    assert list(state) == [stub.base_url.split("/")[2]]
+
+class TickClock:
+    """Fake clock that advances `step` seconds on every reading."""
+
+    def __init__(self, start=1_700_000_000.0, step=0.5):
+        self.now = start
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+def test_workflow_refreshes_expiring_urls(tmp_path, monkeypatch):
+    import igsupload.concurrency as concurrency
+    import igsupload.get_presigned_url as get_presigned_url
+    monkeypatch.setattr(concurrency, "parallel", 1)
+    # URLs gelten 10 s; jeder Part liest die Uhr zweimal (Client und Stub), also sind sie
+    # bei Part 9 von 12 kurz vor Ablauf, unabhängig davon, wie schnell der Upload wirklich ist
+    clock = TickClock()
+    monkeypatch.setattr(get_presigned_url, "clock", clock)
+    stub, _ = run_workflow(tmp_path, monkeypatch, part_size=200, url_expires=10, clock=clock)
+
+    assert all(upload.status == "VALID" for upload in stub.uploads.values())
+    assert stub.request_counts["upload_info"] == 4
+    assert stub.request_counts["put_part"] == 24
+
+def test_workflow_dedups_identical_files(tmp_path, monkeypatch):
+    import igsupload.dedup as dedup
+    import igsupload.run_store as run_store
+    run_store.set_run_store(tmp_path / "runs.sqlite")
+    try:
+        # R1 und R2 haben denselben Inhalt: nur einer wird hochgeladen
+        monkeypatch.setattr(dedup, "mode", "run")
+        stub, _ = run_workflow(tmp_path / "first", monkeypatch)
+        assert stub.request_counts["document_reference"] == 1
+        doc_id = next(iter(stub.uploads))
+        assert stub.notifications[0] and dedup.reused_files == 1
+
+        # der nächste Lauf verwendet die validierte DocumentReference aus dem Run-Store
+        monkeypatch.setattr(dedup, "mode", "store")
+        stub, _ = run_workflow(tmp_path / "second", monkeypatch)
+        assert stub.request_counts.get("document_reference", 0) == 0
+        assert len(stub.notifications) == 1
+        assert run_store.find_validated(*run_store.execute("SELECT sha256, size FROM uploads LIMIT 1")[0]) == doc_id
+    finally:
+        run_store.set_run_store(None)
+
+def test_workflow_skips_row_with_invalid_bundle(tmp_path, monkeypatch, capsys):
+    stub, _ = run_workflow(tmp_path, monkeypatch, fields={"STATUS": "done"})
+
+    # die Profilprüfung schlägt vor dem ersten Upload an
+    assert stub.uploads == {}
+    assert stub.notifications == []
+    assert "Composition/a1b2c3.status: invalid value 'done'" in capsys.readouterr().out
+
+def test_workflow_progress_counts_skipped_rows(tmp_path, monkeypatch, capsys):
+    import igsupload.progress as progress
+    monkeypatch.setattr(progress, "enabled", True)
+    run_workflow(tmp_path, monkeypatch, fields={"STATUS": "done"})
+
+    final = capsys.readouterr().err.rstrip("\n").split("\r")[-1]
+    assert final.startswith("files 2/2 | hashed 0.0 MB/0.0 MB")
+
+def test_workflow_sends_prebuilt_bundle_with_real_doc_ids(tmp_path, monkeypatch):
+    stub, _ = run_workflow(tmp_path, monkeypatch)
+
+    sequence = next(e["resource"] for e in stub.notifications[0]["entry"]
+                    if e["resource"]["resourceType"] == "MolecularSequence")
+    references = [e["valueReference"]["reference"] for e in sequence["extension"] if "valueReference" in e]
+    assert sorted(ref.rsplit("/", 1)[1] for ref in references) == sorted(stub.uploads)
+
+def test_workflow_retries_notification_with_same_bytes(tmp_path, monkeypatch):
+    import igsupload.igs_notification as igs_notification
+    monkeypatch.setattr(igs_notification, "RETRY_BACKOFF", 0.01)
+    stub, _ = run_workflow(tmp_path, monkeypatch, notification_failures=1)
+
+    assert len(stub.notifications) == 1
+    assert len(stub.notification_bodies) == 2
+    assert stub.notification_bodies[0] == stub.notification_bodies[1]
+
+def test_workflow_skips_rows_already_notified(tmp_path, monkeypatch):
+    from igsupload.workflow import start
+    import igsupload.igs_notification as igs_notification
+    import igsupload.run_store as run_store
+    monkeypatch.setattr(igs_notification, "deterministic_ids", True)
+    run_store.set_run_store(tmp_path / "runs.sqlite")
+    try:
+        stub, _ = run_workflow(tmp_path, monkeypatch)
+        assert len(stub.notifications) == 1
+
+        # dieselbe CSV mit unveränderten Dateien noch einmal: nichts wird hochgeladen oder gemeldet
+        with DemisStub() as stub:
+            monkeypatch.setattr(config, "BASE_URL", stub.base_url)
+            start(str(tmp_path / "csv" / "meta.csv"))
+        assert stub.uploads == {}
+        assert stub.notifications == []
+    finally:
+        run_store.set_run_store(None)
+
+def test_failed_notification_can_be_replayed(tmp_path, monkeypatch):
+    import igsupload.igs_notification as igs_notification
+    import igsupload.run_store as run_store
+    from igsupload import replay
+    monkeypatch.setattr(igs_notification, "RETRY_BACKOFF", 0.01)
+    run_store.set_run_store(tmp_path / "runs.sqlite")
+    try:
+        stub, _ = run_workflow(tmp_path, monkeypatch, notification_failures=igs_notification.NOTIFICATION_RETRIES + 1)
+        assert stub.notifications == []
+        failed = run_store.notifications_to_replay()
+        assert len(failed) == 1 and sorted(failed[0][3]) == sorted(stub.uploads)
+
+        with DemisStub() as stub:
+            monkeypatch.setattr(config, "BASE_URL", stub.base_url)
+            assert replay.replay(failed, rate=None)[0].ok
+        assert stub.notification_bodies == [failed[0][4]]
+        assert stub.request_counts.get("document_reference", 0) == 0
+    finally:
+        run_store.set_run_store(None)
+
+def test_status_after_workflow(tmp_path, monkeypatch):
+    import igsupload.run_store as run_store
+    from igsupload import status
+    run_store.set_run_store(tmp_path / "runs.sqlite")
+    try:
+        stub, _ = run_workflow(tmp_path, monkeypatch)
+        records = status.reconcile(offline=True)
+        assert sorted(r["doc_id"] for r in records) == sorted(stub.uploads)
+        assert all(r["validation_status"] == "VALID" and r["transaction_id"].startswith("IGS-") for r in records)
+        assert not any(status.is_problem(r) for r in records)
+    finally:
+        run_store.set_run_store(None)
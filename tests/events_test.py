@@ -0,0 +1,83 @@
+import json
+import pytest
+from unittest import mock
+
+from igsupload import events, timing
+from igsupload.upload_chunks import put_chunks
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(events, "quiet", False)
+    monkeypatch.setattr(timing, "spans_path", None)
+    monkeypatch.setattr(timing, "_stats", {})
+    yield
+    events.close()
+    events.event_log_path = None
+
+def read_events(path):
+    events.flush()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def make_response(status_code):
+    response = mock.Mock()
+    response.status_code = status_code
+    response.headers = {"ETag": '"etag"'}
+    return response
+
+def test_emit_without_log_is_noop():
+    events.emit("info", "put_part", bytes=1)
+
+def test_emit_writes_context(tmp_path):
+    path = tmp_path / "events.jsonl"
+    events.set_event_log(path)
+    with timing.context(sample="S1", file="S1_R1.fastq"):
+        timing.annotate(doc_id="doc-1")
+        events.emit("error", "validation", "Hash does not match", status="INVALID")
+    events.emit("info", "done")
+
+    first, second = read_events(path)
+    assert first["level"] == "error"
+    assert first["sample"] == "S1" and first["file"] == "S1_R1.fastq" and first["doc_id"] == "doc-1"
+    assert first["message"] == "Hash does not match"
+    assert "sample" not in second
+
+def test_spans_become_events(tmp_path):
+    path = tmp_path / "events.jsonl"
+    events.set_event_log(path)
+    with timing.context(sample="S1"):
+        with timing.span("create_hash", bytes=10):
+            pass
+    (event,) = read_events(path)
+    assert event["stage"] == "create_hash"
+    assert event["bytes"] == 10
+    assert event["duration"] >= 0
+    assert "cpu_seconds" not in event
+
+def test_event_log_appends(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.write_text('{"ts":1}\n')
+    events.set_event_log(path)
+    events.emit("info", "x")
+    assert len(read_events(path)) == 2
+
+def test_close_unsubscribes(tmp_path):
+    events.set_event_log(tmp_path / "events.jsonl")
+    events.close()
+    assert events._on_span not in timing.listeners
+
+def test_missing_directory(tmp_path):
+    with pytest.raises(NotADirectoryError):
+        events.set_event_log(tmp_path / "missing" / "events.jsonl")
+
+def test_quiet_put_chunks_prints_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(events, "quiet", True)
+    path = tmp_path / "reads.fastq"
+    path.write_bytes(b"A" * 30)
+    events.set_event_log(tmp_path / "events.jsonl")
+    with mock.patch("igsupload.upload_chunks.requests.put", return_value=make_response(200)):
+        with mock.patch("builtins.print") as mock_print:
+            result = put_chunks(str(path), 10, ["u1", "u2", "u3"], "up")
+    assert len(result["completedChunks"]) == 3
+    mock_print.assert_not_called()
+    parts = read_events(tmp_path / "events.jsonl")
+    assert [e["part"] for e in parts] == [1, 2, 3]
@@ -3,18 +3,59 @@ import csv
 
 from src.igsupload import extract_csv
 
-def test_read_csv(tmp_path):
-    data = "name;age\nAlice;30\nBob;25"
-    
+def write_csv(tmp_path, lines):
     test_file_path = tmp_path / "test_data" / "metadata"
     test_file_path.mkdir(parents=True)
 
     file_path = test_file_path / "test_data.csv"
-    file_path.write_text(data, encoding="utf-8")
+    file_path.write_text("\n".join(lines), encoding="utf-8")
+    return file_path
+
+def test_read_csv(tmp_path):
+    header_line = ";".join(extract_csv.header)
+    values = [f"v{i}" for i in range(len(extract_csv.header))]
+    values[4] = "  not_id  "
+    file_path = write_csv(tmp_path, [header_line, ";".join(values), ""])
+
+    result = extract_csv.read_csv(str(file_path))
+
+    assert len(result) == 1
+    assert isinstance(result[0], extract_csv.CsvRow)
+    assert result[0].MELDETATBESTAND == "v0"
+    assert result[0].DEMIS_NOTIFICATION_ID == "not_id"
+    assert result[0].PRIME_DIAGNOSTIC_LAB_DEMIS_LAB_ID == "v24"
+    assert result[0].FILE_2_SHA256SUM == f"v{len(extract_csv.header) - 1}"
+
+def test_read_csv_missing_columns_and_short_rows(tmp_path):
+    file_path = write_csv(tmp_path, [
+        "FILE_1_NAME;DEMIS_NOTIFICATION_ID;UNKNOWN",
+        "a.fastq;id1;x",
+        "b.fastq",
+    ])
 
     result = extract_csv.read_csv(str(file_path))
 
-    assert result == [
-        {'name': 'Alice', 'age': '30'},
-        {'name': 'Bob', 'age': '25'}
-    ]
+    assert [r.FILE_1_NAME for r in result] == ["a.fastq", "b.fastq"]
+    assert [r.DEMIS_NOTIFICATION_ID for r in result] == ["id1", ""]
+    assert result[0].SPECIES == ""
+
+def test_iter_csv_is_lazy(tmp_path):
+    header_line = ";".join(extract_csv.header)
+    row = ";".join(["x"] * len(extract_csv.header))
+    file_path = write_csv(tmp_path, [header_line, row, row])
+
+    rows = extract_csv.iter_csv(str(file_path))
+
+    assert not isinstance(rows, list)
+    assert next(rows).FILE_1_NAME == "x"
+    assert len(list(rows)) == 1
+
+def test_iter_csv_empty_file(tmp_path):
+    file_path = write_csv(tmp_path, [])
+
+    assert list(extract_csv.iter_csv(str(file_path))) == []
+
+def test_csv_row_uses_slots():
+    row = extract_csv.CsvRow(*[""] * len(extract_csv.header))
+
+    assert not hasattr(row, "__dict__")
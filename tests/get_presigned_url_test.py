@@ -79,3 +79,42 @@ def test_get_presigned_url_request_exception(mock_requests_get):
     assert any("Network-/Connectionerror" in call for call in print_calls)
     assert any("Netzwerkfehler" in call for call in print_calls)
     assert result is None
+
+def presigned(part, issued, expires=3600):
+    return f"https://s3.example/bucket/{part}?X-Amz-Date={issued:%Y%m%dT%H%M%SZ}&X-Amz-Expires={expires}&X-Amz-Signature=abc"
+
+def test_url_expiry():
+    from datetime import datetime, timezone
+    issued = datetime(2024, 6, 3, 12, 0, 0, tzinfo=timezone.utc)
+    assert get_presigned_url.url_expiry(presigned(1, issued, 600)) == issued.timestamp() + 600
+    assert get_presigned_url.url_expiry("https://upload1") is None
+
+def test_presigned_urls_refresh_before_expiry():
+    from datetime import datetime, timedelta, timezone
+    now = datetime.now(timezone.utc)
+    old = [presigned(1, now - timedelta(seconds=3590)), presigned(2, now - timedelta(seconds=3590))]
+    fresh = [presigned(1, now), presigned(2, now)]
+    refresh = mock.Mock(return_value=("up", fresh, 100))
+    urls = get_presigned_url.PresignedUrls(old, "up", refresh=refresh)
+
+    with mock.patch("builtins.print"):
+        assert urls.get(1) == fresh[0]
+        # Part 2 bekommt die schon erneuerten URLs, kein zweiter Abruf
+        assert urls.get(2) == fresh[1]
+        assert urls.renew(old[1]) is True
+    assert refresh.call_count == 1
+
+def test_presigned_urls_not_refreshed_while_valid():
+    from datetime import datetime, timezone
+    urls = get_presigned_url.PresignedUrls([presigned(1, datetime.now(timezone.utc))], "up", refresh=mock.Mock())
+    assert urls.get(1) == urls[0]
+    urls._refresh.assert_not_called()
+
+def test_presigned_urls_renew_failures():
+    with mock.patch("builtins.print") as mock_print:
+        assert get_presigned_url.PresignedUrls(["https://u1"], "up").renew("https://u1") is False
+        urls = get_presigned_url.PresignedUrls(["https://u1"], "up", refresh=lambda: ("other", ["https://u2"], 1))
+        assert urls.renew("https://u1") is False
+        assert urls[0] == "https://u1"
+        print_calls = get_print_calls(mock_print)
+    assert any("new upload" in call for call in print_calls)
@@ -0,0 +1,86 @@
+import gzip
+import struct
+import pytest
+
+from igsupload import gzip_check
+from igsupload.gzip_check import GzipVerifier
+
+DATA = b"@r1\nACGT\n+\nFFFF\n" * 5000
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(gzip_check, "enabled", True)
+    gzip_check.reset()
+
+class Sink:
+    def __init__(self):
+        self.data = b""
+
+    def update(self, data):
+        self.data += data
+
+def verify(data, chunk=8192, sink=None):
+    verifier = GzipVerifier(sink=sink)
+    for i in range(0, len(data), chunk):
+        verifier.update(data[i:i + chunk])
+    return verifier.finish()
+
+@pytest.mark.parametrize("chunk", [1, 8192, 1 << 20])
+def test_valid_gzip(chunk, monkeypatch):
+    monkeypatch.setattr(gzip_check, "BATCH_SIZE", 4096)
+    data = gzip.compress(DATA)
+    sink = Sink()
+    result = verify(data, chunk, sink)
+    assert result.ok
+    assert result.members == 1
+    assert result.compressed_size == len(data)
+    assert result.uncompressed_size == len(DATA)
+    assert sink.data == DATA
+
+def test_multi_member_and_zero_padding():
+    data = gzip.compress(DATA) + gzip.compress(DATA) + b"\x00" * 512
+    result = verify(data)
+    assert result.ok and result.members == 2
+    assert result.uncompressed_size == 2 * len(DATA)
+
+def test_truncated():
+    data = gzip.compress(DATA)
+    assert verify(data[:len(data) // 2]).error == "truncated gzip stream"
+    # nur der Trailer fehlt
+    assert verify(data[:-8]).error == "truncated gzip stream"
+
+def test_crc_mismatch():
+    data = gzip.compress(DATA)
+    crc, size = struct.unpack("<II", data[-8:])
+    assert verify(data[:-8] + struct.pack("<II", crc ^ 1, size)).error == "CRC32 mismatch"
+
+def test_isize_mismatch():
+    data = gzip.compress(DATA)
+    crc, size = struct.unpack("<II", data[-8:])
+    assert verify(data[:-8] + struct.pack("<II", crc, size + 1)).error == "ISIZE mismatch"
+
+def test_not_gzip_and_trailing_garbage():
+    assert verify(DATA).error == "not a gzip file"
+    assert verify(b"").error == "truncated gzip stream"
+    assert verify(gzip.compress(DATA) + b"garbage").error == "trailing garbage after gzip data"
+
+def test_finish_is_idempotent():
+    verifier = GzipVerifier()
+    verifier.update(gzip.compress(DATA))
+    assert verifier.finish() is verifier.finish()
+
+def test_sink_error_does_not_block(monkeypatch):
+    monkeypatch.setattr(gzip_check, "BATCH_SIZE", 1024)
+    class Broken:
+        def update(self, data):
+            raise RuntimeError("boom")
+    data = gzip.compress(DATA * 4)
+    assert verify(data, chunk=1024, sink=Broken()).error == "gzip check failed: boom"
+
+def test_print_summary(capsys):
+    gzip_check.record("S1_R1.fastq.gz", gzip_check.GzipResult(members=1, compressed_size=10, uncompressed_size=20))
+    gzip_check.record("S1_R2.fastq.gz", gzip_check.GzipResult(error="CRC32 mismatch"))
+    gzip_check.print_summary()
+    out = capsys.readouterr().out
+    assert "S1_R1.fastq.gz" in out and "OK" in out
+    assert "CRC32 mismatch" in out
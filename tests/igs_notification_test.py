@@ -1,16 +1,78 @@
+import json
 import pytest
 import uuid
 from datetime import datetime, timezone
+from pathlib import Path
 from unittest import mock
 import igsupload.config as config
+from igsupload.extract_csv import CsvRow, header, read_csv
 
-from src.igsupload.igs_notification import build_notification_bundle, send_notification
+from src.igsupload.igs_notification import (
+    build_notification_bundle, send_notification, prebuild_notification_bundle, fill_notification_bundle, prebuilt,
+)
 
 BASE_URL = 'https://demis.rki.de/fhir/igs'
 TEST_FILE = "test.fasta"
 NOTIFICATION_ID = "not_id"
 DOCUMENT_REFERENCE_ID = "doc_id"
 LABORATORY_ID = "lab_id"
+GOLDEN_DIR = Path(__file__).parent / "golden"
+SAMPLE_CSV = Path(__file__).parent.parent / "data" / "metadata" / "IGS_metadata_v7.csv"
+
+# Golden files were generated with the original dict+prune implementation
+GOLDEN_CASES = {
+    "full_row": {},
+    "minimal_row": "MINIMAL",
+    "empty_notification_id": {"DEMIS_NOTIFICATION_ID": ""},
+    "whitespace_and_case": {
+        "HOST_SEX": " Female ", "REPOSITORY_NAME": " ENA ", "UPLOAD_STATUS": "385645004",
+        "SEQUENCING_REASON": "Clinical", "SEQUENCING_LAB_EMAIL": " lab@seq.de ",
+        "ADAPTER": " AAAA ", "PRIMER_SCHEME": "", "STATUS": "",
+    },
+    "no_submitting_lab": {
+        "PRIME_DIAGNOSTIC_LAB_DEMIS_LAB_ID": "", "PRIME_DIAGNOSTIC_LAB_NAME": "",
+        "PRIME_DIAGNOSTIC_LAB_ADDRESS": "", "PRIME_DIAGNOSTIC_LAB_POSTAL_CODE": "",
+        "PRIME_DIAGNOSTIC_LAB_CITY": "", "PRIME_DIAGNOSTIC_LAB_EMAIL": "",
+        "PRIME_DIAGNOSTIC_LAB_FEDERAL_STATE": "",
+    },
+    "submitting_lab_without_profile": {
+        "PRIME_DIAGNOSTIC_LAB_EMAIL": "not-an-email", "PRIME_DIAGNOSTIC_LAB_ADDRESS": "",
+        "PRIME_DIAGNOSTIC_LAB_CITY": "", "PRIME_DIAGNOSTIC_LAB_FEDERAL_STATE": "",
+    },
+    "invalid_values_dropped": {
+        "DATE_OF_SAMPLING": "31.02.2022", "DATE_OF_RECEIVING": "2022/01/01", "DATE_OF_SEQUENCING": "2022-05",
+        "UPLOAD_DATE": "", "HOST_SEX": "m", "HOST_BIRTH_MONTH": "13", "REPOSITORY_NAME": "dropbox",
+        "UPLOAD_STATUS": "", "REPOSITORY_LINK": "", "REPOSITORY_ID": "", "SEQUENCING_REASON": "because",
+        "SEQUENCING_LAB_EMAIL": "broken", "SEQUENCING_LAB_NAME": "", "SEQUENCING_LAB_DEMIS_LAB_ID": "",
+        "AUTHOR": "", "LAB_SEQUENCE_ID": "", "ISOLATE": "", "SPECIES": "",
+    },
+    "numeric_codes_and_repository_link": {
+        "SEQUENCING_REASON": "123456789", "UPLOAD_STATUS": "", "REPOSITORY_ID": "",
+        "ADAPTER": "+TTTT", "SEQUENCING_PLATFORM": "", "SEQUENCING_INSTRUMENT": "",
+        "SEQUENCING_STRATEGY": "", "NAME_AMP_PROTOCOL": "", "ISOLATION_SOURCE_CODE": "",
+    },
+}
+
+def make_row(overrides=None):
+    if overrides == "MINIMAL":
+        values = {f.replace('.', '_'): "" for f in header}
+        values["DEMIS_NOTIFICATION_ID"] = "minimal-id"
+        return CsvRow(**values)
+    base = read_csv(str(SAMPLE_CSV))[0]
+    values = {f.replace('.', '_'): getattr(base, f.replace('.', '_')) for f in header}
+    values.update(overrides or {})
+    return CsvRow(**values)
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+def build_deterministic(row, doc_ids):
+    counter = iter(range(1, 100))
+    with mock.patch('src.igsupload.igs_notification.uuid.uuid4', side_effect=lambda: uuid.UUID(int=next(counter))), \
+         mock.patch('src.igsupload.igs_notification.datetime', FixedDatetime):
+        return build_notification_bundle(row, doc_ids)
 
 @pytest.fixture
 def mock_send_notification():
@@ -28,7 +90,7 @@ def test_send_notification_success(mock_send_notification):
     }
     mock_send_notification.return_value = mock_response
 
-    result = send_notification(TEST_FILE, DOCUMENT_REFERENCE_ID, "LAB123")
+    result = send_notification(make_row(), ["doc_1", "doc_2"])
     
     assert result["transactionID"] == "123"
     assert result["submitterGeneratedNotificationID"] == "234"
@@ -52,295 +114,109 @@ def test_send_notification_value_error(mock_send_notification):
         module.token_module.current_token = "dummy"
 
         with pytest.raises(Exception, match="HTTP error!"):
-            send_notification("test.fasta", "doc_id", "lab_id")
+            send_notification(make_row(), ["doc_1", "doc_2"])
 
-def test_build_notification_bundle():
-    # Reihenfolge der UUID-Generierung exakt wie im Code!
-    fake_uuids = [
-        "00000000-0000-0000-0000-000000000001",  # patient_id
-        "00000000-0000-0000-0000-000000000002",  # organization_id
-        "00000000-0000-0000-0000-000000000003",  # practitioner_role_id
-        "00000000-0000-0000-0000-000000000004",  # adapter1_id
-        "00000000-0000-0000-0000-000000000005",  # adapter2_id
-        "00000000-0000-0000-0000-000000000006",  # primer_id
-        "00000000-0000-0000-0000-000000000007",  # device_id
-        "00000000-0000-0000-0000-000000000008",  # specimen_id
-        "00000000-0000-0000-0000-000000000009",  # observation_id
-        "00000000-0000-0000-0000-000000000010",  # diagnostic_report_id
-        "00000000-0000-0000-0000-000000000011",  # sequence_id
-    ]
-    uuid_iter = iter(fake_uuids)
-    fixed_now = datetime(2020, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
-    fixed_now_iso = fixed_now.isoformat()
+@pytest.mark.parametrize("case", sorted(GOLDEN_CASES))
+def test_build_notification_bundle_matches_golden(monkeypatch, case):
+    monkeypatch.setattr(config, "BASE_URL", "https://test.example/surveillance/notification-sequence")
+    bundle = build_deterministic(make_row(GOLDEN_CASES[case]), ["doc-1", "doc-2"])
 
-    with mock.patch('src.igsupload.igs_notification.uuid.uuid4', side_effect=lambda: next(uuid_iter)):
-        with mock.patch('src.igsupload.igs_notification.datetime') as mock_datetime:
-            mock_datetime.now.return_value = fixed_now
-            mock_datetime.now.timezone = timezone
-            mock_datetime.side_effect = lambda *a, **kw: datetime(*a, **kw)
-            
-            # Bundle bauen
-            bundle = build_notification_bundle(
-                file_name=TEST_FILE,
-                notification_id=NOTIFICATION_ID,
-                doc_id=DOCUMENT_REFERENCE_ID,
-                lab_id=LABORATORY_ID
-            )
+    golden = json.loads((GOLDEN_DIR / f"notification_bundle_{case}.json").read_text(encoding="utf-8"))
+    # byte-genau wie requests(json=...) serialisiert
+    assert json.dumps(bundle) == json.dumps(golden)
 
-    expected_entries = [
-        {
-            'fullUrl': f'{BASE_URL}/Composition/{NOTIFICATION_ID}',
-            'resource': {
-                'resourceType': 'Composition',
-                'id': NOTIFICATION_ID,
-                'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/NotificationSequence']},
-                'identifier': {'system': 'https://demis.rki.de/fhir/NamingSystem/NotificationId', 'value': NOTIFICATION_ID},
-                'status': 'final',
-                'type': {'coding': [{'system': 'http://loinc.org', 'code': '34782-3', 'display': 'Infectious disease Note'}]},
-                'category': [{'coding': [{'system': 'http://loinc.org', 'code': '11502-2', 'display': 'Laboratory report'}]}],
-                'subject': {'reference': f'Patient/{fake_uuids[0]}'},
-                'author': [{'reference': f'PractitionerRole/{fake_uuids[2]}'}],
-                'relatesTo': [{
-                    'code': 'appends',
-                    'targetReference': {
-                        'type': 'Composition',
-                        'identifier': {'system': 'https://demis.rki.de/fhir/NamingSystem/NotificationId', 'value': NOTIFICATION_ID}
-                    }
-                }],
-                'date': fixed_now_iso,
-                'title': 'Sequenzmeldung',
-                'section': [{
-                    'code': {'coding': [{'system': 'http://loinc.org', 'code': '11502-2', 'display': 'Laboratory report'}]},
-                    'entry': [{'reference': f'DiagnosticReport/{fake_uuids[9]}'}]
-                }]
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/Patient/{fake_uuids[0]}',
-            'resource': {
-                'resourceType': 'Patient',
-                'id': fake_uuids[0],
-                'meta': {'profile': ['https://demis.rki.de/fhir/StructureDefinition/NotifiedPersonNotByName']}
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/PractitionerRole/{fake_uuids[2]}',
-            'resource': {
-                'resourceType': 'PractitionerRole',
-                'id': fake_uuids[2],
-                'meta': {'profile': ['https://demis.rki.de/fhir/StructureDefinition/NotifierRole']},
-                'organization': {'reference': f'Organization/{fake_uuids[1]}'}
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/Organization/{fake_uuids[1]}',
-            'resource': {
-                'resourceType': 'Organization',
-                'id': fake_uuids[1],
-                'meta': {'profile': ['https://demis.rki.de/fhir/StructureDefinition/NotifierFacility']},
-                'identifier': [{
-                    'system': 'https://demis.rki.de/fhir/NamingSystem/DemisLaboratoryId',
-                    'value': LABORATORY_ID
-                }],
-                "type": [
-                    {
-                        "coding": [
-                            {
-                                "system": "https://demis.rki.de/fhir/CodeSystem/organizationType",
-                                "code": "refLab",
-                                "display": "Einrichtung der Spezialdiagnostik"
-                            }
-                        ]
-                    }
-                ],
-                'name': 'Beispiel-Labor',
-                "telecom": [
-                    {
-                        "system": "email",
-                        "value": "NRZ-Influenza@rki.de",
-                        "use": "work"
-                    }
-                ],
-                'address': [{
-                    'line': ['Seestr. 10'],
-                    'city': 'Berlin',
-                    'postalCode': '13353',
-                    'country': 'DE'
-                }]
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/Specimen/{fake_uuids[7]}',
-            'resource': {
-                'resourceType': 'Specimen',
-                'id': fake_uuids[7],
-                'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/SpecimenSequence']},
-                'status': 'available',
-                'type': {
-                    'coding': [{
-                        'system': 'http://snomed.info/sct',
-                        'code': '258604001',
-                        'display': 'Upper respiratory specimen (specimen)'
-                    }]
-                },
-                'subject': {'reference': f'Patient/{fake_uuids[0]}'},
-                'receivedTime': fixed_now_iso,
-                'collection': {
-                    'collector': {'reference': f'PractitionerRole/{fake_uuids[2]}'},
-                    'collectedDateTime': fixed_now_iso
-                },
-                'processing': [{
-                    'description': 'nCoV-2019 sequencing protocol',
-                    'procedure': {
-                        'coding': [{
-                            'system': 'https://demis.rki.de/fhir/igs/CodeSystem/sequencingStrategy',
-                            'code': 'amplicon'
-                        }]
-                    },
-                    'additive': [
-                        {'reference': f'Substance/{fake_uuids[3]}'},
-                        {'reference': f'Substance/{fake_uuids[4]}'},
-                        {'reference': f'Substance/{fake_uuids[5]}'}
-                    ],
-                    'timeDateTime': fixed_now_iso
-                }]
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/Device/{fake_uuids[6]}',
-            'resource': {
-                'resourceType': 'Device',
-                'id': fake_uuids[6],
-                'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/SequencingDevice']},
-                'deviceName': [{'name': 'Illumina_MiSeq', 'type': 'model-name'}],
-                'type': {
-                    'coding': [{
-                        'system': 'https://demis.rki.de/fhir/igs/CodeSystem/sequencingPlatform',
-                        'code': 'illumina',
-                        'display': 'Illumina'
-                    }]
-                }
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/Substance/{fake_uuids[3]}',
-            'resource': {
-                'resourceType': 'Substance',
-                'id': fake_uuids[3],
-                'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/AdapterSubstance']},
-                'code': {'coding': [{
-                    'system': 'https://demis.rki.de/fhir/igs/CodeSystem/sequencingSubstances',
-                    'code': 'adapter', 'display': 'Adapter Sequence'
-                }]},
-                'description': 'AGATCGGAAGAG'
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/Substance/{fake_uuids[4]}',
-            'resource': {
-                'resourceType': 'Substance',
-                'id': fake_uuids[4],
-                'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/AdapterSubstance']},
-                'code': {'coding': [{
-                    'system': 'https://demis.rki.de/fhir/igs/CodeSystem/sequencingSubstances',
-                    'code': 'adapter', 'display': 'Adapter Sequence'
-                }]},
-                'description': 'CTCTTCCGATCT'
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/Substance/{fake_uuids[5]}',
-            'resource': {
-                'resourceType': 'Substance',
-                'id': fake_uuids[5],
-                'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/PrimerSubstance']},
-                'code': {'coding': [{
-                    'system': 'https://demis.rki.de/fhir/igs/CodeSystem/sequencingSubstances',
-                    'code': 'primer', 'display': 'Primer Sequence'
-                }]},
-                'description': 'ARTICv4.1 ...'
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/MolecularSequence/{fake_uuids[10]}',
-            'resource': {
-                'resourceType': 'MolecularSequence',
-                'id': fake_uuids[10],
-                'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/Sequence']},
-                'coordinateSystem': 1,
-                'specimen': {'reference': f'Specimen/{fake_uuids[7]}'},
-                'device': {'reference': f'Device/{fake_uuids[6]}'},
-                'extension': [
-                    {
-                        "url": "https://demis.rki.de/fhir/igs/StructureDefinition/SequenceDocumentReference",
-                        "valueReference": {
-                            "reference": f"{config.BASE_URL}/fhir/DocumentReference/{DOCUMENT_REFERENCE_ID}",
-                            "type": "DocumentReference"
-                        }
-                    }
-                ],
-                "identifier": [{"value": "A384"}],
-                "performer": {"reference": f"Organization/{fake_uuids[1]}"}
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/Observation/{fake_uuids[8]}',
-            'resource': {
-                'resourceType': 'Observation',
-                'id': fake_uuids[8],
-                'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/PathogenDetectionSequence']},
-                'status': 'final',
-                'category': [{'coding': [{'system': 'http://terminology.hl7.org/CodeSystem/observation-category', 'code': 'laboratory'}]}],
-                'code': {'coding': [{'system': 'http://loinc.org', 'code': '96741-4', 'display': 'SARS-CoV-2 (COVID-19) variant Sequencing Nom (Specimen)'}]},
-                'subject': {'reference': f'Patient/{fake_uuids[0]}'},
-                'valueString': 'BA.2',
-                'interpretation': [{'coding': [{'system': 'http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation', 'code': 'POS'}]}],
-                'method': {'coding': [{'system': 'http://snomed.info/sct', 'code': '117040002', 'display': 'Nucleic acid sequencing (procedure)'}]},
-                'specimen': {'reference': f'Specimen/{fake_uuids[7]}'},
-                'device': {'reference': f'Device/{fake_uuids[6]}'},
-                'derivedFrom': [{'reference': f'MolecularSequence/{fake_uuids[10]}'}]
-            }
-        },
-        {
-            'fullUrl': f'{BASE_URL}/DiagnosticReport/{fake_uuids[9]}',
-            'resource': {
-                'resourceType': 'DiagnosticReport',
-                'id': fake_uuids[9],
-                'meta': {'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/LaboratoryReportSequence']},
-                'status': 'final',
-                'code': {'coding': [{
-                    'system': 'https://demis.rki.de/fhir/CodeSystem/notificationCategory',
-                    'code': 'cvdp',
-                    'display': 'Severe-Acute-Respiratory-Syndrome-Coronavirus-2 (SARS-CoV-2)'
-                }]},
-                'subject': {'reference': f'Patient/{fake_uuids[0]}'},
-                'issued': fixed_now_iso,
-                'result': [{'reference': f'Observation/{fake_uuids[8]}'}],
-                'conclusion': 'NACHWEIS eines meldepflichtigen Erregers',
-                'conclusionCode': [{
-                    'coding': [{
-                        'system': 'https://demis.rki.de/fhir/CodeSystem/conclusionCode',
-                        'code': 'pathogenDetected',
-                        'display': 'Meldepflichtiger Erreger nachgewiesen'
-                    }]
-                }]
-            }
-        },
-    ]
+def test_build_notification_bundle_has_no_empty_values(monkeypatch):
+    def walk(obj):
+        if isinstance(obj, dict):
+            for v in obj.values():
+                assert v not in (None, "", [], {})
+                walk(v)
+        elif isinstance(obj, list):
+            for v in obj:
+                assert v not in (None, "", [], {})
+                walk(v)
 
-    expected_result = {
-        'resourceType': 'Bundle',
-        'meta': {
-            'lastUpdated': fixed_now_iso,
-            'profile': ['https://demis.rki.de/fhir/igs/StructureDefinition/NotificationBundleSequence']
-        },
-        'identifier': {
-            'system': 'https://demis.rki.de/fhir/NamingSystem/NotificationBundleId',
-            'value': NOTIFICATION_ID
-        },
-        'type': 'document',
-        'timestamp': fixed_now_iso,
-        'entry': expected_entries
-    }
+    for overrides in GOLDEN_CASES.values():
+        walk(build_notification_bundle(make_row(overrides), ["doc-1", "doc-2"]))
+
+def test_build_notification_bundle_requires_two_doc_ids():
+    with pytest.raises(IndexError):
+        build_notification_bundle(make_row(), ["doc-1"])
+
+def test_build_notification_bundle_requires_base_url(monkeypatch):
+    monkeypatch.setattr(config, "BASE_URL", None)
+    with pytest.raises(RuntimeError, match="BASE_URL is not set"):
+        build_notification_bundle(make_row(), ["doc-1", "doc-2"])
+
+def test_bundles_do_not_share_row_specific_objects():
+    first = build_notification_bundle(make_row(), ["doc-1", "doc-2"])
+    second = build_notification_bundle(make_row({"SPECIES": "other"}), ["doc-3", "doc-4"])
+    assert first["entry"][-3]["resource"]["extension"] is not second["entry"][-3]["resource"]["extension"]
+    assert first["entry"][-3]["resource"]["extension"][-1]["valueReference"]["reference"].endswith("/doc-2")
+
+@pytest.mark.parametrize("case", ["full_row", "minimal_row"])
+def test_prebuilt_bundle_matches_golden_after_fill(monkeypatch, case):
+    monkeypatch.setattr(config, "BASE_URL", "https://test.example/surveillance/notification-sequence")
+    counter = iter(range(1, 100))
+    with mock.patch('src.igsupload.igs_notification.uuid.uuid4', side_effect=lambda: uuid.UUID(int=next(counter))), \
+         mock.patch('src.igsupload.igs_notification.datetime', FixedDatetime):
+        bundle = prebuild_notification_bundle(make_row(GOLDEN_CASES[case]))
+        assert "pending-file-1" in json.dumps(bundle)
+        bundle = fill_notification_bundle(bundle, ["doc-1", "doc-2"])
+
+    golden = json.loads((GOLDEN_DIR / f"notification_bundle_{case}.json").read_text(encoding="utf-8"))
+    assert json.dumps(bundle) == json.dumps(golden)
+
+def test_send_notification_uses_prebuilt_bundle(mock_send_notification):
+    mock_send_notification.return_value = mock.Mock(status_code=200, json=lambda: {})
+    bundle = prebuild_notification_bundle(make_row())
+
+    with mock.patch('src.igsupload.igs_notification.build_notification_bundle') as build, prebuilt(bundle):
+        send_notification(make_row(), ["doc_1", "doc_2"])
+    build.assert_not_called()
+    sent = mock_send_notification.call_args.kwargs.get("data") or mock_send_notification.call_args.kwargs.get("json")
+    assert b"/DocumentReference/doc_2" in (sent if isinstance(sent, bytes) else json.dumps(sent).encode())
+
+def test_deterministic_ids(monkeypatch):
+    import src.igsupload.igs_notification as module
+    monkeypatch.setattr(module, "deterministic_ids", True)
+    ids = lambda bundle: [e["resource"].get("id") for e in bundle["entry"]]
+
+    first = build_notification_bundle(make_row(), ["doc-1", "doc-2"])
+    second = build_notification_bundle(make_row(), ["doc-1", "doc-2"])
+    other = build_notification_bundle(make_row({"DEMIS_NOTIFICATION_ID": "other-id"}), ["doc-1", "doc-2"])
+    assert ids(first) == ids(second)
+    assert ids(first)[1:] != ids(other)[1:]
+    assert uuid.UUID(first["entry"][1]["resource"]["id"]).version == 5
+    # ohne Meldungs-ID gibt es nichts, woraus man ableiten könnte
+    empty = lambda: ids(build_notification_bundle(make_row({"DEMIS_NOTIFICATION_ID": ""}), ["doc-1", "doc-2"]))
+    assert empty() != empty()
+
+def test_send_notification_retries_with_same_bytes(monkeypatch, mock_send_notification):
+    import requests
+    import src.igsupload.igs_notification as module
+    monkeypatch.setattr(module, "RETRY_BACKOFF", 0)
+    ok = mock.Mock(status_code=200, json=lambda: {"parameter": []})
+    mock_send_notification.side_effect = [requests.ConnectionError("reset"), mock.Mock(status_code=503), ok]
+
+    send_notification(make_row(), ["doc_1", "doc_2"])
+    bodies = [c.kwargs["data"] for c in mock_send_notification.call_args_list]
+    assert len(bodies) == 3 and bodies[0] == bodies[1] == bodies[2]
+
+def test_send_notification_gives_up_after_retries(monkeypatch, mock_send_notification):
+    import src.igsupload.igs_notification as module
+    monkeypatch.setattr(module, "RETRY_BACKOFF", 0)
+    failed = mock.Mock(status_code=502, text="bad gateway")
+    failed.json.side_effect = ValueError
+    failed.raise_for_status.side_effect = Exception("HTTP 502")
+    mock_send_notification.return_value = failed
+
+    with pytest.raises(Exception, match="HTTP 502"):
+        send_notification(make_row(), ["doc_1", "doc_2"])
+    assert mock_send_notification.call_count == module.NOTIFICATION_RETRIES + 1
 
-    assert bundle == expected_result
\ No newline at end of file
+def test_row_key():
+    from src.igsupload.igs_notification import row_key
+    assert row_key(make_row(), [("a.fastq", 10, 1.0)]) == row_key(make_row(), [("a.fastq", 10, 1.0)])
+    assert row_key(make_row(), [("a.fastq", 10, 1.0)]) != row_key(make_row(), [("a.fastq", 10, 2.0)])
+    assert row_key(make_row(), []) != row_key(make_row({"SPECIES": "other"}), [])
@@ -118,3 +118,9 @@ def test_log_to_csv_default_path(tmp_path):
     assert rows[0]["filename"] == "no_path.fq"
     assert rows[0]["status"] == "OK"
 
+
+def test_resolve_path_expands_variables_and_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("IGS_TEST_DIR", str(tmp_path))
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert igsupload_logger.resolve_path("$IGS_TEST_DIR/a/../b.txt") == tmp_path.resolve() / "b.txt"
+    assert igsupload_logger.resolve_path("~/c") == tmp_path.resolve() / "c"
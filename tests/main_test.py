@@ -70,3 +70,82 @@ def test_root_with_valid_path_and_config(monkeypatch, tmp_path):
     assert "load CSV-file" in result.output
     assert called.get("was_called") is True
     assert called.get("path") == str(csv_file.resolve())
+
+
+def test_root_with_nonexistent_csv_path_keeps_run_store(tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text("BASE_URL=https://example.org\n")
+
+    result = runner.invoke(app, ["--csv", str(tmp_path / "typo.csv"), "--config", str(env_file), "--log", str(tmp_path)])
+    assert result.exit_code == 2
+    assert "not found" in result.output
+    assert not (tmp_path / "logging" / "igsupload_runs.sqlite").exists()
+
+
+def test_root_with_run_store_none(monkeypatch, tmp_path):
+    import igsupload.run_store as run_store
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("colA\nval\n")
+    env_file = tmp_path / ".env"
+    env_file.write_text("BASE_URL=https://example.org\n")
+
+    called = {}
+
+    def fake_start(p):
+        called["store"] = run_store.enabled()
+
+    monkeypatch.setattr("src.igsupload.main.start", fake_start)
+
+    args = ["--csv", str(csv_file), "--config", str(env_file), "--log", str(tmp_path), "--run-store", "none"]
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0
+    assert called == {"store": False}
+    assert not (tmp_path / "logging" / "igsupload_runs.sqlite").exists()
+
+    result = runner.invoke(app, args + ["--dedup", "store"])
+    assert result.exit_code == 2
+    assert "--dedup store needs the run store" in result.output
+
+
+def test_replay_notifications_dry_run(tmp_path, monkeypatch):
+    import igsupload.run_store as run_store
+    monkeypatch.setenv("BASE_URL", "http://test")  # load_env ändert os.environ sonst dauerhaft
+    env = tmp_path / ".env"
+    env.write_text("BASE_URL=http://test\n")
+    run_store.set_run_store(tmp_path / "logging" / "igsupload_runs.sqlite")
+    stored = run_store.save_notification("S1", "n-1", None, ["doc-1", "doc-2"], b"{}")
+    run_store.update_notification(stored, "failed", error="HTTP 503")
+    run_store.set_run_store(None)
+
+    result = runner.invoke(app, ["replay-notifications", "--config", str(env), "--log", str(tmp_path), "--dry-run"])
+    run_store.set_run_store(None)
+    assert result.exit_code == 0
+    assert "S1: notification n-1, DocumentReferences doc-1, doc-2" in result.output
+
+
+def test_replay_notifications_without_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("BASE_URL", "http://test")
+    env = tmp_path / ".env"
+    env.write_text("BASE_URL=http://test\n")
+    result = runner.invoke(app, ["replay-notifications", "--config", str(env), "--log", str(tmp_path)])
+    assert result.exit_code == 2
+    assert "run store" in result.output
+
+
+def test_status_offline_json(tmp_path):
+    import json
+    import igsupload.run_store as run_store
+    run_store.set_run_store(tmp_path / "logging" / "igsupload_runs.sqlite")
+    run_store.record_upload("S1", "S1_R1.fastq", "a", 1, "doc-1", "VALID")
+    run_store.record_upload("S2", "S2_R1.fastq", "b", 1, "doc-2", "TIMEOUT")
+    stored = run_store.save_notification("S1", "n-1", None, ["doc-1"], b"{}")
+    run_store.update_notification(stored, "sent", transaction_id="IGS-1")
+    run_store.set_run_store(None)
+
+    result = runner.invoke(app, ["status", "--log", str(tmp_path), "--offline", "--problems", "--format", "json",
+                                 "--output", str(tmp_path / "status.json")])
+    run_store.set_run_store(None)
+    assert result.exit_code == 0
+    records = json.loads((tmp_path / "status.json").read_text())
+    assert [r["doc_id"] for r in records] == ["doc-2"]
+    assert records[0]["validation_status"] == "TIMEOUT (pending)"
@@ -0,0 +1,87 @@
+import os
+import pytest
+from unittest import mock
+
+from igsupload import metrics
+from igsupload.sha256_hash import create_hash
+from igsupload.upload_chunks import put_chunks
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(metrics, "textfile_path", None)
+    monkeypatch.setattr(metrics, "_last_write", 0.0)
+    yield
+    metrics.reset()
+
+def make_response(status_code, etag="abc"):
+    response = mock.Mock()
+    response.status_code = status_code
+    response.headers = {"ETag": f'"{etag}"'}
+    return response
+
+def test_counter_and_labels():
+    metrics.notifications.inc(result="ok")
+    metrics.notifications.inc(result="ok")
+    metrics.notifications.inc(result="failed")
+    assert metrics.notifications.get(result="ok") == 2
+    text = metrics.render()
+    assert '# TYPE igsupload_notifications counter' in text
+    assert 'igsupload_notifications_total{result="failed"} 1' in text
+    assert 'igsupload_notifications_total{result="ok"} 2' in text
+    assert text.endswith("# EOF\n")
+
+def test_histogram_buckets_are_cumulative():
+    metrics.validation_wait_seconds.observe(0.2, status="VALID")
+    metrics.validation_wait_seconds.observe(7, status="VALID")
+    text = metrics.render()
+    assert 'igsupload_validation_wait_seconds_bucket{status="VALID",le="0.25"} 1' in text
+    assert 'igsupload_validation_wait_seconds_bucket{status="VALID",le="10.0"} 2' in text
+    assert 'igsupload_validation_wait_seconds_bucket{status="VALID",le="+Inf"} 2' in text
+    assert 'igsupload_validation_wait_seconds_count{status="VALID"} 2' in text
+    assert 'igsupload_validation_wait_seconds_sum{status="VALID"} 7.2' in text
+    assert '# UNIT igsupload_validation_wait_seconds seconds' in text
+
+def test_label_values_are_escaped():
+    metrics.token_refreshes.inc(result='a"b\n')
+    assert 'result="a\\"b\\n"' in metrics.render()
+
+def test_write_textfile_is_atomic(tmp_path):
+    target = tmp_path / "igsupload.prom"
+    metrics.set_textfile(target)
+    metrics.parts_uploaded.inc(3)
+    metrics.write_textfile()
+    assert "igsupload_parts_uploaded_total 3" in target.read_text()
+    assert os.listdir(tmp_path) == ["igsupload.prom"]
+
+def test_write_textfile_throttled(tmp_path):
+    target = tmp_path / "igsupload.prom"
+    metrics.set_textfile(target)
+    metrics.write_textfile()
+    metrics.parts_uploaded.inc()
+    metrics.write_textfile(force=False)
+    assert "igsupload_parts_uploaded_total" not in target.read_text()
+    metrics.write_textfile()
+    assert "igsupload_parts_uploaded_total 1" in target.read_text()
+
+def test_set_textfile_missing_directory(tmp_path):
+    with pytest.raises(NotADirectoryError):
+        metrics.set_textfile(tmp_path / "missing" / "igsupload.prom")
+
+def test_create_hash_records_bytes(tmp_path):
+    path = tmp_path / "reads.fastq"
+    path.write_bytes(b"A" * 20000)
+    create_hash(str(path))
+    assert metrics.hashed_bytes.get() == 20000
+    assert metrics.hash_seconds.get() > 0
+
+def test_put_chunks_records_parts(tmp_path):
+    path = tmp_path / "reads.fastq"
+    path.write_bytes(b"A" * 250)
+    responses = [make_response(200), make_response(200), make_response(500)]
+    with mock.patch("igsupload.upload_chunks.requests.put", side_effect=responses):
+        put_chunks(str(path), 100, ["u1", "u2", "u3"], "up")
+    assert metrics.parts_uploaded.get() == 2
+    assert metrics.uploaded_bytes.get() == 200
+    assert metrics.parts_failed.get() == 1
+    assert metrics.part_upload_seconds.get()[0] == 3
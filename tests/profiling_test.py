@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+import time
+import pytest
+
+from igsupload import profiling, timing
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(profiling, "profile_dir", None)
+    monkeypatch.setattr(profiling, "trace_memory", False)
+    monkeypatch.setattr(timing, "spans_path", None)
+    monkeypatch.setattr(timing, "_stats", {})
+
+def fake_workflow(csv_path):
+    timing.reset()
+    with timing.span("create_hash"):
+        data = b"x" * 1_000_000
+        for _ in range(20):
+            hashlib.sha256(data).hexdigest()
+    with timing.span("poll_validation_status"):
+        time.sleep(0.05)
+    return csv_path
+
+def test_run_without_profile_only_calls_function():
+    assert profiling.run(lambda p: p + "!", "a") == "a!"
+
+def test_set_profile_default_directory(tmp_path):
+    profiling.set_profile(True, base_dir=str(tmp_path))
+    assert profiling.profile_dir.startswith(str(tmp_path / "profile"))
+    assert os.path.isdir(profiling.profile_dir)
+    profiling.set_profile(False)
+    assert profiling.profile_dir is None
+
+def test_run_writes_profile_results(tmp_path, capsys):
+    profiling.set_profile(True, tmp_path / "prof", memory=True)
+    assert profiling.run(fake_workflow, "meta.csv") == "meta.csv"
+
+    out_dir = tmp_path / "prof"
+    assert {"profile.pstats", "profile.txt", "profile.collapsed", "stages.json", "tracemalloc.txt"} <= set(os.listdir(out_dir))
+    assert "fake_workflow" in (out_dir / "profile.txt").read_text()
+
+    stages = json.loads((out_dir / "stages.json").read_text())["stages"]
+    assert stages["create_hash"]["cpu_share"] > 0.5
+    assert stages["poll_validation_status"]["wait_seconds"] >= 0.04
+
+    out = capsys.readouterr().out
+    assert "wall vs CPU per stage" in out
+    assert "Top allocation sites" in out
+
+def test_stack_sampler_collapsed_output(tmp_path):
+    sampler = profiling.StackSampler(interval=0.001).start()
+    time.sleep(0.05)
+    sampler.stop()
+    path = tmp_path / "out.collapsed"
+    sampler.write_collapsed(str(path))
+    lines = path.read_text().splitlines()
+    assert sampler.samples > 0
+    assert any(line.startswith("MainThread;") for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
@@ -0,0 +1,109 @@
+import io
+import pytest
+
+from igsupload import progress
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(progress, "enabled", None)
+    monkeypatch.setattr(progress, "_state", None)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(progress.time, "monotonic", clock)
+    return clock
+
+def test_disabled_when_not_a_tty():
+    stream = io.StringIO()
+    progress.start(100, 1, stream)
+    progress.add_hashed(50)
+    progress.finish()
+    assert stream.getvalue() == ""
+
+def test_forced_on_draws_progress(clock):
+    progress.set_progress(True)
+    stream = io.StringIO()
+    progress.start(20_000_000, 2, stream)
+    progress.file_stage("a.fastq", "hash")
+    clock.now += 0.5
+    progress.add_hashed(10_000_000)
+    progress.file_stage("a.fastq", "upload")
+    progress.finish()
+
+    out = stream.getvalue()
+    assert out.startswith("\r")
+    assert out.endswith("\n")
+    assert "files 0/2 [upload:1]" in out
+    assert "hashed 10 MB/20 MB (20.0 MB/s)" in out
+
+def test_redraws_are_rate_limited(clock):
+    progress.set_progress(True)
+    stream = io.StringIO()
+    progress.start(100, 1, stream)
+    for _ in range(50):
+        progress.add_uploaded(1)
+    clock.now += progress.REDRAW_INTERVAL
+    progress.add_uploaded(1)
+    assert stream.getvalue().count("\r") == 2
+
+def test_rate_ewma_and_eta(clock):
+    state = progress.Progress(total_bytes=100_000_000, total_files=1, stream=io.StringIO())
+    for _ in range(4):
+        clock.now += 0.5
+        state.hashed.add(5_000_000, clock.now)
+    assert state.hashed.value == pytest.approx(10_000_000)
+    assert state.eta() is None  # no upload rate yet
+
+    # the upload starts after a pause: its first call only opens a window
+    state.uploaded.add(2_500_000, clock.now)
+    clock.now += 0.5
+    state.uploaded.add(2_500_000, clock.now)
+    # 80 MB hashing at 10 MB/s + 95 MB upload at 5 MB/s
+    assert state.eta() == pytest.approx(8 + 19)
+
+def test_idle_gap_starts_new_window(clock):
+    rate = progress._Rate()
+    clock.now += 0.5
+    rate.add(1_000_000, clock.now)
+    clock.now += 30
+    rate.add(1_000_000, clock.now)
+    clock.now += 0.5
+    rate.add(1_000_000, clock.now)
+    assert rate.value == pytest.approx(2_000_000)
+    assert rate.total == 3_000_000
+
+def test_done_files(clock):
+    progress.set_progress(True)
+    stream = io.StringIO()
+    progress.start(10, 2, stream)
+    progress.file_stage("a", "hash")
+    progress.file_stage("a", None)
+    progress.file_stage("b", None)  # never started, e.g. missing file
+    progress.finish()
+    assert "files 1/2" in stream.getvalue()
+
+def test_skip_and_compressed_upload_size(clock):
+    progress.set_progress(True)
+    stream = io.StringIO()
+    progress.start(30_000_000, 3, stream)
+    assert progress.active()
+    progress.uploads_as(10_000_000, 4_000_000)
+    progress.skip(10_000_000, 10_000_000, files=1)
+    progress.skip(upload_bytes=4_000_000)
+    progress.finish()
+    assert not progress.active()
+    assert "files 1/3" in stream.getvalue()
+    assert "hashed 0.0 MB/20 MB (- MB/s) | uploaded 0.0 MB/10 MB" in stream.getvalue()
+
+def test_duration_format():
+    assert progress._duration(None) == "--:--"
+    assert progress._duration(75) == "01:15"
+    assert progress._duration(3725) == "1:02:05"
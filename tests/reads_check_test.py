@@ -0,0 +1,99 @@
+import gzip
+import pytest
+
+from igsupload import reads_check
+from igsupload.gzip_check import GzipVerifier
+
+FASTQ = b"@r1\nACGTN\n+\nFFFFF\n@r2\nAC\n+r2\n#F\n"
+FASTA = b">c1 contig\nACGT\nNNAC\n>c2\nGG\n"
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(reads_check, "enabled", False)
+
+def check(data, name="S1_R1.fastq", chunk=3):
+    checker = reads_check.checker_for(name)
+    consumer = GzipVerifier(sink=checker) if name.endswith(".gz") else checker
+    for i in range(0, len(data), chunk):
+        consumer.update(data[i:i + chunk])
+    if consumer is not checker:
+        assert consumer.finish().ok
+    return checker.finish()
+
+@pytest.mark.parametrize("chunk", [1, 3, 1000])
+def test_valid_fastq(chunk):
+    result = check(FASTQ, chunk=chunk)
+    assert result.ok and result.records == 2
+
+def test_valid_fastq_across_buffers(monkeypatch):
+    # kleine Puffer: Records werden über Puffergrenzen hinweg zusammengesetzt
+    monkeypatch.setattr(reads_check, "BUFFER_SIZE", 10)
+    result = check(FASTQ * 50 + b"@r3\nA\n+\nF")
+    assert result.ok and result.records == 101
+
+def test_crlf_line_endings():
+    assert check(FASTQ.replace(b"\n", b"\r\n")).ok
+
+@pytest.mark.parametrize("data,message", [
+    (b"r1\nACGT\n+\nFFFF\n", "line 1: record header must start with '@'"),
+    (b"@r1\nACGT\n-\nFFFF\n", "line 3: separator line must start with '+'"),
+    (b"@r1\nACGT\n+\nFFF\n", "line 4: quality length 3 != sequence length 4"),
+    (b"@r1\nACXT\n+\nFFFF\n", "line 2: invalid sequence characters 'X'"),
+    (b"@r1\nACGT\n+\nFF F\n", "line 4: invalid quality characters ' '"),
+    (b"@r1\n\n+\n\n", "line 2: empty sequence"),
+    (FASTQ + b"@r3\nACGT\n", "line 9: truncated record (2 of 4 lines)"),
+    (b"", "line 1: no FASTQ records"),
+])
+def test_invalid_fastq(data, message):
+    result = check(data)
+    assert not result.ok
+    assert result.errors[0] == message
+
+def test_error_line_numbers_after_buffer(monkeypatch):
+    monkeypatch.setattr(reads_check, "BUFFER_SIZE", 16)
+    result = check(FASTQ * 10 + b"@r\nAC\n+\nF\n")
+    assert result.errors == ["line 84: quality length 1 != sequence length 2"]
+
+def test_errors_are_limited():
+    result = check(b"@r\nAC\n+\nF\n" * 100)
+    assert len(result.errors) == reads_check.MAX_ERRORS
+
+def test_valid_fasta():
+    result = check(FASTA, name="c.fasta")
+    assert result.ok and result.records == 2
+
+@pytest.mark.parametrize("data,message", [
+    (b"ACGT\n>c1\nAC\n", "line 1: file must start with a '>' header"),
+    (b">c1\n>c2\nAC\n", "line 1: header without sequence"),
+    (b">c1\nAC\n\nGT\n", "line 3: empty line"),
+    (b">c1\nAC\n>c2\n", "line 3: header without sequence (truncated file?)"),
+    (b">c1\nAC?\n", "line 2: invalid sequence characters '?'"),
+])
+def test_invalid_fasta(data, message):
+    result = check(data, name="c.fa")
+    assert result.errors[0] == message
+
+def test_gzip_multi_member():
+    data = gzip.compress(FASTQ) + gzip.compress(FASTQ)
+    result = check(data, name="S1_R1.fastq.gz", chunk=7)
+    assert result.ok and result.records == 4
+
+def test_check_file_truncated_gzip(tmp_path):
+    path = tmp_path / "S1_R1.fastq.gz"
+    path.write_bytes(gzip.compress(FASTQ * 100)[:-10])
+    result = reads_check.check_file(str(path))
+    assert result.errors[0] == "truncated gzip stream"
+
+def test_check_file(tmp_path):
+    path = tmp_path / "S1_R1.fastq.gz"
+    path.write_bytes(gzip.compress(FASTQ))
+    result = reads_check.check_file(str(path))
+    assert result.ok and result.records == 2
+
+def test_create_hash_feeds_checker(tmp_path):
+    from igsupload.sha256_hash import create_hash
+    path = tmp_path / "S1_R1.fastq"
+    path.write_bytes(FASTQ)
+    checker = reads_check.checker_for(path.name)
+    create_hash(str(path), checker)
+    assert checker.finish().records == 2
@@ -0,0 +1,99 @@
+import os
+import pytest
+
+from igsupload import reads_index
+from igsupload.reads_index import build_reads_index, set_read_roots, default_roots
+
+@pytest.fixture
+def reads_tree(tmp_path):
+    (tmp_path / "run_1").mkdir()
+    (tmp_path / "run_2").mkdir()
+    (tmp_path / "S1_R1.fastq").write_bytes(b"abc")
+    (tmp_path / "run_1" / "S2_R1.fastq.gz").write_bytes(b"abcdef")
+    (tmp_path / "run_1" / "dup.fastq").write_bytes(b"1")
+    (tmp_path / "run_2" / "dup.fastq").write_bytes(b"22")
+    (tmp_path / "run_2" / "notes.txt").write_text("x")
+    return tmp_path
+
+def test_resolve_by_name_with_size_and_mtime(reads_tree):
+    index = build_reads_index([str(reads_tree)])
+    entry = index.resolve("S2_R1.fastq.gz")
+    assert entry.path == str(reads_tree / "run_1" / "S2_R1.fastq.gz")
+    assert entry.size == 6
+    assert entry.mtime == os.stat(entry.path).st_mtime
+
+def test_resolve_missing_file(reads_tree):
+    index = build_reads_index([str(reads_tree)])
+    with pytest.raises(FileNotFoundError, match="File not found: nope.fastq"):
+        index.resolve("nope.fastq")
+
+def test_ambiguous_name_and_relative_path(reads_tree):
+    index = build_reads_index([str(reads_tree)])
+    with pytest.raises(ValueError, match="Ambiguous file name: dup.fastq matches 2 files"):
+        index.resolve("dup.fastq")
+    assert index.resolve("run_2/dup.fastq").size == 2
+
+def test_patterns_filter_files(reads_tree):
+    index = build_reads_index([str(reads_tree)], patterns=["*.fastq.gz", "S1_*"])
+    assert sorted(index.by_name) == ["S1_R1.fastq", "S2_R1.fastq.gz"]
+
+def test_multiple_and_overlapping_roots(reads_tree, tmp_path_factory):
+    other = tmp_path_factory.mktemp("other")
+    (other / "S3_R1.fq").write_bytes(b"x")
+    index = build_reads_index([str(reads_tree), str(reads_tree / "run_1"), str(other)])
+    assert index.resolve("S3_R1.fq").path == str(other / "S3_R1.fq")
+    assert len(index.by_name["S2_R1.fastq.gz"]) == 1
+    assert len(index) == 6
+
+def test_missing_root_is_ignored(tmp_path):
+    index = build_reads_index([str(tmp_path / "does_not_exist")])
+    assert len(index) == 0
+
+def test_set_read_roots_and_default(reads_tree, monkeypatch):
+    monkeypatch.setattr(reads_index, "read_roots", [])
+    assert default_roots("/data/metadata/meta.csv") == [os.path.abspath("/data/reads")]
+
+    set_read_roots([reads_tree], ["*.fastq"])
+    assert reads_index.read_roots == [str(reads_tree.resolve())]
+    assert reads_index.read_patterns == ["*.fastq"]
+    assert default_roots("/data/metadata/meta.csv") == [str(reads_tree.resolve())]
+    set_read_roots()
+
+def test_set_read_roots_rejects_missing_directory(tmp_path):
+    with pytest.raises(NotADirectoryError):
+        set_read_roots([tmp_path / "missing"])
+
+@pytest.fixture
+def lanes_tree(tmp_path):
+    for lane in (2, 1, 4, 3):
+        (tmp_path / f"Sample_S1_L00{lane}_R1_001.fastq.gz").write_bytes(b"x" * lane)
+    (tmp_path / "Sample_S1_L001_R2_001.fastq.gz").write_bytes(b"r2")
+    (tmp_path / "Sample_S1_L001_R1_001.fastq").write_bytes(b"plain")
+    return tmp_path
+
+def test_resolve_glob_of_lanes(lanes_tree):
+    index = build_reads_index([str(lanes_tree)])
+    read = index.resolve("Sample_S1_L00*_R1_001.fastq.gz")
+    assert read.name == "Sample_S1_R1_001.fastq.gz"
+    assert [os.path.basename(p) for p in read.path] == [
+        f"Sample_S1_L00{lane}_R1_001.fastq.gz" for lane in (1, 2, 3, 4)
+    ]
+    assert read.size == 1 + 2 + 3 + 4
+
+def test_resolve_comma_list_keeps_order(lanes_tree):
+    index = build_reads_index([str(lanes_tree)])
+    read = index.resolve("Sample_S1_L002_R1_001.fastq.gz, Sample_S1_L001_R1_001.fastq.gz")
+    assert [os.path.basename(p) for p in read.path] == [
+        "Sample_S1_L002_R1_001.fastq.gz", "Sample_S1_L001_R1_001.fastq.gz"
+    ]
+
+def test_resolve_multi_errors(lanes_tree):
+    index = build_reads_index([str(lanes_tree)])
+    with pytest.raises(FileNotFoundError, match="No files match"):
+        index.resolve("Other_L00*_R1_001.fastq.gz")
+    with pytest.raises(ValueError, match="different file types"):
+        index.resolve("Sample_S1_L001_R1_001.fastq,Sample_S1_L002_R1_001.fastq.gz")
+    with pytest.raises(ValueError, match="more than once"):
+        index.resolve("Sample_S1_L001_R1_001.fastq.gz,Sample_S1_L00[1]_R1_001.fastq.gz")
+    # ein einzelner Treffer bleibt ein normaler Eintrag
+    assert index.resolve("Sample_S1_L001_R2_*.fastq.gz").size == 2
@@ -0,0 +1,121 @@
+import hashlib
+import io
+import os
+import pytest
+
+from igsupload import reads_io
+from igsupload.sha256_hash import create_hash
+from igsupload.upload_chunks import split_file_in_chunks
+
+@pytest.fixture
+def lanes(tmp_path):
+    paths = []
+    for lane, size in enumerate((10, 0, 7, 25), start=1):
+        path = tmp_path / f"S1_L00{lane}_R1_001.fastq"
+        path.write_bytes(bytes([64 + lane]) * size)
+        paths.append(str(path))
+    return paths
+
+def concatenated(paths):
+    return b"".join(open(p, "rb").read() for p in paths)
+
+def test_is_multi():
+    assert reads_io.is_multi("S1_L00*_R1_001.fastq.gz")
+    assert reads_io.is_multi("a.fastq,b.fastq")
+    assert not reads_io.is_multi("run_1/S1_R1.fastq")
+
+def test_concat_name():
+    assert reads_io.concat_name(["run/Sample_S1_L001_R1_001.fastq.gz"]) == "Sample_S1_R1_001.fastq.gz"
+    assert reads_io.concat_name(["a.fastq", "b.fastq"]) == "a.fastq"
+
+@pytest.mark.parametrize("size", [1, 6, 10, 11, 1000])
+def test_reads_cross_file_boundaries(lanes, size):
+    with reads_io.open_read(tuple(lanes)) as f:
+        chunks = list(iter(lambda: f.read(size), b""))
+    assert b"".join(chunks) == concatenated(lanes)
+    assert all(len(chunk) == size for chunk in chunks[:-1])
+
+def test_hash_and_chunks_of_concatenation(lanes):
+    data = concatenated(lanes)
+    assert create_hash(tuple(lanes)) == hashlib.sha256(data).hexdigest()
+    chunks = list(split_file_in_chunks(tuple(lanes), 8))
+    assert [len(c) for c in chunks] == [8] * 5 + [2]
+    assert b"".join(chunks) == data
+
+def test_open_read_single_path_and_missing_lane(lanes, tmp_path):
+    with reads_io.open_read(lanes[0]) as f:
+        assert f.read() == b"A" * 10
+    with pytest.raises(FileNotFoundError):
+        with reads_io.open_read((lanes[0], str(tmp_path / "missing.fastq"))) as f:
+            f.read()
+
+@pytest.fixture
+def fadvise_calls(monkeypatch):
+    if not hasattr(os, "POSIX_FADV_DONTNEED"):
+        pytest.skip("no posix_fadvise on this platform")
+    calls = []
+    monkeypatch.setattr(reads_io, "_fadvise", lambda fd, offset, length, advice: calls.append((offset, length, advice)))
+    monkeypatch.setattr(reads_io, "READAHEAD", 16)
+    monkeypatch.setattr(reads_io, "DROP_STEP", 16)
+    monkeypatch.setattr(reads_io, "page_cache", "default")
+    monkeypatch.setattr(reads_io, "_cache_available", lambda: 1024)
+    return calls
+
+def dropped(calls):
+    return [(offset, length) for offset, length, advice in calls if advice == os.POSIX_FADV_DONTNEED]
+
+def test_page_cache_default_gives_no_hints(lanes, fadvise_calls):
+    create_hash(lanes[0])
+    list(split_file_in_chunks(lanes[0], 4))
+    assert fadvise_calls == []
+
+def test_page_cache_drop(lanes, fadvise_calls):
+    reads_io.set_page_cache("drop")
+    assert create_hash(lanes[3]) == hashlib.sha256(b"D" * 25).hexdigest()
+    assert fadvise_calls[0] == (0, 0, os.POSIX_FADV_SEQUENTIAL)
+    assert (0, 16, os.POSIX_FADV_WILLNEED) in fadvise_calls
+    # Gelesenes wird freigegeben, beim Schließen der Rest bis Dateiende
+    assert dropped(fadvise_calls) == [(0, 25), (25, 0)]
+
+def test_page_cache_drop_in_steps(lanes, fadvise_calls):
+    reads_io.set_page_cache("drop")
+    assert b"".join(split_file_in_chunks(lanes[3], 4)) == b"D" * 25
+    assert dropped(fadvise_calls) == [(0, 16), (16, 0)]
+
+def test_page_cache_keep_drops_only_after_upload(lanes, fadvise_calls):
+    reads_io.set_page_cache("keep")
+    create_hash(lanes[3])
+    assert dropped(fadvise_calls) == []
+    assert len(list(split_file_in_chunks(tuple(lanes), 8))) == 6
+    # jede Lane-Datei wird nach dem Upload freigegeben
+    assert len([d for d in dropped(fadvise_calls) if d[1] == 0]) == 4
+
+def test_page_cache_keep_drops_files_larger_than_the_cache(lanes, fadvise_calls, monkeypatch):
+    reads_io.set_page_cache("keep")
+    # der Upload-Durchlauf liest die Datei ohnehin wieder von der Platte
+    monkeypatch.setattr(reads_io, "_cache_available", lambda: 20)
+    create_hash(lanes[3])
+    assert dropped(fadvise_calls) == [(0, 25), (25, 0)]
+
+class ShortReads(io.FileIO):
+    # wie ein Netzwerk-Dateisystem: höchstens 3 Bytes pro Systemaufruf
+    def read(self, size=-1):
+        return super().read(size if size < 0 else min(size, 3))
+
+    def readinto(self, buffer):
+        return super().readinto(memoryview(buffer)[:3])
+
+class ShortAdvisedFile(reads_io.AdvisedFile, ShortReads):
+    pass
+
+def test_page_cache_drop_with_short_reads(lanes, fadvise_calls, monkeypatch):
+    reads_io.set_page_cache("drop")
+    monkeypatch.setattr(reads_io, "AdvisedFile", ShortAdvisedFile)
+    chunks = list(split_file_in_chunks(lanes[3], 8))
+    assert [len(c) for c in chunks] == [8, 8, 8, 1]
+    assert b"".join(chunks) == b"D" * 25
+    assert create_hash(lanes[3]) == hashlib.sha256(b"D" * 25).hexdigest()
+
+def test_invalid_page_cache_mode():
+    with pytest.raises(ValueError, match="Invalid page cache mode"):
+        reads_io.set_page_cache("sometimes")
@@ -0,0 +1,62 @@
+import json
+import pytest
+
+import igsupload.config as config
+import igsupload.get_token as token_module
+import igsupload.igsupload_logger as logger
+import igsupload.run_store as run_store
+from igsupload import replay
+from igsupload.demis_stub import DemisStub
+
+def bundle(notification_id):
+    return {"resourceType": "Bundle", "identifier": {"value": notification_id}, "entry": []}
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger, "logging_path", str(tmp_path))
+    monkeypatch.setattr(token_module, "current_token", "t")
+    monkeypatch.setattr(config, "CERT", None)
+    monkeypatch.setattr(config, "KEY", None)
+    run_store.set_run_store(tmp_path / "runs.sqlite")
+    run_store.start_run("meta.csv")
+    yield
+    run_store.set_run_store(None)
+
+def stored_failed(notification_id):
+    body = json.dumps(bundle(notification_id)).encode()
+    row_id = run_store.save_notification(f"S-{notification_id}", notification_id, None, ["d1", "d2"], body)
+    run_store.update_notification(row_id, "failed", error="HTTP 503")
+
+def test_replay_sends_stored_bytes(tmp_path, monkeypatch, store):
+    for n in range(5):
+        stored_failed(f"n-{n}")
+    with DemisStub() as stub:
+        monkeypatch.setattr(config, "BASE_URL", stub.base_url)
+        results = replay.replay(run_store.notifications_to_replay(), concurrency=3, rate=None)
+
+    assert all(result.ok for result in results)
+    assert sorted(json.loads(body)["identifier"]["value"] for body in stub.notification_bodies) == [f"n-{n}" for n in range(5)]
+    assert run_store.notifications_to_replay() == []
+    assert "IGS-" in (tmp_path / "logging" / "igsupload_log.csv").read_text()
+
+def test_replay_keeps_failures(monkeypatch, store):
+    import igsupload.igs_notification as igs_notification
+    monkeypatch.setattr(igs_notification, "RETRY_BACKOFF", 0)
+    stored_failed("n-1")
+    with DemisStub(error_rate=1.0, error_status=500) as stub:
+        monkeypatch.setattr(config, "BASE_URL", stub.base_url)
+        results = replay.replay(run_store.notifications_to_replay(), rate=None)
+
+    assert [result.error for result in results] == ["HTTP 500"]
+    assert run_store.execute("SELECT status, attempts FROM notifications") == [("failed", 2)]
+
+def test_replay_rate_limit(monkeypatch, store):
+    import time
+    for n in range(4):
+        stored_failed(f"n-{n}")
+    with DemisStub() as stub:
+        monkeypatch.setattr(config, "BASE_URL", stub.base_url)
+        start = time.monotonic()
+        replay.replay(run_store.notifications_to_replay(), concurrency=4, rate=20)
+    # 4 Requests bei 20/s
+    assert time.monotonic() - start >= 0.15
@@ -0,0 +1,93 @@
+import sqlite3
+import time
+import pytest
+
+from igsupload import run_store
+
+@pytest.fixture(autouse=True)
+def store(tmp_path):
+    run_store.set_run_store(tmp_path / "logging" / "runs.sqlite")
+    yield tmp_path / "logging" / "runs.sqlite"
+    run_store.set_run_store(None)
+
+def test_disabled_store_records_nothing():
+    run_store.set_run_store(None)
+    run_store.start_run("meta.csv")
+    run_store.record_upload("S1", "S1_R1.fastq", "abc", 10, "doc-1", "VALID")
+    assert run_store.run_id is None
+    assert run_store.find_validated("abc", 10) is None
+
+def test_record_and_find_validated(store):
+    run_store.start_run("meta.csv")
+    run_store.record_upload("S1", "S1_R1.fastq", "abc", 10, "doc-1", "INVALID")
+    assert run_store.find_validated("abc", 10) is None
+    run_store.record_upload("S1", "S1_R1.fastq", "abc", 10, "doc-2", "VALID")
+    run_store.finish_run()
+
+    assert run_store.find_validated("abc", 10) == "doc-2"
+    assert run_store.find_validated("abc", 11) is None
+    assert run_store.find_validated("abc", 10, since=time.time() + 60) is None
+    rows = sqlite3.connect(store).execute("SELECT csv_path, finished IS NOT NULL FROM runs").fetchall()
+    assert rows == [("meta.csv", 1)]
+
+def test_history_survives_reopening(store):
+    run_store.start_run("first.csv")
+    run_store.record_upload("S1", "S1_R1.fastq", "abc", 10, "doc-1", "VALID")
+    run_store.set_run_store(store)
+    run_store.start_run("second.csv")
+    assert run_store.run_id == 2
+    assert run_store.find_validated("abc", 10) == "doc-1"
+
+def test_notifications():
+    run_store.start_run("meta.csv")
+    stored = run_store.save_notification("S1", "n-1", "key-1", ["doc-1", "doc-2"], b"{}")
+    assert run_store.find_sent("key-1") is None
+    run_store.update_notification(stored, "failed", error="HTTP 503")
+    run_store.update_notification(stored, "sent", transaction_id="IGS-1")
+
+    assert run_store.find_sent("key-1") == "IGS-1"
+    # gesendete Bundles werden nicht aufgehoben, nur fehlgeschlagene braucht replay-notifications
+    assert run_store.execute("SELECT doc_ids, body, attempts FROM notifications") == [('["doc-1", "doc-2"]', None, 2)]
+
+def test_purge_removes_old_entries():
+    run_store.start_run("old.csv")
+    run_store.record_upload("S1", "S1_R1.fastq", "abc", 10, "doc-1", "VALID")
+    failed = run_store.save_notification("S1", "n-1", "k1", ["doc-1"], b"patient data")
+    run_store.update_notification(failed, "failed", error="HTTP 503")
+    run_store.save_validation_status("doc-1", "VALID", True, None)
+    run_store.finish_run()
+    for sql in ("UPDATE runs SET started = started - 40 * 86400", "UPDATE uploads SET updated = updated - 40 * 86400",
+                "UPDATE notifications SET updated = updated - 40 * 86400",
+                "UPDATE validation_status SET checked = checked - 40 * 86400"):
+        run_store.execute(sql)
+    run_store.start_run("new.csv")
+    run_store.record_upload("S2", "S2_R1.fastq", "def", 10, "doc-2", "VALID")
+
+    assert run_store.purge(0) == 0
+    with pytest.raises(ValueError, match="Invalid run store retention"):
+        run_store.purge(-1)
+    assert run_store.purge(30) == 2
+    assert run_store.execute("SELECT doc_id FROM uploads") == [("doc-2",)]
+    assert run_store.execute("SELECT * FROM notifications") == []
+    assert run_store.execute("SELECT * FROM validation_status") == []
+    assert run_store.execute("SELECT csv_path FROM runs") == [("new.csv",)]
+
+def test_notifications_to_replay(monkeypatch):
+    run_store.start_run("meta.csv")
+    first = run_store.save_notification("S1", "n-1", "k1", ["d1", "d2"], b"first")
+    run_store.update_notification(first, "failed", error="HTTP 503")
+    running = run_store.save_notification("S2", "n-2", "k2", ["d3", "d4"], b"running")
+    ok = run_store.save_notification("S3", "n-3", "k3", ["d5", "d6"], b"ok")
+    run_store.update_notification(ok, "sent", transaction_id="IGS-3")
+    # pending eines laufenden Laufs wird noch gesendet
+    assert [n[0] for n in run_store.notifications_to_replay()] == [first]
+
+    run_store.finish_run()
+    assert [n[0] for n in run_store.notifications_to_replay()] == [first, running]
+
+    # ein späterer Versuch derselben Meldung ersetzt den früheren
+    run_store.start_run("meta.csv")
+    again = run_store.save_notification("S1", "n-1", "k1", ["d1", "d2"], b"again")
+    run_store.update_notification(again, "failed", error="timeout")
+    assert [n[0] for n in run_store.notifications_to_replay()] == [running, again]
+    assert run_store.notifications_to_replay(run=run_store.run_id) == [(again, "S1", "n-1", ["d1", "d2"], b"again")]
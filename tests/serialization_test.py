@@ -0,0 +1,85 @@
+import gzip
+import json
+import pytest
+from unittest import mock
+
+from igsupload import serialization, timing
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(serialization, "use_gzip", False)
+    monkeypatch.setattr(serialization, "_gzip_rejected", False)
+    timing.reset()
+
+@pytest.fixture
+def recorded(monkeypatch):
+    records = []
+    monkeypatch.setattr(timing, "listeners", [records.append])
+    return records
+
+@pytest.fixture
+def mock_requests_post():
+    with mock.patch("igsupload.serialization.requests.post") as mock_post:
+        yield mock_post
+
+def make_response(status_code):
+    response = mock.Mock()
+    response.status_code = status_code
+    return response
+
+PAYLOAD = {"resourceType": "Bundle", "title": "Sequenzmeldung für Ärzte", "entry": [{"id": n} for n in range(200)]}
+
+def test_encode_json_is_compact_utf8():
+    body = serialization.encode_json({"a": [1, 2], "b": "ä"})
+    assert body == '{"a":[1,2],"b":"ä"}'.encode("utf-8")
+
+def test_encode_json_without_orjson(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(serialization.encode_json(PAYLOAD)) == PAYLOAD
+
+def test_encode_body_plain_by_default():
+    body, headers, raw_size = serialization.encode_body(PAYLOAD, {"Content-Type": "application/json"})
+    assert json.loads(body) == PAYLOAD
+    assert headers == {"Content-Type": "application/json"}
+    assert raw_size == len(body)
+
+def test_encode_body_gzip_for_large_payloads(monkeypatch):
+    serialization.set_gzip(True)
+    body, headers, raw_size = serialization.encode_body(PAYLOAD, {"Content-Type": "application/json"})
+    assert headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body)) == PAYLOAD
+    assert len(body) < raw_size
+
+def test_encode_body_small_payload_stays_plain():
+    serialization.set_gzip(True)
+    _, headers, _ = serialization.encode_body({"a": 1}, {})
+    assert "Content-Encoding" not in headers
+
+def test_post_json_records_encode_span(mock_requests_post, recorded):
+    mock_requests_post.return_value = make_response(201)
+    response = serialization.post_json("http://test/x", PAYLOAD, {"A": "b"}, stage="post_document_reference", cert=("c", "k"))
+
+    assert response.status_code == 201
+    _, kwargs = mock_requests_post.call_args
+    assert json.loads(kwargs["data"]) == PAYLOAD
+    assert kwargs["cert"] == ("c", "k")
+    record = recorded[0]
+    assert record["stage"] == "encode_body"
+    assert record["request"] == "post_document_reference"
+    assert record["gzip"] is False
+    assert record["sent_bytes"] == record["bytes"] == len(kwargs["data"])
+
+def test_post_json_falls_back_when_gzip_is_rejected(mock_requests_post, recorded):
+    serialization.set_gzip(True)
+    mock_requests_post.side_effect = [make_response(415), make_response(200), make_response(200)]
+
+    with mock.patch("builtins.print"):
+        serialization.post_json("http://test/x", PAYLOAD, {}, stage="send_notification")
+        serialization.post_json("http://test/x", PAYLOAD, {}, stage="send_notification")
+
+    sent_headers = [kwargs["headers"] for _, kwargs in mock_requests_post.call_args_list]
+    assert sent_headers[0].get("Content-Encoding") == "gzip"
+    assert "Content-Encoding" not in sent_headers[1]
+    assert "Content-Encoding" not in sent_headers[2]
+    # the 415 is answered once: only the first body was gzipped
+    assert [r["gzip"] for r in recorded] == [True, False]
@@ -0,0 +1,68 @@
+import io
+import json
+import pytest
+import requests
+
+import igsupload.config as config
+import igsupload.get_token as token_module
+import igsupload.run_store as run_store
+from igsupload import status
+from igsupload.demis_stub import DemisStub
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CERT", None)
+    monkeypatch.setattr(config, "KEY", None)
+    monkeypatch.setattr(token_module, "current_token", "t")
+    run_store.set_run_store(tmp_path / "runs.sqlite")
+    run_store.start_run("meta.csv")
+    with DemisStub() as s:
+        monkeypatch.setattr(config, "BASE_URL", s.base_url)
+        yield s
+    run_store.set_run_store(None)
+
+def create_document_reference(stub):
+    doc = {"content": [{"attachment": {"hash": "0" * 64}}]}
+    return requests.post(f"{stub.base_url}/fhir/DocumentReference", json=doc).json()["id"]
+
+def test_only_pending_doc_ids_are_queried(stub):
+    valid = create_document_reference(stub)
+    pending = create_document_reference(stub)
+    run_store.record_upload("S1", "S1_R1.fastq", "a", 1, valid, "VALID")
+    run_store.record_upload("S1", "S1_R2.fastq", "b", 1, pending, "UPLOADING")
+    stored = run_store.save_notification("S1", "n-1", None, [valid, pending], b"{}")
+    run_store.update_notification(stored, "failed", error="HTTP 503")
+
+    records = status.reconcile(concurrency=2, rate=None)
+    assert stub.request_counts["validation_status"] == 1
+    assert [r["validation_status"] for r in records] == ["VALID", "NOT_STARTED (pending)"]
+    assert all(r["notification_status"] == "failed" and r["transaction_id"] == "" for r in records)
+    assert all(status.is_problem(r) for r in records)
+
+    # noch nicht endgültig: wird beim nächsten Mal wieder abgefragt
+    status.reconcile(rate=None)
+    assert stub.request_counts["validation_status"] == 2
+
+def test_final_answers_are_cached(stub):
+    doc_id = create_document_reference(stub)
+    stub.uploads[doc_id].status = "INVALID"
+    stub.uploads[doc_id].validation_started = 0.0
+    run_store.record_upload("S1", "S1_R1.fastq", "a", 1, doc_id, "TIMEOUT")
+
+    assert status.reconcile(rate=None)[0]["validation_status"] == "INVALID"
+    assert status.reconcile(rate=None)[0]["validation_status"] == "INVALID"
+    assert stub.request_counts["validation_status"] == 1
+
+def test_offline_uses_the_history_only(stub):
+    run_store.record_upload("S1", "S1_R1.fastq", "a", 1, "doc-1", "UPLOADING")
+    assert status.reconcile(offline=True)[0]["validation_status"] == "UPLOADING (pending)"
+    assert "validation_status" not in stub.request_counts
+
+def test_write_csv_and_json():
+    records = [dict.fromkeys(status.FIELDS, "x")]
+    stream = io.StringIO()
+    status.write(records, "csv", stream)
+    assert stream.getvalue().splitlines() == [",".join(status.FIELDS), ",".join(["x"] * len(status.FIELDS))]
+    stream = io.StringIO()
+    status.write(records, "json", stream)
+    assert json.loads(stream.getvalue()) == records
@@ -0,0 +1,95 @@
+import itertools
+import json
+import pytest
+
+from igsupload import timing
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(timing, "spans_path", None)
+    monkeypatch.setattr(timing, "listeners", [])
+    timing.reset()
+    yield
+    timing.close()
+
+@pytest.fixture
+def recorded():
+    records = []
+    timing.listeners.append(records.append)
+    return records
+
+def test_span_records_duration_and_attributes(recorded):
+    with timing.context(sample="S1"):
+        with timing.context(file="S1_R1.fastq"):
+            with timing.span("create_hash", bytes=100) as record:
+                record["extra"] = 1
+        with timing.span("send_notification"):
+            pass
+
+    first, second = recorded
+    assert first["stage"] == "create_hash"
+    assert first["sample"] == "S1" and first["file"] == "S1_R1.fastq"
+    assert first["bytes"] == 100 and first["extra"] == 1
+    assert first["seconds"] >= 0 and first["start"] >= 0
+    assert second["sample"] == "S1" and "file" not in second
+
+def test_span_records_exception(recorded):
+    with pytest.raises(RuntimeError):
+        with timing.span("put_part"):
+            raise RuntimeError("boom")
+    assert recorded[0]["error"] == "RuntimeError"
+    assert timing.summarize()["put_part"]["errors"] == 1
+
+def test_summary_keeps_a_bounded_sample(monkeypatch):
+    monkeypatch.setattr(timing, "RESERVOIR_SIZE", 10)
+    monkeypatch.setattr(timing.time, "perf_counter", itertools.count().__next__)
+    for _ in range(1000):
+        with timing.span("put_part", bytes=1):
+            pass
+
+    assert all(len(stats.samples) <= 10 for stats in timing._stats.values())
+    part = timing.summarize()["put_part"]
+    assert part["count"] == 1000 and part["bytes"] == 1000
+    assert part["total"] == 1000 and part["max"] == 1
+
+def test_summarize_percentiles_and_throughput():
+    records = [{"stage": "put_part", "seconds": s / 100, "bytes": 1000} for s in range(1, 101)]
+    records.append({"stage": "create_hash", "seconds": 2.0, "bytes": 4_000_000, "error": "x"})
+    summary = timing.summarize(records)
+
+    assert list(summary) == ["create_hash", "put_part"]
+    part = summary["put_part"]
+    assert part["count"] == 100
+    assert part["p50"] == pytest.approx(0.50)
+    assert part["p95"] == pytest.approx(0.95)
+    assert part["max"] == pytest.approx(1.00)
+    assert part["bytes_per_second"] == pytest.approx(100_000 / part["total"])
+    assert summary["create_hash"]["bytes_per_second"] == 2_000_000
+    assert summary["create_hash"]["errors"] == 1
+
+def test_spans_file(tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    timing.set_spans_file(path)
+    timing.reset()
+    with timing.span("create_hash", file="a.fastq"):
+        pass
+    with timing.span("put_part", part=1):
+        pass
+    timing.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["stage"] for line in lines] == ["create_hash", "put_part"]
+    assert lines[0]["file"] == "a.fastq"
+
+def test_print_summary(capsys):
+    with timing.span("create_hash", bytes=10):
+        pass
+    timing.print_summary()
+    out = capsys.readouterr().out
+    assert "Timing summary" in out
+    assert "create_hash" in out
+    assert "Total run time" in out
+
+def test_print_summary_without_spans(capsys):
+    timing.print_summary()
+    assert capsys.readouterr().out == ""
@@ -73,3 +73,23 @@ def test_put_chunks_error(mock_requests_put):
     assert len(result["completedChunks"]) == 1  # Nur der erste Chunk erfolgreich
     assert any("Error" in call for call in print_calls)
     assert any("while uploading chunk 2" in call for call in print_calls)
+
+def test_put_chunks_renews_expired_url(mock_requests_put, tmp_path):
+    from src.igsupload.get_presigned_url import PresignedUrls
+    path = tmp_path / "reads.fastq"
+    path.write_bytes(b"abcdefgh")
+
+    # Part 2 ist abgelaufen (403), danach gibt es neue URLs für dieselbe uploadId
+    def mock_put_side_effect(url, data):
+        response = mock.Mock()
+        response.status_code = 403 if url == "https://old/2" else 200
+        response.headers = {"ETag": f'"{url}"'}
+        return response
+    mock_requests_put.side_effect = mock_put_side_effect
+    urls = PresignedUrls(["https://old/1", "https://old/2"], "uploadid",
+                         refresh=lambda: ("uploadid", ["https://new/1", "https://new/2"], 4))
+
+    with mock.patch("builtins.print"):
+        result = upload_chunks.put_chunks(str(path), 4, urls, "uploadid")
+
+    assert [c["eTag"] for c in result["completedChunks"]] == ["https://old/1", "https://new/2"]
@@ -0,0 +1,84 @@
+import pytest
+from unittest import mock
+
+from igsupload.extract_csv import CsvRow, header
+from igsupload import validate
+from igsupload.reads_index import build_reads_index
+
+def make_row(**fields):
+    values = {field.replace('.', '_'): "" for field in header}
+    values["DEMIS_NOTIFICATION_ID"] = "id-1"
+    values.update(fields)
+    return CsvRow(**values)
+
+@pytest.fixture
+def reads_dir(tmp_path):
+    (tmp_path / "S1_R1.fastq").write_text("@r\nA\n+\nI\n")
+    (tmp_path / "S1_R2.fastq.gz").write_bytes(b"")
+    return build_reads_index([str(tmp_path)])
+
+def test_valid_row_has_no_issues(reads_dir):
+    row = make_row(
+        DATE_OF_SAMPLING="18.05.2022", DATE_OF_RECEIVING="2023-03", UPLOAD_DATE="1989-02-13",
+        SPECIES_CODE="103497003", HOST_SEX="Male", HOST_BIRTH_MONTH="12", HOST_BIRTH_YEAR="2025",
+        SEQUENCING_REASON="random", GEOGRAPHIC_LOCATION="104", SEQUENCING_LAB_POSTAL_CODE="42653",
+        SEQUENCING_LAB_FEDERAL_STATE="DE-BY", SEQUENCING_LAB_EMAIL="a@b.de", REPOSITORY_NAME="PubMLST",
+        UPLOAD_STATUS="Planned", FILE_1_NAME="S1_R1.fastq", FILE_2_NAME="S1_R2.fastq.gz",
+        FILE_1_SHA256SUM="a" * 64,
+    )
+    assert validate.validate_metadata([row], reads_dir) == []
+
+@pytest.mark.parametrize("column, value", [
+    ("DATE_OF_SAMPLING", "31.02.2022"),
+    ("DATE_OF_SEQUENCING", "2022/01/01"),
+    ("UPLOAD_DATE", "2022-13"),
+    ("SPECIES_CODE", "abc"),
+    ("ISOLATION_SOURCE_CODE", "123"),
+    ("HOST_SEX", "m"),
+    ("SEQUENCING_REASON", "because"),
+    ("GEOGRAPHIC_LOCATION", "10407"),
+    ("PRIME_DIAGNOSTIC_LAB_POSTAL_CODE", "1040"),
+    ("PRIME_DIAGNOSTIC_LAB_EMAIL", "lab.de"),
+    ("SEQUENCING_LAB_EMAIL", "a@b"),
+    ("REPOSITORY_NAME", "dropbox"),
+    ("UPLOAD_STATUS", "maybe"),
+    ("FILE_1_SHA256SUM", "abc"),
+])
+def test_invalid_values_are_reported(reads_dir, column, value):
+    issues = validate.validate_metadata([make_row(**{column: value})], reads_dir)
+    assert [(i.row, i.column, i.value) for i in issues] == [(1, column, value)]
+
+def test_birth_year_and_month_must_be_set_together(reads_dir):
+    issues = validate.validate_metadata([make_row(HOST_BIRTH_YEAR="1990")], reads_dir)
+    assert [(i.column, i.message) for i in issues] == [
+        ("HOST_BIRTH_MONTH", "HOST_BIRTH_YEAR and HOST_BIRTH_MONTH must be set together")
+    ]
+
+def test_duplicate_and_missing_notification_ids(reads_dir):
+    rows = [make_row(), make_row(), make_row(DEMIS_NOTIFICATION_ID="")]
+    issues = validate.validate_metadata(rows, reads_dir)
+    assert [(i.row, i.message) for i in issues] == [
+        (2, "duplicate of row 1"),
+        (3, "missing notification id"),
+    ]
+
+def test_missing_and_unsupported_files(reads_dir):
+    rows = [make_row(FILE_1_NAME="missing.fastq", FILE_2_NAME="S1_R1.bam")]
+    issues = validate.validate_metadata(rows, reads_dir)
+    assert [i.column for i in issues] == ["FILE_1_NAME", "FILE_2_NAME", "FILE_2_NAME"]
+    assert "File not found" in str(issues[0])
+    assert "unsupported file format" in str(issues[1])
+
+def test_reports_every_error_across_batches(reads_dir, monkeypatch):
+    monkeypatch.setattr(validate, "BATCH_SIZE", 2)
+    rows = [make_row(DEMIS_NOTIFICATION_ID=str(n), HOST_SEX="x") for n in range(5)]
+    issues = validate.validate_metadata(rows, reads_dir)
+    assert [i.row for i in issues] == [1, 2, 3, 4, 5]
+
+def test_print_issues_summary():
+    issues = [validate.MetadataIssue(1, "HOST_SEX", "x", "bad"), validate.MetadataIssue(1, "UPLOAD_DATE", "y", "bad")]
+    with mock.patch("igsupload.validate.typer.secho") as mock_secho:
+        validate.print_issues(issues)
+    texts = [args[0] for args, _ in mock_secho.call_args_list]
+    assert texts[0] == "Row 1, HOST_SEX = 'x': bad"
+    assert "2 problem(s) in 1 row(s)" in texts[-1]
@@ -1,8 +1,25 @@
 import pytest
 import os
+import uuid
 from unittest import mock
 
 from igsupload.workflow import start
+from igsupload.extract_csv import CsvRow, header
+from igsupload.reads_index import ReadsIndex, ReadEntry
+
+def make_row(**fields):
+    values = {field.replace('.', '_'): "" for field in header}
+    values["DEMIS_NOTIFICATION_ID"] = str(uuid.uuid4())
+    values.update(fields)
+    return CsvRow(**values)
+
+def make_index(*names):
+    index = ReadsIndex(roots=["/abs/reads"])
+    for name in names:
+        entry = ReadEntry(path=f"/abs/reads/{name}", size=100, mtime=0.0)
+        index.by_relpath[name] = entry
+        index.by_name[name] = [entry]
+    return index
 
 @pytest.fixture(autouse=True)
 def mock_open(monkeypatch):
@@ -14,12 +31,10 @@ def workflow_base(monkeypatch):
     # Patch Thread/Token
     monkeypatch.setattr("threading.Thread", lambda *a, **kw: mock.Mock(start=lambda: None))
     monkeypatch.setattr("time.sleep", lambda s: None)
-    monkeypatch.setattr("igsupload.workflow.read_csv", lambda csv_path: [
-        {"FILE_1_NAME": "file1.fq", "FILE_2_NAME": "file2.fq", "SEQUENCING_LAB.DEMIS_LAB_ID": "labid"}
-    ])
-    monkeypatch.setattr("os.path.abspath", lambda p: "/abs/" + p)
-    monkeypatch.setattr("os.path.dirname", lambda p: "dir")
-    monkeypatch.setattr("os.path.join", os.path.join)
+    monkeypatch.setattr("igsupload.workflow.iter_csv", lambda csv_path: iter([
+        make_row(FILE_1_NAME="file1.fq", FILE_2_NAME="file2.fq", SEQUENCING_LAB_DEMIS_LAB_ID="labid")
+    ]))
+    monkeypatch.setattr("igsupload.workflow.build_reads_index", lambda roots, patterns: make_index("file1.fq", "file2.fq"))
 
 def get_secho_texts(mock_secho):
     texts = []
@@ -38,8 +53,6 @@ def get_echo_texts(mock_echo):
     return texts
 
 def test_workflow_success(monkeypatch, workflow_base):
-    monkeypatch.setattr("os.path.exists", lambda p: True)
-    monkeypatch.setattr("os.path.getsize", lambda p: 100)
     monkeypatch.setattr("igsupload.workflow.create_hash", lambda p: "hash")
     monkeypatch.setattr("igsupload.workflow.build_document_reference", lambda f, h: {"doc": f, "hash": h})
     monkeypatch.setattr("igsupload.workflow.post_document_reference", lambda doc, token: "docid")
@@ -48,7 +61,7 @@ def test_workflow_success(monkeypatch, workflow_base):
     monkeypatch.setattr("igsupload.workflow.post_upload_body", lambda docid, body, token: None)
     monkeypatch.setattr("igsupload.workflow.start_validation", lambda docid, token: None)
     monkeypatch.setattr("igsupload.workflow.poll_validation_status", lambda docid, token: "VALID")
-    monkeypatch.setattr("igsupload.workflow.send_notification", lambda fn, docid, labid: {
+    monkeypatch.setattr("igsupload.workflow.send_notification", lambda row, doc_ids: {
         "parameter": [
             {"name": "submitterGeneratedNotificationID", "valueString": "notifid"},
             {"name": "transactionID", "valueString": "transid"},
@@ -62,7 +75,7 @@ def test_workflow_success(monkeypatch, workflow_base):
         start("dummy.csv")
 
 def test_workflow_file_not_found(monkeypatch, workflow_base):
-    monkeypatch.setattr("os.path.exists", lambda p: False)
+    monkeypatch.setattr("igsupload.workflow.build_reads_index", lambda roots, patterns: make_index())
     monkeypatch.setattr("igsupload.workflow.create_hash", lambda p: "hash")
     with mock.patch("igsupload.workflow.typer.secho") as mock_secho:
         start("dummy.csv")
@@ -70,8 +83,6 @@ def test_workflow_file_not_found(monkeypatch, workflow_base):
         assert any("File not found" in t for t in texts)
 
 def test_workflow_document_reference_failed(monkeypatch, workflow_base):
-    monkeypatch.setattr("os.path.exists", lambda p: True)
-    monkeypatch.setattr("os.path.getsize", lambda p: 100)
     monkeypatch.setattr("igsupload.workflow.create_hash", lambda p: "hash")
     monkeypatch.setattr("igsupload.workflow.build_document_reference", lambda f, h: {"doc": f, "hash": h})
     monkeypatch.setattr("igsupload.workflow.post_document_reference", lambda doc, token: None)
@@ -81,8 +92,6 @@ def test_workflow_document_reference_failed(monkeypatch, workflow_base):
         assert any("Failed to create DocumentReference" in t for t in texts)
 
 def test_workflow_validation_failed(monkeypatch, workflow_base):
-    monkeypatch.setattr("os.path.exists", lambda p: True)
-    monkeypatch.setattr("os.path.getsize", lambda p: 100)
     monkeypatch.setattr("igsupload.workflow.create_hash", lambda p: "hash")
     monkeypatch.setattr("igsupload.workflow.build_document_reference", lambda f, h: {"doc": f, "hash": h})
     monkeypatch.setattr("igsupload.workflow.post_document_reference", lambda doc, token: "docid")
@@ -97,8 +106,6 @@ def test_workflow_validation_failed(monkeypatch, workflow_base):
         assert any("Validation failed" in t for t in texts)
 
 def test_workflow_notification_exception_with_json(monkeypatch, workflow_base):
-    monkeypatch.setattr("os.path.exists", lambda p: True)
-    monkeypatch.setattr("os.path.getsize", lambda p: 100)
     monkeypatch.setattr("igsupload.workflow.create_hash", lambda p: "hash")
     monkeypatch.setattr("igsupload.workflow.build_document_reference", lambda f, h: {"doc": f, "hash": h})
     monkeypatch.setattr("igsupload.workflow.post_document_reference", lambda doc, token: "docid")
@@ -123,8 +130,6 @@ def test_workflow_notification_exception_with_json(monkeypatch, workflow_base):
         assert any("error" in t for t in echo_texts)
 
 def test_workflow_notification_exception_without_json(monkeypatch, workflow_base):
-    monkeypatch.setattr("os.path.exists", lambda p: True)
-    monkeypatch.setattr("os.path.getsize", lambda p: 100)
     monkeypatch.setattr("igsupload.workflow.create_hash", lambda p: "hash")
     monkeypatch.setattr("igsupload.workflow.build_document_reference", lambda f, h: {"doc": f, "hash": h})
     monkeypatch.setattr("igsupload.workflow.post_document_reference", lambda doc, token: "docid")
@@ -149,8 +154,6 @@ def test_workflow_notification_exception_without_json(monkeypatch, workflow_base
         assert any("failtext" in t for t in echo_texts)
 
 def test_workflow_notification_exception_other(monkeypatch, workflow_base):
-    monkeypatch.setattr("os.path.exists", lambda p: True)
-    monkeypatch.setattr("os.path.getsize", lambda p: 100)
     monkeypatch.setattr("igsupload.workflow.create_hash", lambda p: "hash")
     monkeypatch.setattr("igsupload.workflow.build_document_reference", lambda f, h: {"doc": f, "hash": h})
     monkeypatch.setattr("igsupload.workflow.post_document_reference", lambda doc, token: "docid")
@@ -167,8 +170,6 @@ def test_workflow_notification_exception_other(monkeypatch, workflow_base):
         assert any("Unexpected error" in t for t in texts)
 
 def test_workflow_notification_no_parameter(monkeypatch, workflow_base):
-    monkeypatch.setattr("os.path.exists", lambda p: True)
-    monkeypatch.setattr("os.path.getsize", lambda p: 100)
     monkeypatch.setattr("igsupload.workflow.create_hash", lambda p: "hash")
     monkeypatch.setattr("igsupload.workflow.build_document_reference", lambda f, h: {"doc": f, "hash": h})
     monkeypatch.setattr("igsupload.workflow.post_document_reference", lambda doc, token: "docid")
@@ -177,18 +178,30 @@ def test_workflow_notification_no_parameter(monkeypatch, workflow_base):
     monkeypatch.setattr("igsupload.workflow.post_upload_body", lambda docid, body, token: None)
     monkeypatch.setattr("igsupload.workflow.start_validation", lambda docid, token: None)
     monkeypatch.setattr("igsupload.workflow.poll_validation_status", lambda docid, token: "VALID")
-    monkeypatch.setattr("igsupload.workflow.send_notification", lambda fn, docid, labid: {})
+    monkeypatch.setattr("igsupload.workflow.send_notification", lambda row, doc_ids: {})
     with mock.patch("igsupload.workflow.typer.secho"), mock.patch("igsupload.workflow.typer.echo"):
         start("dummy.csv")
 
 def test_workflow_continue_branch(monkeypatch, workflow_base):
-    monkeypatch.setattr("igsupload.workflow.read_csv", lambda csv_path: [
-        {"FILE_1_NAME": "", "FILE_2_NAME": "", "SEQUENCING_LAB.DEMIS_LAB_ID": "labid"},
-        {"SEQUENCING_LAB.DEMIS_LAB_ID": "labid"}, 
-    ])
-    monkeypatch.setattr("os.path.abspath", lambda p: "/abs/" + p)
-    monkeypatch.setattr("os.path.dirname", lambda p: "dir")
-    monkeypatch.setattr("os.path.join", os.path.join)
+    monkeypatch.setattr("igsupload.workflow.iter_csv", lambda csv_path: iter([
+        make_row(FILE_1_NAME="", FILE_2_NAME="", SEQUENCING_LAB_DEMIS_LAB_ID="labid"),
+        make_row(SEQUENCING_LAB_DEMIS_LAB_ID="labid"),
+    ]))
     with mock.patch("igsupload.workflow.typer.secho"), mock.patch("igsupload.workflow.typer.echo"):
         start("dummy.csv")
 
+
+def test_workflow_aborts_on_invalid_metadata(monkeypatch, workflow_base):
+    monkeypatch.setattr("igsupload.workflow.iter_csv", lambda csv_path: iter([
+        make_row(FILE_1_NAME="file1.fq", DATE_OF_SAMPLING="31.02.2024", DEMIS_NOTIFICATION_ID="id"),
+        make_row(FILE_1_NAME="file2.fq", HOST_SEX="m", DEMIS_NOTIFICATION_ID="id"),
+    ]))
+    create_hash = mock.Mock()
+    monkeypatch.setattr("igsupload.workflow.create_hash", create_hash)
+    with mock.patch("igsupload.workflow.typer.secho") as mock_secho:
+        assert start("dummy.csv") is False
+        texts = get_secho_texts(mock_secho)
+    assert any("DATE_OF_SAMPLING" in t for t in texts)
+    assert any("HOST_SEX" in t for t in texts)
+    assert any("duplicate of row 1" in t for t in texts)
+    create_hash.assert_not_called()